@@ -4,6 +4,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routers import tickets, auth, comments, notifications, feedback, templates, ticket_history
+from services.ml_client import close_async_client
+from services.audit_writer import audit_writer
 
 app = FastAPI(
     title="Help Desk API",
@@ -18,6 +20,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],  # Курсор пагинации списка тикетов, версия ответа
 )
 
 # Подключаем роутеры
@@ -32,6 +35,19 @@ app.include_router(ticket_history.router)  # История изменений
 app.include_router(tickets.router)
 
 
+@app.on_event("startup")
+def startup_event():
+    """Дописывает в БД историю из журнала audit writer и запускает его (AUDIT_WRITER_MODE=buffered)"""
+    audit_writer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Закрывает общий HTTP клиент к ML сервису и записывает накопленную историю"""
+    await close_async_client()
+    audit_writer.stop()
+
+
 @app.get("/")
 def read_root():
     return {
@@ -0,0 +1,63 @@
+"""
+Миграция: широковещательные уведомления
+
+- notifications.user_id становится необязательным (уведомление для роли)
+- добавляется колонка notifications.audience_role
+- создается таблица notification_reads (отметки о прочтении)
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import text
+from database import engine
+
+def migrate():
+    """Добавляет поддержку уведомлений для роли"""
+    with engine.connect() as conn:
+        try:
+            # Проверяем, существует ли колонка
+            result = conn.execute(text("""
+                SELECT column_name 
+                FROM information_schema.columns 
+                WHERE table_name='notifications' AND column_name='audience_role'
+            """))
+            
+            if result.fetchone() is None:
+                conn.execute(text("""
+                    ALTER TABLE notifications 
+                    ADD COLUMN audience_role VARCHAR(20)
+                """))
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_notifications_audience_role
+                    ON notifications (audience_role)
+                """))
+                print("✅ Колонка audience_role добавлена в таблицу notifications")
+            else:
+                print("ℹ️ Колонка audience_role уже существует")
+            
+            conn.execute(text("""
+                ALTER TABLE notifications 
+                ALTER COLUMN user_id DROP NOT NULL
+            """))
+            
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS notification_reads (
+                    notification_id UUID NOT NULL REFERENCES notifications(id) ON DELETE CASCADE,
+                    user_id UUID NOT NULL REFERENCES users(id),
+                    read_at TIMESTAMP NOT NULL DEFAULT now(),
+                    PRIMARY KEY (notification_id, user_id)
+                )
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_notification_reads_user_id
+                ON notification_reads (user_id)
+            """))
+            conn.commit()
+            print("✅ Таблица notification_reads готова")
+        except Exception as e:
+            print(f"❌ Ошибка при миграции: {e}")
+            conn.rollback()
+
+if __name__ == "__main__":
+    migrate()
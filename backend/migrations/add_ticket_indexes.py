@@ -0,0 +1,60 @@
+"""
+Миграция: индексы для частых запросов по тикетам
+
+Индексы соответствуют фильтрам и сортировкам в routers/tickets.py,
+routers/comments.py, routers/ticket_history.py и services/stats_service.py.
+В PostgreSQL индексы создаются CONCURRENTLY, без блокировки записи в таблицы.
+Проверка планов запросов: test_query_plans.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import text
+from database import engine
+
+# (имя индекса, таблица, колонки)
+INDEXES = [
+    ("ix_tickets_created_at_id_updated_at", "tickets", "created_at, id, updated_at"),
+    ("ix_tickets_status_created_at", "tickets", "status, created_at, id"),
+    ("ix_tickets_category_created_at", "tickets", "category_id, created_at, id"),
+    ("ix_tickets_user_id", "tickets", "user_id"),
+    ("ix_tickets_assigned_operator_id", "tickets", "assigned_operator_id"),
+    ("ix_ticket_messages_ticket_created", "ticket_messages", "ticket_id, created_at, id"),
+    ("ix_ai_predictions_ticket_id", "ai_predictions", "ticket_id"),
+    ("ix_ai_predictions_created_at", "ai_predictions", "created_at"),
+]
+
+# Индексы, которые стали лишними (префикс другого индекса)
+OBSOLETE_INDEXES = [
+    "ix_tickets_created_at_id",  # префикс ix_tickets_created_at_id_updated_at
+]
+
+def migrate():
+    """Создает отсутствующие индексы"""
+    concurrently = "CONCURRENTLY " if engine.dialect.name == "postgresql" else ""
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name, table, columns in INDEXES:
+            try:
+                conn.execute(text(
+                    f"CREATE INDEX {concurrently}IF NOT EXISTS {name} ON {table} ({columns})"
+                ))
+                print(f"✅ Индекс {name} готов")
+            except Exception as e:
+                print(f"❌ Ошибка при создании индекса {name}: {e}")
+        
+        for name in OBSOLETE_INDEXES:
+            try:
+                conn.execute(text(f"DROP INDEX {concurrently}IF EXISTS {name}"))
+                print(f"✅ Лишний индекс {name} удален")
+            except Exception as e:
+                print(f"❌ Ошибка при удалении индекса {name}: {e}")
+        
+        if engine.dialect.name == "postgresql":
+            # Обновляем статистику планировщика
+            for table in sorted({table for _, table, _ in INDEXES}):
+                conn.execute(text(f"ANALYZE {table}"))
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,43 @@
+"""
+Миграция: связь тикета-дубликата с основным тикетом
+
+- добавляется колонка tickets.master_ticket_id (ссылка на открытый тикет
+  о той же проблеме) с индексом
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import text
+from database import engine
+
+def migrate():
+    """Добавляет колонку master_ticket_id в таблицу tickets"""
+    with engine.connect() as conn:
+        try:
+            # Проверяем, существует ли колонка
+            result = conn.execute(text("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name='tickets' AND column_name='master_ticket_id'
+            """))
+
+            if result.fetchone() is None:
+                conn.execute(text("""
+                    ALTER TABLE tickets
+                    ADD COLUMN master_ticket_id UUID REFERENCES tickets(id)
+                """))
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_tickets_master_ticket_id
+                    ON tickets (master_ticket_id)
+                """))
+                conn.commit()
+                print("✅ Колонка master_ticket_id добавлена в таблицу tickets")
+            else:
+                print("ℹ️ Колонка master_ticket_id уже существует")
+        except Exception as e:
+            print(f"❌ Ошибка при миграции: {e}")
+            conn.rollback()
+
+if __name__ == "__main__":
+    migrate()
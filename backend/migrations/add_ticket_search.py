@@ -0,0 +1,92 @@
+"""
+Миграция: полнотекстовый поиск по тикетам
+
+PostgreSQL: генерируемая колонка tickets.search_vector + GIN индекс.
+SQLite: виртуальная таблица FTS5 tickets_fts + триггеры синхронизации.
+
+После применения перезапустите backend (наличие индекса проверяется при первом поиске).
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import text
+from database import engine
+
+
+def migrate_postgres(conn):
+    """tsvector по subject (вес A) и body (вес B) в конфигурациях russian и simple"""
+    result = conn.execute(text("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_name='tickets' AND column_name='search_vector'
+    """))
+
+    if result.fetchone() is None:
+        conn.execute(text("""
+            ALTER TABLE tickets
+            ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('russian', coalesce(subject, '')), 'A') ||
+                setweight(to_tsvector('russian', coalesce(body, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(subject, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(body, '')), 'B')
+            ) STORED
+        """))
+        print("✅ Колонка search_vector добавлена в таблицу tickets")
+    else:
+        print("ℹ️ Колонка search_vector уже существует")
+
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_tickets_search_vector
+        ON tickets USING GIN (search_vector)
+    """))
+    print("✅ Индекс ix_tickets_search_vector готов")
+
+
+def migrate_sqlite(conn):
+    """FTS5 таблица с внешним содержимым (tickets) и триггеры"""
+    conn.execute(text("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts USING fts5(
+            subject, body,
+            content='tickets', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """))
+    conn.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS tickets_fts_ai AFTER INSERT ON tickets BEGIN
+            INSERT INTO tickets_fts(rowid, subject, body) VALUES (new.rowid, new.subject, new.body);
+        END
+    """))
+    conn.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS tickets_fts_ad AFTER DELETE ON tickets BEGIN
+            INSERT INTO tickets_fts(tickets_fts, rowid, subject, body)
+            VALUES ('delete', old.rowid, old.subject, old.body);
+        END
+    """))
+    conn.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS tickets_fts_au AFTER UPDATE OF subject, body ON tickets BEGIN
+            INSERT INTO tickets_fts(tickets_fts, rowid, subject, body)
+            VALUES ('delete', old.rowid, old.subject, old.body);
+            INSERT INTO tickets_fts(rowid, subject, body) VALUES (new.rowid, new.subject, new.body);
+        END
+    """))
+    # Индексируем уже существующие тикеты
+    conn.execute(text("INSERT INTO tickets_fts(tickets_fts) VALUES ('rebuild')"))
+    print("✅ Таблица tickets_fts и триггеры готовы")
+
+
+def migrate():
+    """Создает индекс полнотекстового поиска для текущей БД"""
+    with engine.connect() as conn:
+        try:
+            if engine.dialect.name == "postgresql":
+                migrate_postgres(conn)
+            else:
+                migrate_sqlite(conn)
+            conn.commit()
+        except Exception as e:
+            print(f"❌ Ошибка при миграции: {e}")
+            conn.rollback()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,39 @@
+"""
+Миграция: триграммные индексы для нечеткого поиска тикетов (mode=fuzzy)
+
+Только PostgreSQL: расширение pg_trgm и GIN индексы gin_trgm_ops по subject и body.
+После применения перезапустите backend (наличие расширения и индексов проверяется
+при первом поиске; без них mode=fuzzy работает как fts).
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import text
+from database import engine
+
+def migrate():
+    """Создает расширение pg_trgm и триграммные индексы"""
+    if engine.dialect.name != "postgresql":
+        print("ℹ️ Триграммный поиск поддерживается только в PostgreSQL, миграция пропущена")
+        return
+    
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_tickets_subject_trgm
+                ON tickets USING GIN (subject gin_trgm_ops)
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_tickets_body_trgm
+                ON tickets USING GIN (body gin_trgm_ops)
+            """))
+            conn.commit()
+            print("✅ Расширение pg_trgm и триграммные индексы готовы")
+        except Exception as e:
+            print(f"❌ Ошибка при миграции: {e}")
+            conn.rollback()
+
+if __name__ == "__main__":
+    migrate()
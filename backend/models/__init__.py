@@ -12,7 +12,7 @@ from .ai_auto_response import AIAutoResponse
 from .ticket_message import TicketMessage
 from .daily_stat import DailyStat
 from .training_sample import TrainingSample
-from .notification import Notification
+from .notification import Notification, NotificationRead
 from .feedback import Feedback
 from .ticket_history import TicketHistory
 from .template import Template
@@ -30,6 +30,7 @@ __all__ = [
     "DailyStat",
     "TrainingSample",
     "Notification",
+    "NotificationRead",
     "Feedback",
     "TicketHistory",
     "Template",
@@ -15,7 +15,7 @@ class AIPrediction(Base):
     __tablename__ = "ai_predictions"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), nullable=False)
+    ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), nullable=False, index=True)
     model_id = Column(UUID(as_uuid=True), ForeignKey("ml_models.id"), nullable=False)
     
     # Предсказания
@@ -24,7 +24,7 @@ class AIPrediction(Base):
     predicted_issue_type = Column(SQLEnum(IssueType), nullable=True)
     confidence = Column(Float, nullable=False)  # Общая уверенность
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     
     # Relationships
     ticket = relationship("Ticket", back_populates="predictions")
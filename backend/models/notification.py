@@ -1,7 +1,7 @@
 """
 Notification model - уведомления для пользователей
 """
-from sqlalchemy import Column, Text, DateTime, ForeignKey, Boolean, Enum as SQLEnum
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Boolean, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -25,12 +25,15 @@ class Notification(Base):
     __tablename__ = "notifications"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    # Адресат: конкретный пользователь (user_id) или все пользователи роли (audience_role).
+    # Широковещательное уведомление хранится одной строкой независимо от числа адресатов.
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True, index=True)
+    audience_role = Column(String(20), nullable=True, index=True)
     ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), nullable=True)
     notification_type = Column(SQLEnum(NotificationType), nullable=False)
     title = Column(Text, nullable=False)  # Заголовок уведомления
     message = Column(Text, nullable=False)  # Текст уведомления
-    is_read = Column(Boolean, default=False, nullable=False)  # Прочитано ли уведомление
+    is_read = Column(Boolean, default=False, nullable=False)  # Прочитано ли уведомление (для персональных)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     
     # Relationships
@@ -38,3 +41,10 @@ class Notification(Base):
     ticket = relationship("Ticket", back_populates="notifications")
 
 
+class NotificationRead(Base):
+    """Отметка о прочтении широковещательного уведомления конкретным пользователем"""
+    __tablename__ = "notification_reads"
+
+    notification_id = Column(UUID(as_uuid=True), ForeignKey("notifications.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True, index=True)
+    read_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,7 +1,7 @@
 """
 Ticket model - основная сущность системы
 """
-from sqlalchemy import Column, String, Text, Float, Boolean, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, Text, Float, Boolean, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -52,10 +52,18 @@ class TicketStatus(str, enum.Enum):
 
 class Ticket(Base):
     __tablename__ = "tickets"
+    __table_args__ = (
+        # Список/поиск: сортировка и keyset пагинация по (created_at, id),
+        # статистика по периоду
+        Index("ix_tickets_created_at_id_updated_at", "created_at", "id", "updated_at"),
+        # Фильтры по статусу и категории
+        Index("ix_tickets_status_created_at", "status", "created_at", "id"),
+        Index("ix_tickets_category_created_at", "category_id", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     source = Column(SQLEnum(TicketSource), nullable=False)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     subject = Column(Text, nullable=True)
     body = Column(Text, nullable=False)
     language = Column(SQLEnum(TicketLanguage), default=TicketLanguage.RU)
@@ -68,7 +76,7 @@ class Ticket(Base):
     
     # Маршрутизация
     assigned_department_id = Column(UUID(as_uuid=True), ForeignKey("departments.id"), nullable=True)
-    assigned_operator_id = Column(UUID(as_uuid=True), ForeignKey("operators.id"), nullable=True)
+    assigned_operator_id = Column(UUID(as_uuid=True), ForeignKey("operators.id"), nullable=True, index=True)
     
     # Статус
     status = Column(SQLEnum(TicketStatus), default=TicketStatus.NEW)
@@ -83,6 +91,9 @@ class Ticket(Base):
     sla_deadline = Column(DateTime, nullable=True)  # Дедлайн по SLA
     is_escalated = Column(Boolean, default=False)  # Эскалирован ли тикет
     
+    # Дубликат: тикет о той же проблеме, что и открытый тикет master_ticket_id
+    master_ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), nullable=True, index=True)
+    
     # Relationships
     user = relationship("User", back_populates="tickets")
     category = relationship("Category", back_populates="tickets")
@@ -1,7 +1,7 @@
 """
 Ticket Message model - сообщения в тикете (чат/переписка)
 """
-from sqlalchemy import Column, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Text, DateTime, ForeignKey, Index, JSON
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 import uuid
@@ -12,6 +12,10 @@ from database import Base
 
 class TicketMessage(Base):
     __tablename__ = "ticket_messages"
+    __table_args__ = (
+        # Комментарии тикета в хронологическом порядке
+        Index("ix_ticket_messages_ticket_created", "ticket_id", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), nullable=False)
@@ -0,0 +1,45 @@
+"""
+Индексация всех тикетов для семантического поиска
+
+Нужна при первом включении семантического поиска или после потери индекса
+ML сервиса. Новые тикеты индексируются автоматически при создании.
+Запуск: python reindex_semantic_search.py (ML сервис должен быть запущен)
+"""
+from sqlalchemy.orm import sessionmaker
+from database import engine
+from models.ticket import Ticket
+from services.semantic_search_service import SemanticSearchService
+
+SessionLocal = sessionmaker(bind=engine)
+
+
+def reindex():
+    service = SemanticSearchService()
+    db = SessionLocal()
+    total = 0
+    try:
+        batch = []
+        query = db.query(
+            Ticket.id, Ticket.subject, Ticket.body, Ticket.status, Ticket.master_ticket_id
+        ).yield_per(service.index_batch_size)
+        for ticket in query:
+            batch.append(service.ticket_payload(ticket))
+            if len(batch) >= service.index_batch_size:
+                service.index_tickets(batch)
+                total += len(batch)
+                print(f"  Проиндексировано: {total}")
+                batch = []
+        if batch:
+            service.index_tickets(batch)
+            total += len(batch)
+        print(f"\n[OK] Проиндексировано тикетов: {total}")
+    except Exception as e:
+        print(f"[ERROR] {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    reindex()
@@ -1,23 +1,32 @@
 """
 Comments router - обработка комментариев к тикетам
 """
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
+from sqlalchemy import func, tuple_
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timezone
 
 from database import get_db
 from schemas.comment import CommentCreate, CommentResponse
 from models.ticket import Ticket
 from models.ticket_message import TicketMessage
 from models.user import User, UserRole
-from models.notification import Notification, NotificationType
+from models.notification import NotificationType
 from routers.auth import active_tokens
+from services.notification_service import NotificationService
+from utils.etag import make_etag, etag_matches, set_etag, not_modified
 from utils.history import log_comment_added
+from utils.loaders import load_users
 
 router = APIRouter(prefix="/tickets", tags=["comments"])
 
+notification_service = NotificationService()
+
+# Максимальный размер страницы комментариев (?limit=)
+COMMENTS_MAX_LIMIT = 500
+
 
 def get_current_user_from_token(
     authorization: Optional[str] = Header(None, alias="Authorization"),
@@ -103,29 +112,23 @@ def add_comment(
         if sender_role == UserRole.ADMIN.value or sender_role == UserRole.EMPLOYEE.value:
             # Админ или оператор ответил - уведомляем владельца тикета
             if ticket.user_id != user_id:  # Не отправляем уведомление самому себе
-                admin_notification = Notification(
-                    user_id=ticket.user_id,
-                    ticket_id=ticket_id,
-                    notification_type=NotificationType.ADMIN_REPLY,
+                notification_service.notify_user(
+                    db,
+                    ticket.user_id,
+                    NotificationType.ADMIN_REPLY,
                     title=f"Администратор ответил на ваш вопрос #{str(ticket_id)[:8]}",
-                    message=f"Получен ответ от администратора: {comment_data.comment_text[:100]}..."
+                    message=f"Получен ответ от администратора: {comment_data.comment_text[:100]}...",
+                    ticket_id=ticket_id
                 )
-                db.add(admin_notification)
         else:
-            # Пользователь комментирует - уведомляем всех админов
-            admins = db.query(User).filter(User.role == UserRole.ADMIN.value).all()
-            
-            for admin in admins:
-                # Не отправляем уведомление самому отправителю, если он админ
-                if admin.id != user_id:
-                    notification = Notification(
-                        user_id=admin.id,
-                        ticket_id=ticket_id,
-                        notification_type=NotificationType.COMMENT,
-                        title=f"Новый комментарий в тикете #{str(ticket_id)[:8]}",
-                        message=f"Пользователь добавил комментарий: {comment_data.comment_text[:100]}..."
-                    )
-                    db.add(notification)
+            # Пользователь комментирует - одно уведомление для всех админов
+            notification_service.notify_admins(
+                db,
+                NotificationType.COMMENT,
+                title=f"Новый комментарий в тикете #{str(ticket_id)[:8]}",
+                message=f"Пользователь добавил комментарий: {comment_data.comment_text[:100]}...",
+                ticket_id=ticket_id
+            )
         
         # Записываем добавление комментария в историю
         log_comment_added(ticket, db, user_id)
@@ -156,35 +159,90 @@ def add_comment(
 @router.get("/{ticket_id}/comments", response_model=List[CommentResponse])
 def get_comments(
     ticket_id: UUID,
-    db: Session = Depends(get_db)
+    response: Response,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    db: Session = Depends(get_db),
+    after: Optional[str] = Query(None, description="Только комментарии после сообщения (id) или момента времени (ISO 8601)"),
+    limit: Optional[int] = Query(None, ge=1, le=COMMENTS_MAX_LIMIT, description="Максимум комментариев в ответе")
 ):
-    """Получает все комментарии для тикета"""
+    """
+    Получает комментарии тикета в хронологическом порядке.
+    Комментарии только добавляются, поэтому ETag - по их количеству и дате
+    последнего; без изменений - 304 без загрузки комментариев и пользователей.
+
+    При опросе клиент передает after=<id последнего известного комментария> и
+    получает только новые (по индексу (ticket_id, created_at, id)). Если ответ
+    обрезан limit, id последнего комментария возвращается в X-Next-Cursor.
+    """
     # Проверяем, существует ли тикет
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    ticket = db.query(Ticket.id).filter(Ticket.id == ticket_id).first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
-    # Получаем все сообщения для тикета с информацией о пользователях
-    messages = db.query(TicketMessage).filter(
-        TicketMessage.ticket_id == ticket_id
-    ).order_by(TicketMessage.created_at.asc()).all()
+    count, last_created_at = db.query(
+        func.count(TicketMessage.id), func.max(TicketMessage.created_at)
+    ).filter(TicketMessage.ticket_id == ticket_id).one()
+    etag = make_etag(ticket_id, count, last_created_at, after, limit)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
+    query = db.query(TicketMessage).filter(TicketMessage.ticket_id == ticket_id)
+    if after:
+        query = _filter_after(query, db, ticket_id, after)
+    query = query.order_by(TicketMessage.created_at.asc(), TicketMessage.id.asc())
+    if limit:
+        query = query.limit(limit)
+    messages = query.all()
+    
+    if limit and len(messages) == limit:
+        response.headers["X-Next-Cursor"] = str(messages[-1].id)
+    
+    # Отправители всех сообщений - одним запросом
+    senders = load_users(db, (msg.sender_id for msg in messages))
     
     # Преобразуем в формат ответа с информацией о пользователях
-    result = []
-    for msg in messages:
-        # Получаем информацию о пользователе
-        sender = db.query(User).filter(User.id == msg.sender_id).first()
-        
-        result.append(CommentResponse(
-            id=str(msg.id),
-            ticket_id=str(msg.ticket_id),
-            user_id=str(msg.sender_id),
-            user_name=sender.name if sender else None,
-            user_email=sender.email if sender else None,
-            user_role=sender.role if sender else None,
-            comment_text=msg.text,
-            is_auto_reply=False,
-            created_at=msg.created_at.isoformat() if msg.created_at else datetime.utcnow().isoformat()
-        ))
+    return [to_comment_response(msg, senders.get(msg.sender_id)) for msg in messages]
+
+
+def _filter_after(query, db: Session, ticket_id: UUID, after: str):
+    """Оставляет сообщения после сообщения с id after или после момента времени after"""
+    try:
+        message_id = UUID(after)
+    except ValueError:
+        message_id = None
+    
+    if message_id is not None:
+        position = db.query(TicketMessage.created_at, TicketMessage.id).filter(
+            TicketMessage.id == message_id,
+            TicketMessage.ticket_id == ticket_id
+        ).first()
+        if not position:
+            raise HTTPException(status_code=400, detail="Unknown comment in 'after'")
+        return query.filter(
+            tuple_(TicketMessage.created_at, TicketMessage.id) > tuple(position)
+        )
     
-    return result
+    try:
+        moment = datetime.fromisoformat(after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="'after' must be a comment id or ISO 8601 datetime")
+    if moment.tzinfo is not None:
+        # created_at хранится в UTC без часового пояса
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return query.filter(TicketMessage.created_at > moment)
+
+
+def to_comment_response(message: TicketMessage, sender) -> CommentResponse:
+    """Сообщение тикета в формате ответа (sender - пользователь или строка load_users)"""
+    return CommentResponse(
+        id=str(message.id),
+        ticket_id=str(message.ticket_id),
+        user_id=str(message.sender_id),
+        user_name=sender.name if sender else None,
+        user_email=sender.email if sender else None,
+        user_role=sender.role if sender else None,
+        comment_text=message.text,
+        is_auto_reply=False,
+        created_at=message.created_at.isoformat() if message.created_at else datetime.utcnow().isoformat()
+    )
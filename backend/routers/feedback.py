@@ -71,14 +71,7 @@ def submit_feedback(
     db.commit()
     db.refresh(feedback)
     
-    return FeedbackResponse(
-        id=str(feedback.id),
-        ticket_id=str(feedback.ticket_id),
-        user_id=str(feedback.user_id) if feedback.user_id else None,
-        rating=feedback.rating,
-        comment=feedback.comment,
-        created_at=feedback.created_at.isoformat()
-    )
+    return to_feedback_response(feedback)
 
 
 @router.get("/{ticket_id}/feedback", response_model=Optional[FeedbackResponse])
@@ -99,6 +92,11 @@ def get_feedback(
     if not feedback:
         return None
     
+    return to_feedback_response(feedback)
+
+
+def to_feedback_response(feedback: Feedback) -> FeedbackResponse:
+    """Обратная связь в формате ответа"""
     return FeedbackResponse(
         id=str(feedback.id),
         ticket_id=str(feedback.ticket_id),
@@ -107,4 +105,3 @@ def get_feedback(
         comment=feedback.comment,
         created_at=feedback.created_at.isoformat()
     )
-
@@ -10,9 +10,12 @@ from database import get_db
 from schemas.notification import NotificationResponse, NotificationUpdate
 from models.notification import Notification
 from models.user import User
+from services.notification_service import NotificationService
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
+notification_service = NotificationService()
+
 
 def get_current_user_id(db: Session, user_id: str = None) -> UUID:
     """
@@ -28,6 +31,29 @@ def get_current_user_id(db: Session, user_id: str = None) -> UUID:
         raise HTTPException(status_code=400, detail="Invalid user ID format")
 
 
+def get_current_user(db: Session, user_id: str) -> User:
+    """Загружает текущего пользователя (нужна роль для широковещательных уведомлений)"""
+    current_user_id = get_current_user_id(db, user_id)
+    user = db.query(User).filter(User.id == current_user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+def to_response(notification: Notification, is_read: bool, user: User) -> NotificationResponse:
+    """Преобразует уведомление в формат ответа для конкретного пользователя"""
+    return NotificationResponse(
+        id=str(notification.id),
+        user_id=str(notification.user_id or user.id),
+        ticket_id=str(notification.ticket_id) if notification.ticket_id else None,
+        notification_type=notification.notification_type.value,
+        title=notification.title,
+        message=notification.message,
+        is_read=is_read,
+        created_at=notification.created_at.isoformat() if notification.created_at else ""
+    )
+
+
 @router.get("", response_model=List[NotificationResponse])
 def get_notifications(
     user_id: str,
@@ -35,34 +61,12 @@ def get_notifications(
     limit: int = 50,
     db: Session = Depends(get_db)
 ):
-    """Получает уведомления пользователя"""
-    current_user_id = get_current_user_id(db, user_id)
+    """Получает уведомления пользователя (личные и для его роли)"""
+    user = get_current_user(db, user_id)
     
-    # Проверяем, существует ли пользователь
-    user = db.query(User).filter(User.id == current_user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    query = db.query(Notification).filter(Notification.user_id == current_user_id)
-    
-    if unread_only:
-        query = query.filter(Notification.is_read == False)
+    notifications = notification_service.list_for_user(db, user, unread_only, limit)
     
-    notifications = query.order_by(Notification.created_at.desc()).limit(limit).all()
-    
-    return [
-        NotificationResponse(
-            id=str(n.id),
-            user_id=str(n.user_id),
-            ticket_id=str(n.ticket_id) if n.ticket_id else None,
-            notification_type=n.notification_type.value,
-            title=n.title,
-            message=n.message,
-            is_read=n.is_read,
-            created_at=n.created_at.isoformat() if n.created_at else ""
-        )
-        for n in notifications
-    ]
+    return [to_response(n, is_read, user) for n, is_read in notifications]
 
 
 @router.get("/unread/count")
@@ -71,12 +75,9 @@ def get_unread_count(
     db: Session = Depends(get_db)
 ):
     """Получает количество непрочитанных уведомлений"""
-    current_user_id = get_current_user_id(db, user_id)
+    user = get_current_user(db, user_id)
     
-    count = db.query(Notification).filter(
-        Notification.user_id == current_user_id,
-        Notification.is_read == False
-    ).count()
+    count = notification_service.unread_count(db, user)
     
     return {"count": count}
 
@@ -88,30 +89,14 @@ def mark_as_read(
     db: Session = Depends(get_db)
 ):
     """Помечает уведомление как прочитанное"""
-    current_user_id = get_current_user_id(db, user_id)
+    user = get_current_user(db, user_id)
     
-    notification = db.query(Notification).filter(
-        Notification.id == notification_id,
-        Notification.user_id == current_user_id
-    ).first()
+    notification = notification_service.mark_as_read(db, notification_id, user)
     
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    notification.is_read = True
-    db.commit()
-    db.refresh(notification)
-    
-    return NotificationResponse(
-        id=str(notification.id),
-        user_id=str(notification.user_id),
-        ticket_id=str(notification.ticket_id) if notification.ticket_id else None,
-        notification_type=notification.notification_type.value,
-        title=notification.title,
-        message=notification.message,
-        is_read=notification.is_read,
-        created_at=notification.created_at.isoformat() if notification.created_at else ""
-    )
+    return to_response(notification, True, user)
 
 
 @router.put("/read-all")
@@ -120,15 +105,8 @@ def mark_all_as_read(
     db: Session = Depends(get_db)
 ):
     """Помечает все уведомления пользователя как прочитанные"""
-    current_user_id = get_current_user_id(db, user_id)
-    
-    updated = db.query(Notification).filter(
-        Notification.user_id == current_user_id,
-        Notification.is_read == False
-    ).update({"is_read": True})
+    user = get_current_user(db, user_id)
     
-    db.commit()
+    updated = notification_service.mark_all_as_read(db, user)
     
     return {"updated": updated}
-
-
@@ -7,10 +7,13 @@ from typing import List, Optional
 from uuid import UUID
 
 from database import get_db
-from schemas.template import TemplateCreate, TemplateUpdate, TemplateResponse
+from schemas.template import TemplateCreate, TemplateUpdate, TemplateResponse, TemplateRenderResponse
 from models.template import Template
-from models.category import Category
+from models.ticket import Ticket
 from models.user import User
+from services.reference_cache import reference_cache
+from services.template_catalog import template_catalog
+from utils.loaders import user_display_name
 
 router = APIRouter(prefix="/templates", tags=["templates"])
 
@@ -23,45 +26,15 @@ def list_templates(
     db: Session = Depends(get_db)
 ):
     """
-    Получает список шаблонов с фильтрацией
+    Получает список шаблонов с фильтрацией (из каталога шаблонов в памяти)
     """
-    query = db.query(Template)
-    
-    if category_id:
-        query = query.filter(Template.category_id == category_id)
-    elif category_name:
-        category = db.query(Category).filter(Category.name.ilike(f"%{category_name}%")).first()
-        if category:
-            query = query.filter(Template.category_id == category.id)
-        else:
+    if category_id is None and category_name:
+        category_id = reference_cache.find_category_id(db, category_name)
+        if category_id is None:
             return []
     
-    if is_active is not None:
-        query = query.filter(Template.is_active == is_active)
-    
-    templates = query.order_by(Template.name.asc()).all()
-    
-    result = []
-    for template in templates:
-        category_name = None
-        if template.category_id:
-            category = db.query(Category).filter(Category.id == template.category_id).first()
-            if category:
-                category_name = category.name
-        
-        result.append(TemplateResponse(
-            id=str(template.id),
-            name=template.name,
-            category_id=str(template.category_id) if template.category_id else None,
-            category_name=category_name,
-            content=template.content,
-            is_active=template.is_active,
-            created_by=str(template.created_by) if template.created_by else None,
-            created_at=template.created_at.isoformat(),
-            updated_at=template.updated_at.isoformat()
-        ))
-    
-    return result
+    # Шаблоны из каталога в памяти (без запросов к БД)
+    return template_catalog.list(db, category_id=category_id, is_active=is_active)
 
 
 @router.get("/{template_id}", response_model=TemplateResponse)
@@ -72,27 +45,40 @@ def get_template(
     """
     Получает шаблон по ID
     """
-    template = db.query(Template).filter(Template.id == template_id).first()
+    template = template_catalog.get(db, template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
+    return template
+
+
+@router.post("/{template_id}/render", response_model=TemplateRenderResponse)
+def render_template(
+    template_id: UUID,
+    ticket_id: UUID = Query(..., description="Тикет, из которого берутся значения плейсхолдеров"),
+    db: Session = Depends(get_db)
+):
+    """
+    Заполняет плейсхолдеры шаблона ({{ticket_id}}, {{user_name}}, {{category}},
+    {{sla_deadline}}) данными тикета. Шаблон и категория берутся из кэша,
+    тикет с автором читается одним запросом.
+    """
+    ticket = db.query(
+        Ticket.id, Ticket.category_id, Ticket.sla_deadline, User.name, User.email
+    ).outerjoin(User, User.id == Ticket.user_id).filter(Ticket.id == ticket_id).first()
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    
+    values = {
+        "ticket_id": str(ticket.id)[:8],
+        "user_name": user_display_name(ticket) or "",
+        "category": (reference_cache.get_category_name(db, ticket.category_id) or "") if ticket.category_id else "",
+        "sla_deadline": ticket.sla_deadline.strftime("%d.%m.%Y %H:%M") if ticket.sla_deadline else "",
+    }
+    content = template_catalog.render(db, template_id, values)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Template not found")
     
-    category_name = None
-    if template.category_id:
-        category = db.query(Category).filter(Category.id == template.category_id).first()
-        if category:
-            category_name = category.name
-    
-    return TemplateResponse(
-        id=str(template.id),
-        name=template.name,
-        category_id=str(template.category_id) if template.category_id else None,
-        category_name=category_name,
-        content=template.content,
-        is_active=template.is_active,
-        created_by=str(template.created_by) if template.created_by else None,
-        created_at=template.created_at.isoformat(),
-        updated_at=template.updated_at.isoformat()
-    )
+    return TemplateRenderResponse(template_id=str(template_id), ticket_id=str(ticket_id), content=content)
 
 
 @router.post("", response_model=TemplateResponse)
@@ -130,8 +116,7 @@ def create_template(
     if template_data.category_id:
         try:
             category_id = UUID(template_data.category_id)
-            category = db.query(Category).filter(Category.id == category_id).first()
-            if not category:
+            if reference_cache.get_category_name(db, category_id) is None:
                 raise HTTPException(status_code=404, detail="Category not found")
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid category_id format")
@@ -145,13 +130,12 @@ def create_template(
     
     db.add(template)
     db.commit()
+    template_catalog.invalidate()
     db.refresh(template)
     
     category_name = None
     if template.category_id:
-        category = db.query(Category).filter(Category.id == template.category_id).first()
-        if category:
-            category_name = category.name
+        category_name = reference_cache.get_category_name(db, template.category_id)
     
     return TemplateResponse(
         id=str(template.id),
@@ -189,8 +173,7 @@ def update_template(
         if template_data.category_id:
             try:
                 category_id = UUID(template_data.category_id)
-                category = db.query(Category).filter(Category.id == category_id).first()
-                if not category:
+                if reference_cache.get_category_name(db, category_id) is None:
                     raise HTTPException(status_code=404, detail="Category not found")
                 template.category_id = category_id
             except ValueError:
@@ -202,13 +185,12 @@ def update_template(
     template.updated_at = datetime.utcnow()
     
     db.commit()
+    template_catalog.invalidate()
     db.refresh(template)
     
     category_name = None
     if template.category_id:
-        category = db.query(Category).filter(Category.id == template.category_id).first()
-        if category:
-            category_name = category.name
+        category_name = reference_cache.get_category_name(db, template.category_id)
     
     return TemplateResponse(
         id=str(template.id),
@@ -237,6 +219,7 @@ def delete_template(
     
     db.delete(template)
     db.commit()
+    template_catalog.invalidate()
     
     return {"message": "Template deleted successfully", "template_id": str(template_id)}
 
@@ -1,16 +1,18 @@
 """
 TicketHistory router - история изменений тикета
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
 from database import get_db
 from schemas.ticket_history import TicketHistoryResponse
 from models.ticket_history import TicketHistory, HistoryAction
 from models.ticket import Ticket
-from models.user import User
+from utils.etag import make_etag, etag_matches, set_etag, not_modified
+from utils.loaders import load_users, user_display_name
 
 router = APIRouter(prefix="/tickets", tags=["ticket-history"])
 
@@ -18,40 +20,49 @@ router = APIRouter(prefix="/tickets", tags=["ticket-history"])
 @router.get("/{ticket_id}/history", response_model=List[TicketHistoryResponse])
 def get_ticket_history(
     ticket_id: UUID,
+    response: Response,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
     db: Session = Depends(get_db)
 ):
     """
     Получает историю изменений тикета
+    (ETag - по количеству записей и дате последней, без изменений - 304)
     """
     # Проверяем, существует ли тикет
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    ticket = db.query(Ticket.id).filter(Ticket.id == ticket_id).first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
+    count, last_created_at = db.query(
+        func.count(TicketHistory.id), func.max(TicketHistory.created_at)
+    ).filter(TicketHistory.ticket_id == ticket_id).one()
+    etag = make_etag(ticket_id, count, last_created_at)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
     # Получаем историю
     history_items = db.query(TicketHistory).filter(
         TicketHistory.ticket_id == ticket_id
     ).order_by(TicketHistory.created_at.asc()).all()
     
-    result = []
-    for item in history_items:
-        user_name = None
-        if item.user_id:
-            user = db.query(User).filter(User.id == item.user_id).first()
-            if user:
-                user_name = user.name or user.email
-        
-        result.append(TicketHistoryResponse(
-            id=str(item.id),
-            ticket_id=str(item.ticket_id),
-            user_id=str(item.user_id) if item.user_id else None,
-            action=item.action.value,
-            old_value=item.old_value,
-            new_value=item.new_value,
-            description=item.description,
-            created_at=item.created_at.isoformat(),
-            user_name=user_name
-        ))
+    # Авторы всех записей - одним запросом
+    users = load_users(db, (item.user_id for item in history_items))
     
-    return result
+    return [to_history_response(item, users.get(item.user_id)) for item in history_items]
+
+
+def to_history_response(item: TicketHistory, user) -> TicketHistoryResponse:
+    """Запись истории в формате ответа (user - пользователь или строка load_users)"""
+    return TicketHistoryResponse(
+        id=str(item.id),
+        ticket_id=str(item.ticket_id),
+        user_id=str(item.user_id) if item.user_id else None,
+        action=item.action.value,
+        old_value=item.old_value,
+        new_value=item.new_value,
+        description=item.description,
+        created_at=item.created_at.isoformat(),
+        user_name=user_display_name(user)
+    )
 
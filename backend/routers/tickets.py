@@ -1,96 +1,279 @@
 """
 Tickets router - обработка тикетов
 """
-from fastapi import APIRouter, Depends, HTTPException, Query, Header
+import asyncio
+import csv
+import io
+import json
+import os
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Header, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List, Optional
+from sqlalchemy import and_, func
+from typing import List, Optional, Union
 from uuid import UUID
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+from enum import Enum
 
-from database import get_db
-from schemas.ticket import TicketCreate, TicketResponse, TicketUpdate
+from database import get_db, SessionLocal
+from schemas.ticket import (
+    TicketCreate, TicketResponse, TicketUpdate,
+    TicketBulkCreate, TicketBulkItemResult, TicketBulkResponse,
+    TicketSemanticSearchResult, TicketSummaryResponse, TicketFacetsResponse,
+    TicketFullResponse
+)
 from schemas.comment import CommentCreate, CommentResponse
 from models.ticket import Ticket, TicketStatus
 from models.ticket_message import TicketMessage
-from models.category import Category
+from models.ticket_history import TicketHistory
+from models.feedback import Feedback
 from models.user import User
 from models.ai_prediction import AIPrediction
 from models.ai_auto_response import AIAutoResponse
-from models.ml_model import MLModel
+from models.notification import NotificationType
 from services.ai_classifier import AIClassifier
 from services.ai_router import AIRouter
-from services.auto_resolver import AutoResolver
 from services.stats_service import StatsService
+from services.bulk_import_service import BulkImportService
+from services.duplicate_detector import DuplicateDetector, OPEN_STATUSES
+from services.facet_service import FacetService
+from services.notification_service import NotificationService
+from services.reference_cache import reference_cache
+from services.search_service import SearchService
+from services.semantic_search_service import SemanticSearchService
 from services.sla_service import SLAService
 from utils.history import log_ticket_creation, log_status_change, log_priority_change, log_assignment
+from utils.etag import make_etag, etag_matches, set_etag, not_modified
+from utils.loaders import load_users
+from utils.pagination import apply_keyset, next_cursor
+from routers.comments import to_comment_response
+from routers.feedback import to_feedback_response
+from routers.ticket_history import to_history_response
 
 router = APIRouter(prefix="/tickets", tags=["tickets"])
 
 # Инициализация сервисов
 classifier = AIClassifier()
 router_service = AIRouter()
-auto_resolver = AutoResolver()
 stats_service = StatsService()
+notification_service = NotificationService()
+search_service = SearchService()
+semantic_search_service = SemanticSearchService()
+duplicate_detector = DuplicateDetector()
+facet_service = FacetService()
+bulk_import_service = BulkImportService(router_service, stats_service, notification_service)
+
+# Размер пачки для массового импорта
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "500"))
+# Длина начала текста тикета в кратком списке (?fields=summary)
+TICKET_PREVIEW_LENGTH = int(os.getenv("TICKET_PREVIEW_LENGTH", "200"))
+
+# Сколько строк выгрузки читается из БД (серверный курсор) и отправляется за раз
+TICKET_EXPORT_BATCH_SIZE = int(os.getenv("TICKET_EXPORT_BATCH_SIZE", "1000"))
+
+# Колонки краткого списка: полный body не читается из БД
+TICKET_SUMMARY_COLUMNS = (
+    Ticket.id, Ticket.source, Ticket.user_id, Ticket.subject,
+    Ticket.category_id, Ticket.priority, Ticket.issue_type,
+    Ticket.assigned_department_id, Ticket.assigned_operator_id,
+    Ticket.status, Ticket.auto_resolved, Ticket.created_at, Ticket.updated_at,
+    Ticket.sla_deadline, Ticket.is_escalated, Ticket.master_ticket_id,
+)
+
+
+def _duplicate_detection_args() -> tuple:
+    """Параметры поиска дубликатов для classify_with_reply (пусто, если выключен)"""
+    if not duplicate_detector.enabled:
+        return ()
+    return duplicate_detector.threshold, duplicate_detector.max_candidates
 
 
 @router.post("/create", response_model=TicketResponse)
 def create_ticket(
     ticket_data: TicketCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
     Создает новый тикет и автоматически обрабатывает его с помощью ИИ
     """
-    # 0. Проверяем/создаем пользователя
-    user = db.query(User).filter(User.id == ticket_data.user_id).first()
+    # 1. AI Classifier - классификация тикета, попытка автоматического решения
+    # и поиск похожих открытых тикетов (один запрос к ML сервису):
+    # дубликат открытого тикета копирует его классификацию
+    ml_result = classifier.classify_with_reply(
+        ticket_data.subject or "", ticket_data.body, *_duplicate_detection_args()
+    )
+    
+    if ml_result["duplicate_candidates"]:
+        master = duplicate_detector.find_master(db, ml_result["duplicate_candidates"])
+        if master:
+            return _persist_duplicate(db, ticket_data, master)
+        # Похожие тикеты устарели - обычная обработка с уже полученной классификацией
+    
+    ticket = _persist_ticket(db, ticket_data, ml_result, ml_result["auto_reply"])
+    
+    # Индексация для семантического поиска - после ответа клиенту
+    background_tasks.add_task(
+        semantic_search_service.index_tickets_async,
+        [semantic_search_service.ticket_payload(ticket)]
+    )
+    return ticket
+
+
+@router.post("/create_async", response_model=TicketResponse)
+async def create_ticket_async(
+    ticket_data: TicketCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """
+    Асинхронный прием тикета: то же, что /create, но запросы к ML сервису
+    ожидаются на event loop и не занимают поток threadpool.
+    В потоке выполняется только короткая работа с БД.
+    """
+    ml_result = await classifier.classify_with_reply_async(
+        ticket_data.subject or "", ticket_data.body, *_duplicate_detection_args()
+    )
+    
+    if ml_result["duplicate_candidates"]:
+        master = await run_in_threadpool(duplicate_detector.find_master, db, ml_result["duplicate_candidates"])
+        if master:
+            return await run_in_threadpool(_persist_duplicate, db, ticket_data, master)
+    
+    ticket = await run_in_threadpool(_persist_ticket, db, ticket_data, ml_result, ml_result["auto_reply"])
+    
+    background_tasks.add_task(
+        semantic_search_service.index_tickets_async,
+        [semantic_search_service.ticket_payload(ticket)]
+    )
+    return ticket
+
+
+@router.post("/bulk", response_model=TicketBulkResponse)
+async def bulk_create_tickets(
+    bulk_data: TicketBulkCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """
+    Массовый импорт тикетов (миграция из старых систем)
+    
+    Тикеты обрабатываются пачками по BULK_IMPORT_BATCH_SIZE: классификация пачки
+    идет параллельно, пока сохраняется предыдущая пачка. Ошибка классификации
+    или сохранения пачки помечает неудачными только тикеты этой пачки.
+    Тикеты, классифицированные по умолчанию (ML сервис недоступен),
+    отмечены ml_fallback.
+    """
+    items = bulk_data.tickets
+    batches = [
+        items[start:start + BULK_IMPORT_BATCH_SIZE]
+        for start in range(0, len(items), BULK_IMPORT_BATCH_SIZE)
+    ]
+    
+    def classify(batch):
+        return asyncio.create_task(classifier.classify_with_reply_batch_async(
+            [(t.subject, t.body) for t in batch]
+        ))
+    
+    results = []
+    indexed_payloads = []
+    offset = 0
+    next_classification = classify(batches[0])
+    try:
+        for i, batch in enumerate(batches):
+            # Если классификация предыдущей пачки упала, следующая еще не запущена
+            classification = next_classification or classify(batch)
+            next_classification = None
+            try:
+                ml_results = await classification
+                # Классифицируем следующую пачку, пока сохраняется текущая
+                if i + 1 < len(batches):
+                    next_classification = classify(batches[i + 1])
+                
+                saved = await run_in_threadpool(bulk_import_service.import_batch, db, batch, ml_results)
+                results.extend(
+                    TicketBulkItemResult(
+                        index=offset + j, success=True, ticket_id=item["ticket_id"], status=item["status"],
+                        ml_fallback=ml_result.get("ml_fallback", False)
+                    )
+                    for j, (item, ml_result) in enumerate(zip(saved, ml_results))
+                )
+                indexed_payloads.extend(
+                    {
+                        "ticket_id": str(item["ticket_id"]), "subject": t.subject or "", "text": t.body,
+                        "open": item["status"] in OPEN_STATUSES
+                    }
+                    for t, item in zip(batch, saved)
+                )
+            except Exception as e:
+                await run_in_threadpool(db.rollback)
+                print(f"Error importing batch at {offset}: {e}")
+                results.extend(
+                    TicketBulkItemResult(index=offset + j, success=False, error=str(e))
+                    for j in range(len(batch))
+                )
+            offset += len(batch)
+    finally:
+        # Запрос прерван - классификация следующей пачки больше не нужна
+        if next_classification is not None:
+            next_classification.cancel()
+    
+    # Индексация импортированных тикетов для семантического поиска - в фоне
+    if indexed_payloads:
+        background_tasks.add_task(semantic_search_service.index_tickets_async, indexed_payloads)
+    
+    created = sum(1 for r in results if r.success)
+    return TicketBulkResponse(
+        total=len(items),
+        created=created,
+        failed=len(items) - created,
+        ml_fallback=sum(1 for r in results if r.ml_fallback),
+        results=results
+    )
+
+
+def _ensure_user(db: Session, user_id: UUID):
+    """Создает пользователя автоматически, если его нет"""
+    user = db.query(User).filter(User.id == user_id).first()
     if not user:
-        # Создаем пользователя автоматически, если его нет
         user = User(
-            id=ticket_data.user_id,
-            email=f"user_{ticket_data.user_id}@example.com",  # Временный email
+            id=user_id,
+            email=f"user_{user_id}@example.com",  # Временный email
             name="Auto-created User",
             role="client"
         )
         db.add(user)
         db.flush()
+
+
+def _persist_ticket(
+    db: Session,
+    ticket_data: TicketCreate,
+    ml_result: dict,
+    auto_response_text: Optional[str]
+) -> Ticket:
+    """
+    Сохраняет тикет с уже готовым результатом классификации и автоответом.
+    Не обращается к ML сервису, поэтому используется и синхронным, и асинхронным приемом.
+    """
+    # 0. Проверяем/создаем пользователя
+    _ensure_user(db, ticket_data.user_id)
     
-    # 1. AI Classifier - классификация тикета
-    ml_result = classifier.classify(ticket_data.subject or "", ticket_data.body)
-    
-    # 2. Получаем или создаем категорию
-    category = db.query(Category).filter(
-        Category.name == ml_result["category"]
-    ).first()
-    
-    if not category:
-        # Создаем новую категорию, если её нет
-        category = Category(
-            name=ml_result["category"],
-            description=f"Автоматически созданная категория"
-        )
-        db.add(category)
-        db.flush()
-    
-    # 3. Получаем последнюю ML модель (или создаем дефолтную)
-    ml_model = db.query(MLModel).order_by(MLModel.created_at.desc()).first()
-    if not ml_model:
-        ml_model = MLModel(
-            name="default_classifier",
-            version="1.0",
-            description="Default ML model"
-        )
-        db.add(ml_model)
-        db.flush()
+    # 2-3. Категория и последняя ML модель - из кэша справочников
+    # (создаются, если их еще нет)
+    category_id = reference_cache.get_or_create_category_id(db, ml_result["category"])
+    ml_model_id = reference_cache.get_or_create_model_id(db)
     
     # 4. Создаем тикет
     ticket = Ticket(
+        created_at=datetime.utcnow(),  # Нужен до flush для расчета SLA
         source=ticket_data.source,
         user_id=ticket_data.user_id,
         subject=ticket_data.subject,
         body=ticket_data.body,
         language=ticket_data.language,
-        category_id=category.id,
+        category_id=category_id,
         priority=ml_result["priority"],
         issue_type=ml_result["issue_type"],
         ai_confidence=ml_result["confidence"].get("problem_type", 0.5),
@@ -121,252 +304,531 @@ def create_ticket(
     # Записываем создание тикета в историю
     log_ticket_creation(ticket, db, ticket_data.user_id)
     
-    # 6. Попытка автоматического решения
-    if ml_result["issue_type"].value == "auto_resolvable":
-        auto_response_text = auto_resolver.try_auto_resolve(
-            ticket_data.body,
-            ml_result["category"],
-            ml_result["issue_type"]
-        )
+    # 6. Применяем автоматическое решение (получено от ML заранее)
+    if auto_response_text:
+        ticket.status = TicketStatus.AUTO_RESOLVED
+        ticket.auto_resolved = True
+        ticket.closed_at = datetime.utcnow()
         
-        if auto_response_text:
-            ticket.status = TicketStatus.AUTO_RESOLVED
-            ticket.auto_resolved = True
-            ticket.closed_at = datetime.utcnow()
-            
-            # Сохраняем автоматический ответ
-            auto_response = AIAutoResponse(
-                ticket_id=ticket.id,
-                response_text=auto_response_text,
-                is_successful=True
-            )
-            db.add(auto_response)
+        # Сохраняем автоматический ответ
+        auto_response = AIAutoResponse(
+            ticket_id=ticket.id,
+            response_text=auto_response_text,
+            is_successful=True
+        )
+        db.add(auto_response)
     
     # 7. Сохраняем предсказание ИИ
     prediction = AIPrediction(
         ticket_id=ticket.id,
-        model_id=ml_model.id,
-        predicted_category_id=category.id,
+        model_id=ml_model_id,
+        predicted_category_id=category_id,
         predicted_priority=ml_result["priority"],
         predicted_issue_type=ml_result["issue_type"],
         confidence=ml_result["confidence"].get("problem_type", 0.5)
     )
     db.add(prediction)
     
-    # 8. Создаем уведомления для всех админов о новом тикете
-    from models.notification import Notification, NotificationType
-    from models.user import UserRole
+    # 8. Уведомляем админов о новом тикете (одна запись на всех админов)
+    notification_service.notify_admins(
+        db,
+        NotificationType.TICKET_CREATED,
+        title=f"Новый тикет #{str(ticket.id)[:8]}",
+        message=f"Создан новый тикет: {ticket.subject or ticket.body[:100]}...",
+        ticket_id=ticket.id
+    )
     
-    admins = db.query(User).filter(User.role == UserRole.ADMIN.value).all()
+    # 9. Увеличиваем счетчики дневной статистики (в той же транзакции)
+    stats_service.increment_daily_stats(
+        db,
+        ticket.created_at.date(),
+        total_tickets=1,
+        auto_resolved=1 if ticket.auto_resolved else 0,
+        misroutes=1 if ticket.ai_confidence < 0.7 else 0,
+        confidence_sum=prediction.confidence
+    )
     
-    for admin in admins:
-        notification = Notification(
-            user_id=admin.id,
-            ticket_id=ticket.id,
-            notification_type=NotificationType.TICKET_CREATED,
-            title=f"Новый тикет #{str(ticket.id)[:8]}",
-            message=f"Создан новый тикет: {ticket.subject or ticket.body[:100]}..."
-        )
-        db.add(notification)
+    db.commit()
+    db.refresh(ticket)
+    
+    return ticket
+
+
+def _persist_duplicate(db: Session, ticket_data: TicketCreate, master: Ticket) -> Ticket:
+    """
+    Сохраняет дубликат открытого тикета master: классификация, маршрутизация
+    и SLA копируются с основного тикета, без автоответа и уведомлений админов
+    (о проблеме уже сообщено основным тикетом). Предсказание ИИ тоже
+    копируется с основного тикета, чтобы средняя уверенность в дневной
+    статистике совпадала с пересчетом по AIPrediction.
+    """
+    _ensure_user(db, ticket_data.user_id)
+    
+    ticket = Ticket(
+        created_at=datetime.utcnow(),
+        source=ticket_data.source,
+        user_id=ticket_data.user_id,
+        subject=ticket_data.subject,
+        body=ticket_data.body,
+        language=ticket_data.language,
+        category_id=master.category_id,
+        priority=master.priority,
+        issue_type=master.issue_type,
+        ai_confidence=master.ai_confidence,
+        assigned_department_id=master.assigned_department_id,
+        assigned_operator_id=master.assigned_operator_id,
+        master_ticket_id=master.id,
+        status=TicketStatus.NEW
+    )
+    if master.priority:
+        ticket.sla_deadline = SLAService.calculate_sla_deadline(master.priority, ticket.created_at)
+    
+    db.add(ticket)
+    db.flush()
+    
+    log_ticket_creation(ticket, db, ticket_data.user_id)
+    
+    confidence = ticket.ai_confidence or 0.0
+    db.add(AIPrediction(
+        ticket_id=ticket.id,
+        model_id=reference_cache.get_or_create_model_id(db),
+        predicted_category_id=master.category_id,
+        predicted_priority=master.priority,
+        predicted_issue_type=master.issue_type,
+        confidence=confidence
+    ))
+    
+    stats_service.increment_daily_stats(
+        db,
+        ticket.created_at.date(),
+        total_tickets=1,
+        misroutes=1 if confidence < 0.7 else 0,
+        confidence_sum=confidence
+    )
     
     db.commit()
     db.refresh(ticket)
     
-    # 9. Обновляем статистику
+    return ticket
+
+
+def _parse_date_bound(value: str, end_of_day: bool = False) -> Optional[datetime]:
+    """
+    Парсит границу периода: YYYY-MM-DD или ISO datetime.
+    Для конца периода добавляет один день, чтобы включить весь день.
+    """
     try:
-        stats_service.update_daily_stats(db)
+        if 'T' in value:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        else:
+            parsed = datetime.strptime(value, '%Y-%m-%d')
+        return parsed + timedelta(days=1) if end_of_day else parsed
     except Exception as e:
-        print(f"Warning: Could not update daily stats: {e}")
-    
-    return ticket
+        print(f"Error parsing date: {e}, value: {value}")
+        return None
 
 
-@router.get("", response_model=List[TicketResponse])
-def list_tickets(
-    skip: int = 0,
-    limit: int = 50,
+def _apply_ticket_filters(
+    db: Session,
+    query,
     status: Optional[TicketStatus] = None,
     category_id: Optional[UUID] = None,
     category_name: Optional[str] = None,
     date_from: Optional[str] = None,
-    date_to: Optional[str] = None,
-    db: Session = Depends(get_db)
+    date_to: Optional[str] = None
 ):
-    """Список тикетов с фильтрацией"""
-    query = db.query(Ticket)
-    
+    """
+    Применяет общие фильтры списка/поиска тикетов.
+    Возвращает None, если категория по имени не найдена (результат заведомо пустой).
+    """
     if status:
         query = query.filter(Ticket.status == status)
     
     if category_id:
         query = query.filter(Ticket.category_id == category_id)
     elif category_name:
-        # Ищем категорию по имени (точное совпадение или частичное)
-        category = db.query(Category).filter(
-            Category.name.ilike(f"%{category_name}%")
-        ).first()
-        if category:
-            query = query.filter(Ticket.category_id == category.id)
-        else:
-            # Если категория не найдена, возвращаем пустой результат
+        # Ищем категорию по имени (частичное совпадение) в кэше справочников
+        matched_category_id = reference_cache.find_category_id(db, category_name)
+        if not matched_category_id:
             print(f"Category not found: {category_name}")
-            return []
+            return None
+        query = query.filter(Ticket.category_id == matched_category_id)
     
     if date_from:
-        try:
-            # Парсим дату в формате YYYY-MM-DD
-            if 'T' in date_from:
-                date_from_obj = datetime.fromisoformat(date_from.replace('Z', '+00:00'))
-            else:
-                # Если только дата без времени, добавляем время начала дня
-                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
+        date_from_obj = _parse_date_bound(date_from)
+        if date_from_obj:
             query = query.filter(Ticket.created_at >= date_from_obj)
-        except Exception as e:
-            print(f"Error parsing date_from: {e}, value: {date_from}")
-            pass
     
     if date_to:
-        try:
-            # Парсим дату в формате YYYY-MM-DD
-            if 'T' in date_to:
-                date_to_obj = datetime.fromisoformat(date_to.replace('Z', '+00:00'))
-            else:
-                # Если только дата без времени, добавляем время конца дня
-                date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
-            # Добавляем один день, чтобы включить весь день
-            from datetime import timedelta
-            date_to_obj = date_to_obj + timedelta(days=1)
+        date_to_obj = _parse_date_bound(date_to, end_of_day=True)
+        if date_to_obj:
             query = query.filter(Ticket.created_at < date_to_obj)
-        except Exception as e:
-            print(f"Error parsing date_to: {e}, value: {date_to}")
-            pass
     
-    tickets = query.order_by(Ticket.created_at.desc()).offset(skip).limit(limit).all()
+    return query
+
+
+def _ticket_query(db: Session, fields: str):
+    """
+    Базовый запрос списка тикетов: полные ORM объекты (fields=full)
+    или только колонки краткого списка с началом текста (fields=summary)
+    """
+    if fields == "summary":
+        return db.query(
+            *TICKET_SUMMARY_COLUMNS,
+            func.substr(Ticket.body, 1, TICKET_PREVIEW_LENGTH).label("body_preview")
+        )
+    return db.query(Ticket)
+
+
+def _paginate(query, response: Response, limit: int, skip: int = 0, cursor: Optional[str] = None):
+    """
+    Постраничная выборка тикетов по (created_at desc, id desc).
+    С курсором используется keyset пагинация (skip игнорируется),
+    курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+    """
+    try:
+        query = apply_keyset(query, Ticket.created_at, Ticket.id, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    if not cursor and skip:
+        query = query.offset(skip)
+    tickets = query.limit(limit).all()
+    
+    cursor_value = next_cursor(tickets, limit)
+    if cursor_value:
+        response.headers["X-Next-Cursor"] = cursor_value
     return tickets
 
 
-@router.get("/search", response_model=List[TicketResponse])
+def _page_version(tickets) -> List[str]:
+    """
+    Версия страницы для ETag: (id, updated_at) ее строк в том же порядке.
+    Меняется при изменении, добавлении или удалении тикетов, попадающих на страницу.
+    """
+    return [f"{ticket.id}@{ticket.updated_at}" for ticket in tickets]
+
+
+FIELDS_QUERY = Query(
+    "full",
+    pattern="^(full|summary)$",
+    description="full - тикеты целиком, summary - краткие строки с началом текста (для списков)"
+)
+
+
+@router.get("", response_model=Union[List[TicketResponse], List[TicketSummaryResponse]])
+def list_tickets(
+    response: Response,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (из X-Next-Cursor)"),
+    status: Optional[TicketStatus] = None,
+    category_id: Optional[UUID] = None,
+    category_name: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    fields: str = FIELDS_QUERY,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    db: Session = Depends(get_db)
+):
+    """
+    Список тикетов с фильтрацией.
+    ETag - по (id, updated_at) тикетов страницы и параметрам запроса. Страница
+    читается один раз; при совпадении с If-None-Match - 304 без сериализации
+    и передачи тикетов.
+    """
+    query = _apply_ticket_filters(
+        db, _ticket_query(db, fields), status, category_id, category_name, date_from, date_to
+    )
+    if query is None:
+        return []
+    
+    tickets = _paginate(query, response, limit, skip, cursor)
+    etag = make_etag(
+        *_page_version(tickets),
+        skip, limit, cursor, status, category_id, category_name, date_from, date_to, fields
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
+    return tickets
+
+
+@router.get("/search", response_model=Union[List[TicketResponse], List[TicketSummaryResponse]])
 def search_tickets(
+    response: Response,
     q: str = Query(..., description="Search query"),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(
+        None, description="Курсор следующей страницы (из X-Next-Cursor), только для sort=created_at"
+    ),
+    sort: str = Query(
+        "relevance",
+        pattern="^(relevance|created_at)$",
+        description="relevance - по релевантности (offset), created_at - по дате (курсор)"
+    ),
     status: Optional[TicketStatus] = None,
     category_id: Optional[UUID] = None,
     category_name: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
+    mode: Optional[str] = Query(
+        None,
+        pattern="^(fts|fuzzy|ilike)$",
+        description="Режим поиска: fts (полнотекстовый, по умолчанию), fuzzy (с опечатками) или ilike"
+    ),
+    fields: str = FIELDS_QUERY,
     db: Session = Depends(get_db)
 ):
-    """Поиск тикетов по тексту в subject и body с фильтрацией"""
-    if not q or len(q.strip()) == 0:
-        # Если поисковый запрос пустой, возвращаем обычный список с фильтрами
-        query = db.query(Ticket)
-        if status:
-            query = query.filter(Ticket.status == status)
-        if category_id:
-            query = query.filter(Ticket.category_id == category_id)
-        elif category_name:
-            category = db.query(Category).filter(
-                Category.name.ilike(f"%{category_name}%")
-            ).first()
-            if category:
-                query = query.filter(Ticket.category_id == category.id)
-            else:
-                print(f"Category not found in search: {category_name}")
-                return []
-        if date_from:
-            try:
-                if 'T' in date_from:
-                    date_from_obj = datetime.fromisoformat(date_from.replace('Z', '+00:00'))
-                else:
-                    date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
-                query = query.filter(Ticket.created_at >= date_from_obj)
-            except Exception as e:
-                print(f"Error parsing date_from in search empty: {e}, value: {date_from}")
-                pass
-        if date_to:
-            try:
-                if 'T' in date_to:
-                    date_to_obj = datetime.fromisoformat(date_to.replace('Z', '+00:00'))
-                else:
-                    date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
-                from datetime import timedelta
-                date_to_obj = date_to_obj + timedelta(days=1)
-                query = query.filter(Ticket.created_at < date_to_obj)
-            except Exception as e:
-                print(f"Error parsing date_to in search empty: {e}, value: {date_to}")
-                pass
-        tickets = query.order_by(Ticket.created_at.desc()).offset(offset).limit(limit).all()
-        return tickets
+    """
+    Поиск тикетов по тексту в subject и body с фильтрацией.
+    По умолчанию результаты упорядочены по релевантности; sort=created_at
+    упорядочивает по дате и включает курсорную пагинацию (с sort=relevance
+    курсор не принимается - 400).
+    """
+    by_date = sort == "created_at"
+    if cursor and not by_date:
+        raise HTTPException(status_code=400, detail="cursor requires sort=created_at")
+    query = _ticket_query(db, fields)
     
-    search_term = f"%{q.strip()}%"
+    # Если поисковый запрос пустой, возвращаем обычный список с фильтрами
+    if q and q.strip():
+        query = search_service.apply_search(db, query, q.strip(), mode, ranked=not by_date)
     
-    # Ищем в subject и body тикета (case-insensitive)
-    query = db.query(Ticket).filter(
-        (Ticket.subject.ilike(search_term)) | 
-        (Ticket.body.ilike(search_term))
-    )
+    query = _apply_ticket_filters(db, query, status, category_id, category_name, date_from, date_to)
+    if query is None:
+        return []
     
-    # Применяем фильтры
-    if status:
-        query = query.filter(Ticket.status == status)
-    
-    if category_id:
-        query = query.filter(Ticket.category_id == category_id)
-    elif category_name:
-        category = db.query(Category).filter(
-            Category.name.ilike(f"%{category_name}%")
-        ).first()
-        if category:
-            query = query.filter(Ticket.category_id == category.id)
-        else:
-            print(f"Category not found in search empty: {category_name}")
-            return []
+    if by_date:
+        return _paginate(query, response, limit, offset, cursor)
     
-    if date_from:
-        try:
-            if 'T' in date_from:
-                date_from_obj = datetime.fromisoformat(date_from.replace('Z', '+00:00'))
-            else:
-                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
-            query = query.filter(Ticket.created_at >= date_from_obj)
-        except Exception as e:
-            print(f"Error parsing date_from in search main: {e}, value: {date_from}")
-            pass
+    tickets = query.order_by(Ticket.created_at.desc()).offset(offset).limit(limit).all()
+    return tickets
+
+
+@router.get("/facets", response_model=TicketFacetsResponse)
+def get_ticket_facets(
+    status: Optional[TicketStatus] = None,
+    category_id: Optional[UUID] = None,
+    category_name: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Количество тикетов по статусу, категории, приоритету, источнику и департаменту
+    для тех же фильтров, что у списка (один групповой запрос, кэш на несколько секунд)
+    """
+    query = _apply_ticket_filters(
+        db, db.query(Ticket), status, category_id, category_name, date_from, date_to
+    )
+    if query is None:
+        return TicketFacetsResponse(total=0, status=[], category=[], priority=[], source=[], department=[])
     
-    if date_to:
-        try:
-            if 'T' in date_to:
-                date_to_obj = datetime.fromisoformat(date_to.replace('Z', '+00:00'))
+    cache_key = (status, category_id, category_name, date_from, date_to)
+    return facet_service.get_facets(db, query, cache_key)
+
+
+# Колонки выгрузки - те же поля, что в TicketResponse
+TICKET_EXPORT_FIELDS = list(TicketResponse.model_fields)
+
+
+def _export_value(value):
+    """Значение колонки в виде, пригодном для JSON и CSV"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _export_rows(
+    format: str,
+    status: Optional[TicketStatus],
+    category_id: Optional[UUID],
+    category_name: Optional[str],
+    date_from: Optional[str],
+    date_to: Optional[str]
+):
+    """
+    Генератор выгрузки: строки читаются серверным курсором пачками по
+    TICKET_EXPORT_BATCH_SIZE и сразу отдаются клиенту, поэтому память не
+    зависит от размера выгрузки. Использует собственную сессию: ответ
+    передается уже после выхода из обработчика.
+    """
+    db = SessionLocal()
+    try:
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(TICKET_EXPORT_FIELDS)
+            yield buffer.getvalue()
+        
+        query = _apply_ticket_filters(
+            db,
+            db.query(*[getattr(Ticket, name) for name in TICKET_EXPORT_FIELDS]),
+            status, category_id, category_name, date_from, date_to
+        )
+        if query is None:
+            return
+        
+        result = db.execute(
+            query.order_by(Ticket.created_at.asc(), Ticket.id.asc()).statement,
+            execution_options={"yield_per": TICKET_EXPORT_BATCH_SIZE}
+        )
+        for batch in result.partitions():
+            if format == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([_export_value(value) for value in row] for row in batch)
+                yield buffer.getvalue()
             else:
-                date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
-            from datetime import timedelta
-            date_to_obj = date_to_obj + timedelta(days=1)
-            query = query.filter(Ticket.created_at < date_to_obj)
-        except Exception as e:
-            print(f"Error parsing date_to in search main: {e}, value: {date_to}")
-            pass
+                yield "".join(
+                    json.dumps(
+                        {name: _export_value(value) for name, value in zip(TICKET_EXPORT_FIELDS, row)},
+                        ensure_ascii=False
+                    ) + "\n"
+                    for row in batch
+                )
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def export_tickets(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson или csv"),
+    status: Optional[TicketStatus] = None,
+    category_id: Optional[UUID] = None,
+    category_name: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None
+):
+    """
+    Потоковая выгрузка тикетов (NDJSON или CSV) с теми же фильтрами, что у списка.
+    Тикеты упорядочены по дате создания; данные начинают передаваться сразу.
+    """
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_rows(format, status, category_id, category_name, date_from, date_to),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=tickets.{format}"}
+    )
+
+
+@router.get("/semantic_search", response_model=List[TicketSemanticSearchResult])
+async def semantic_search(
+    q: Optional[str] = Query(None, description="Текст запроса"),
+    similar_to: Optional[UUID] = Query(None, description="Найти тикеты, похожие на этот"),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Семантический поиск: тикеты, близкие по смыслу к тексту запроса
+    (или к тексту тикета similar_to), по убыванию сходства
+    """
+    exclude = []
+    if similar_to:
+        source = await run_in_threadpool(
+            lambda: db.query(Ticket).filter(Ticket.id == similar_to).first()
+        )
+        if not source:
+            raise HTTPException(status_code=404, detail="Ticket not found")
+        q = f"{source.subject or ''} {source.body}".strip()
+        exclude = [similar_to]
+    
+    if not q or not q.strip():
+        raise HTTPException(status_code=400, detail="Either q or similar_to is required")
+    
+    matches = await semantic_search_service.search_async(q.strip(), limit, exclude)
+    if matches is None:
+        raise HTTPException(status_code=503, detail="Semantic search is unavailable")
+    if not matches:
+        return []
+    
+    similarity_by_id = dict(matches)
+    tickets = await run_in_threadpool(
+        lambda: db.query(Ticket).filter(Ticket.id.in_(list(similarity_by_id))).all()
+    )
+    tickets_by_id = {ticket.id: ticket for ticket in tickets}
     
-    tickets = query.order_by(Ticket.created_at.desc()).offset(offset).limit(limit).all()
-    return tickets
+    # Порядок - по сходству; тикеты, которых уже нет в БД, пропускаем
+    return [
+        TicketSemanticSearchResult(
+            **TicketResponse.model_validate(tickets_by_id[ticket_id]).model_dump(),
+            similarity=similarity
+        )
+        for ticket_id, similarity in matches
+        if ticket_id in tickets_by_id
+    ]
 
 
 @router.get("/{ticket_id}", response_model=TicketResponse)
 def get_ticket(
     ticket_id: UUID,
+    response: Response,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
     db: Session = Depends(get_db)
 ):
-    """Получает тикет по ID"""
+    """Получает тикет по ID (ETag - по updated_at, без изменений - 304)"""
     ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
+    
+    etag = make_etag(ticket.id, ticket.updated_at)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return ticket
 
 
+@router.get("/{ticket_id}/full", response_model=TicketFullResponse)
+def get_ticket_full(
+    ticket_id: UUID,
+    db: Session = Depends(get_db)
+):
+    """
+    Все данные страницы тикета за один запрос: тикет, комментарии с отправителями,
+    история с авторами, оценка и последнее предсказание ИИ.
+    Фиксированное число запросов к БД (6) независимо от длины переписки.
+    """
+    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    
+    messages = db.query(TicketMessage).filter(
+        TicketMessage.ticket_id == ticket_id
+    ).order_by(TicketMessage.created_at.asc(), TicketMessage.id.asc()).all()
+    history_items = db.query(TicketHistory).filter(
+        TicketHistory.ticket_id == ticket_id
+    ).order_by(TicketHistory.created_at.asc()).all()
+    # Отправители комментариев и авторы истории - одним запросом
+    users = load_users(
+        db,
+        [msg.sender_id for msg in messages] + [item.user_id for item in history_items]
+    )
+    feedback = db.query(Feedback).filter(Feedback.ticket_id == ticket_id).first()
+    latest_prediction = db.query(AIPrediction).filter(
+        AIPrediction.ticket_id == ticket_id
+    ).order_by(AIPrediction.created_at.desc()).first()
+    
+    return TicketFullResponse(
+        ticket=TicketResponse.model_validate(ticket),
+        comments=[to_comment_response(msg, users.get(msg.sender_id)) for msg in messages],
+        history=[to_history_response(item, users.get(item.user_id)) for item in history_items],
+        feedback=to_feedback_response(feedback) if feedback else None,
+        latest_prediction=latest_prediction
+    )
+
+
 @router.put("/{ticket_id}", response_model=TicketResponse)
 def update_ticket(
     ticket_id: UUID,
     update_data: TicketUpdate,
+    background_tasks: BackgroundTasks,
     authorization: Optional[str] = Header(None, alias="Authorization"),
     db: Session = Depends(get_db)
 ):
@@ -374,6 +836,7 @@ def update_ticket(
     ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
+    was_open = semantic_search_service.is_open(ticket)
     
     # Проверяем права доступа, если пользователь пытается закрыть тикет
     if update_data.status == TicketStatus.CLOSED:
@@ -444,12 +907,23 @@ def update_ticket(
     db.commit()
     db.refresh(ticket)
     
+    # Индекс поиска дубликатов содержит только открытые тикеты
+    is_open = semantic_search_service.is_open(ticket)
+    if was_open and not is_open:
+        background_tasks.add_task(semantic_search_service.remove_from_open_index_async, [ticket.id])
+    elif is_open and not was_open:
+        background_tasks.add_task(
+            semantic_search_service.index_tickets_async,
+            [semantic_search_service.ticket_payload(ticket)]
+        )
+    
     return ticket
 
 
 @router.delete("/{ticket_id}")
 def delete_ticket(
     ticket_id: UUID,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Удаляет тикет (soft delete - меняет статус на closed)"""
@@ -463,6 +937,7 @@ def delete_ticket(
     ticket.updated_at = datetime.utcnow()
     
     db.commit()
+    background_tasks.add_task(semantic_search_service.remove_from_open_index_async, [ticket_id])
     
     return {"message": "Ticket deleted successfully", "ticket_id": str(ticket_id)}
 
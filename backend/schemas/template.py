@@ -37,3 +37,10 @@ class TemplateResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+
+class TemplateRenderResponse(BaseModel):
+    """Схема ответа с заполненным шаблоном"""
+    template_id: str
+    ticket_id: str
+    content: str  # Текст шаблона с подставленными значениями
@@ -2,10 +2,13 @@
 Pydantic schemas for Ticket
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 from uuid import UUID
 from models.ticket import TicketSource, TicketLanguage, TicketPriority, TicketStatus, IssueType
+from schemas.comment import CommentResponse
+from schemas.feedback import FeedbackResponse
+from schemas.ticket_history import TicketHistoryResponse
 
 
 class TicketCreate(BaseModel):
@@ -38,11 +41,81 @@ class TicketResponse(BaseModel):
     closed_at: Optional[datetime]
     sla_deadline: Optional[datetime] = None
     is_escalated: bool = False
+    master_ticket_id: Optional[UUID] = None  # Если тикет - дубликат открытого тикета
     
     class Config:
         from_attributes = True
 
 
+class TicketSummaryResponse(BaseModel):
+    """Краткая схема тикета для списков (?fields=summary): без полного текста"""
+    id: UUID
+    source: TicketSource
+    user_id: UUID
+    subject: Optional[str]
+    body_preview: str  # Начало текста тикета (TICKET_PREVIEW_LENGTH символов)
+    category_id: Optional[UUID]
+    priority: Optional[TicketPriority]
+    issue_type: Optional[IssueType]
+    assigned_department_id: Optional[UUID]
+    assigned_operator_id: Optional[UUID]
+    status: TicketStatus
+    auto_resolved: bool
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    sla_deadline: Optional[datetime] = None
+    is_escalated: bool = False
+    master_ticket_id: Optional[UUID] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class TicketFacetBucket(BaseModel):
+    """Значение фасета и количество тикетов с ним"""
+    value: Optional[str]  # Значение (enum или id); None - не задано
+    name: Optional[str] = None  # Название категории/департамента
+    count: int
+
+
+class TicketFacetsResponse(BaseModel):
+    """Количество тикетов по фасетам (для дашборда)"""
+    total: int
+    status: List[TicketFacetBucket]
+    category: List[TicketFacetBucket]
+    priority: List[TicketFacetBucket]
+    source: List[TicketFacetBucket]
+    department: List[TicketFacetBucket]
+
+
+class TicketPredictionResponse(BaseModel):
+    """Предсказание ИИ для тикета"""
+    id: UUID
+    model_id: UUID
+    predicted_category_id: Optional[UUID]
+    predicted_priority: Optional[TicketPriority]
+    predicted_issue_type: Optional[IssueType]
+    confidence: float
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class TicketFullResponse(BaseModel):
+    """Тикет со всеми данными страницы тикета (один запрос вместо нескольких)"""
+    ticket: TicketResponse
+    comments: List[CommentResponse]
+    history: List[TicketHistoryResponse]
+    feedback: Optional[FeedbackResponse] = None
+    latest_prediction: Optional[TicketPredictionResponse] = None
+
+
+class TicketSemanticSearchResult(TicketResponse):
+    """Тикет в результатах семантического поиска"""
+    similarity: float  # Косинусное сходство с запросом (0..1)
+
+
 class TicketUpdate(BaseModel):
     """Схема для обновления тикета"""
     status: Optional[TicketStatus] = None
@@ -51,3 +124,27 @@ class TicketUpdate(BaseModel):
     assigned_department_id: Optional[UUID] = None
     assigned_operator_id: Optional[UUID] = None
 
+
+
+class TicketBulkCreate(BaseModel):
+    """Схема для массового импорта тикетов"""
+    tickets: List[TicketCreate] = Field(..., min_length=1, max_length=10000)
+
+
+class TicketBulkItemResult(BaseModel):
+    """Результат импорта одного тикета (index - позиция в исходном списке)"""
+    index: int
+    success: bool
+    ticket_id: Optional[UUID] = None
+    status: Optional[TicketStatus] = None
+    error: Optional[str] = None
+    ml_fallback: bool = False  # ML сервис недоступен - классификация по умолчанию
+
+
+class TicketBulkResponse(BaseModel):
+    """Схема ответа массового импорта"""
+    total: int
+    created: int
+    failed: int
+    ml_fallback: int = 0  # Сколько созданных тикетов получили классификацию по умолчанию
+    results: List[TicketBulkItemResult]
@@ -3,13 +3,29 @@ Business logic services
 """
 from .ai_classifier import AIClassifier
 from .ai_router import AIRouter
-from .auto_resolver import AutoResolver
+from .audit_writer import AuditWriter
 from .stats_service import StatsService
+from .bulk_import_service import BulkImportService
+from .duplicate_detector import DuplicateDetector
+from .facet_service import FacetService
+from .notification_service import NotificationService
+from .reference_cache import ReferenceCache
+from .search_service import SearchService
+from .semantic_search_service import SemanticSearchService
+from .template_catalog import TemplateCatalog
 
 __all__ = [
     "AIClassifier",
     "AIRouter",
-    "AutoResolver",
+    "AuditWriter",
     "StatsService",
+    "BulkImportService",
+    "DuplicateDetector",
+    "FacetService",
+    "NotificationService",
+    "ReferenceCache",
+    "SearchService",
+    "SemanticSearchService",
+    "TemplateCatalog",
 ]
 
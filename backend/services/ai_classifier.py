@@ -1,10 +1,14 @@
 """
 AI Classifier Service - классификация тикетов с помощью ML
 """
+import asyncio
 import requests
+import httpx
 import os
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
 from models.ticket import TicketPriority, IssueType
+from services.ml_client import get_async_client
 
 
 class AIClassifier:
@@ -12,14 +16,26 @@ class AIClassifier:
     
     def __init__(self):
         self.ml_service_url = os.getenv("ML_SERVICE_URL", "http://localhost:8000")
+        # Пакетная классификация: размер пачки для /predict_batch и число одновременных запросов
+        self.batch_size = int(os.getenv("ML_PREDICT_BATCH_SIZE", "64"))
+        self.batch_concurrency = int(os.getenv("ML_BATCH_CONCURRENCY", "4"))
     
-    def classify(
-        self, 
-        subject: str, 
-        body: str
+    def classify_with_reply(
+        self,
+        subject: str,
+        body: str,
+        duplicate_threshold: Optional[float] = None,
+        max_duplicate_candidates: int = 10
     ) -> Dict:
         """
-        Классифицирует тикет и возвращает категорию, приоритет, тип проблемы и уверенность
+        Классификация и автоответ за один запрос к ML сервису (/predict_and_reply).
+        ML сервис кодирует текст один раз и использует эмбеддинг и для
+        классификаторов, и для поиска шаблона ответа.
+        
+        Args:
+            duplicate_threshold: если задан, ML сервис также ищет в индексе
+                открытых тикетов тикеты со сходством не ниже порога
+            max_duplicate_candidates: сколько похожих тикетов вернуть
         
         Returns:
             {
@@ -32,47 +48,152 @@ class AIClassifier:
                     "problem_type": float
                 }
             }
+            плюс ключи "auto_reply" - текст автоматического
+            ответа или None, если тикет нельзя решить автоматически, и
+            "duplicate_candidates" - [(ticket_id, similarity)] открытых тикетов
+            (классификация и автоответ возвращаются и при найденных кандидатах)
         """
         try:
-            # ML сервис (app.py) ожидает: {"text": str, "subject": Optional[str]}
-            # Объединяем subject и body в text
-            full_text = f"{subject or ''} {body}".strip()
-            payload = {
-                "text": full_text,
-                "subject": subject or ""
-            }
             response = requests.post(
-                f"{self.ml_service_url}/predict",
-                json=payload,
+                f"{self.ml_service_url}/predict_and_reply",
+                json=self._build_payload(subject, body, duplicate_threshold, max_duplicate_candidates),
                 timeout=10
             )
             response.raise_for_status()
-            result = response.json()
-            
-            # Преобразуем ответ ML сервиса в нужный формат
-            return {
-                "category": result.get("category", "Общие вопросы"),
-                "priority": self._map_priority(result.get("priority", "Средний")),
-                "issue_type": self._map_issue_type(result.get("problem_type", "Сложный")),
-                "confidence": result.get("confidence", {
-                    "category": 0.5,
-                    "priority": 0.5,
-                    "problem_type": 0.5
-                })
-            }
+            return self._parse_combined_result(response.json())
         except requests.exceptions.RequestException as e:
             print(f"Error calling ML service: {e}")
-            # Fallback значения
-            return {
-                "category": "Общие вопросы",
-                "priority": TicketPriority.MEDIUM,
-                "issue_type": IssueType.COMPLEX,
-                "confidence": {
-                    "category": 0.3,
-                    "priority": 0.3,
-                    "problem_type": 0.3
-                }
+            return self._fallback_combined_result()
+    
+    async def classify_with_reply_async(
+        self,
+        subject: str,
+        body: str,
+        duplicate_threshold: Optional[float] = None,
+        max_duplicate_candidates: int = 10
+    ) -> Dict:
+        """Асинхронная версия classify_with_reply"""
+        try:
+            client = get_async_client()
+            response = await client.post(
+                "/predict_and_reply",
+                json=self._build_payload(subject, body, duplicate_threshold, max_duplicate_candidates)
+            )
+            response.raise_for_status()
+            return self._parse_combined_result(response.json())
+        except httpx.HTTPError as e:
+            print(f"Error calling ML service: {e}")
+            return self._fallback_combined_result()
+    
+    async def classify_with_reply_batch_async(
+        self,
+        items: List[Tuple[Optional[str], str]]
+    ) -> List[Dict]:
+        """
+        Пакетная классификация для импорта: список (subject, body) -> список
+        результатов в том же порядке (формат как у classify_with_reply).
+        
+        Тикеты отправляются в /predict_batch пачками по batch_size
+        (ML сервис кодирует пачку одним вызовом модели); одновременно
+        выполняется не более batch_concurrency запросов. Если ML сервис
+        недоступен или вернул некорректный ответ, тикеты пачки получают
+        fallback классификацию с ключом "ml_fallback": True.
+        """
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+        
+        async def classify_chunk(chunk: List[Tuple[Optional[str], str]]) -> List[Dict]:
+            async with semaphore:
+                try:
+                    client = get_async_client()
+                    response = await client.post("/predict_batch", json={
+                        "tickets": [self._build_payload(subject, body) for subject, body in chunk],
+                        "include_auto_reply": True
+                    })
+                    response.raise_for_status()
+                    results = [self._parse_combined_result(r) for r in response.json()["results"]]
+                    if len(results) != len(chunk):
+                        raise ValueError(f"expected {len(chunk)} results, got {len(results)}")
+                    return results
+                except httpx.HTTPError as e:
+                    print(f"Error calling ML service: {e}")
+                except (AttributeError, KeyError, TypeError, ValueError) as e:
+                    print(f"Invalid ML service response: {e}")
+                return [self._fallback_combined_result() for _ in chunk]
+        
+        chunks = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+        chunk_results = await asyncio.gather(*(classify_chunk(chunk) for chunk in chunks))
+        return [result for chunk_result in chunk_results for result in chunk_result]
+    
+    def _build_payload(
+        self,
+        subject: str,
+        body: str,
+        duplicate_threshold: Optional[float] = None,
+        max_duplicate_candidates: int = 10
+    ) -> Dict:
+        """Формирует запрос к ML сервису"""
+        # ML сервис (app.py) ожидает: {"text": str, "subject": Optional[str]}
+        # Объединяем subject и body в text
+        full_text = f"{subject or ''} {body}".strip()
+        payload = {
+            "text": full_text,
+            "subject": subject or ""
+        }
+        if duplicate_threshold is not None:
+            payload["detect_duplicates"] = True
+            payload["duplicate_threshold"] = duplicate_threshold
+            payload["max_duplicate_candidates"] = max_duplicate_candidates
+        return payload
+    
+    def _parse_result(self, result: Dict) -> Dict:
+        """Преобразует ответ ML сервиса в нужный формат"""
+        return {
+            "category": result.get("category", "Общие вопросы"),
+            "priority": self._map_priority(result.get("priority", "Средний")),
+            "issue_type": self._map_issue_type(result.get("problem_type", "Сложный")),
+            "confidence": result.get("confidence", {
+                "category": 0.5,
+                "priority": 0.5,
+                "problem_type": 0.5
+            })
+        }
+    
+    def _parse_combined_result(self, result: Dict) -> Dict:
+        """Преобразует ответ /predict_and_reply: классификация + текст автоответа"""
+        ml_result = self._parse_result(result.get("prediction") or {})
+        ml_result["duplicate_candidates"] = [
+            (UUID(item["ticket_id"]), item["similarity"])
+            for item in result.get("duplicates") or []
+        ]
+        
+        # Автоматическое решение только для типовых проблем
+        auto_reply = result.get("auto_reply") or {}
+        ml_result["auto_reply"] = None
+        if ml_result["issue_type"] == IssueType.AUTO_RESOLVABLE and auto_reply.get("can_auto_reply", False):
+            ml_result["auto_reply"] = auto_reply.get("response_text", None)
+        
+        return ml_result
+    
+    def _fallback_combined_result(self) -> Dict:
+        """Fallback для /predict_and_reply: без автоответа"""
+        ml_result = self._fallback_result()
+        ml_result["auto_reply"] = None
+        ml_result["duplicate_candidates"] = []
+        ml_result["ml_fallback"] = True
+        return ml_result
+    
+    def _fallback_result(self) -> Dict:
+        """Fallback значения, если ML сервис недоступен"""
+        return {
+            "category": "Общие вопросы",
+            "priority": TicketPriority.MEDIUM,
+            "issue_type": IssueType.COMPLEX,
+            "confidence": {
+                "category": 0.3,
+                "priority": 0.3,
+                "problem_type": 0.3
             }
+        }
     
     def _map_priority(self, priority_str: str) -> TicketPriority:
         """Преобразует строку приоритета в enum"""
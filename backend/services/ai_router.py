@@ -4,8 +4,7 @@ AI Router Service - маршрутизация тикетов по департ
 from typing import Optional
 from uuid import UUID
 from sqlalchemy.orm import Session
-from models.department import Department
-from models.category import Category
+from services.reference_cache import reference_cache
 
 
 class AIRouter:
@@ -37,31 +36,31 @@ class AIRouter:
         # Логика маршрутизации по категории
         category_lower = category_name.lower()
         
-        # Ищем существующий департамент по категории
+        # Ищем существующий департамент по категории (в кэше справочников)
         if "биллинг" in category_lower or "платеж" in category_lower:
-            dept = db.query(Department).filter(Department.name.ilike("%Billing%")).first()
-            if dept:
-                return dept.id
+            department_id = reference_cache.find_department_id(db, "Billing")
+            if department_id:
+                return department_id
         
         if "техническая" in category_lower or "it" in category_lower:
-            dept = db.query(Department).filter(Department.name.ilike("%Tech%")).first()
-            if dept:
-                return dept.id
+            department_id = reference_cache.find_department_id(db, "Tech")
+            if department_id:
+                return department_id
         
         if "hr" in category_lower or "кадр" in category_lower:
-            dept = db.query(Department).filter(Department.name.ilike("%HR%")).first()
-            if dept:
-                return dept.id
+            department_id = reference_cache.find_department_id(db, "HR")
+            if department_id:
+                return department_id
         
         if "клиентский" in category_lower or "сервис" in category_lower:
-            dept = db.query(Department).filter(Department.name.ilike("%Customer%")).first()
-            if dept:
-                return dept.id
+            department_id = reference_cache.find_department_id(db, "Customer")
+            if department_id:
+                return department_id
         
         # По умолчанию - общая поддержка
-        dept = db.query(Department).filter(Department.name.ilike("%General%")).first()
-        if dept:
-            return dept.id
+        department_id = reference_cache.find_department_id(db, "General")
+        if department_id:
+            return department_id
         
         return None
 
@@ -0,0 +1,428 @@
+"""
+Audit Writer - запись истории изменений тикетов (audit log)
+
+Режим задается AUDIT_WRITER_MODE:
+    sync     - запись истории добавляется в транзакцию запроса (по умолчанию)
+    buffered - записи передаются фоновому потоку и пишутся в БД пачками
+
+В режиме buffered записи копятся в сессии и перед commit запроса дописываются
+в локальный журнал (JSON строка на запись, fsync до commit в БД). После commit
+записи ставятся в ограниченную очередь; если транзакция откатилась, в журнал
+дописывается отметка об откате, и эти записи не вставляются. Фоновый поток
+вставляет записи в БД пачками до AUDIT_FLUSH_BATCH_SIZE строк не реже чем раз
+в AUDIT_FLUSH_INTERVAL секунд и сохраняет в <журнал>.offset позицию, до которой
+все записи уже в БД или отменены.
+
+У каждого процесса свой журнал AUDIT_WAL_PATH.<pid>, заблокированный (flock)
+на время работы процесса. При старте процесс вставляет записи из журналов,
+которые никем не заблокированы (их процессы остановлены), после сохраненной
+позиции (дубликаты по id пропускаются) и удаляет эти журналы, поэтому записи,
+не попавшие в БД из-за остановки процесса, не теряются. Если процесс остановлен
+между записью в журнал и commit в БД, запись истории все равно вставляется:
+журнал гарантирует "хотя бы один раз" (запись об удаленном или не созданном
+тикете пропускается по внешнему ключу).
+
+История в режиме buffered появляется в БД с задержкой до AUDIT_FLUSH_INTERVAL
+секунд. Если очередь переполнена, записи вставляются в БД сразу в потоке
+запроса.
+"""
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models.ticket_history import TicketHistory, HistoryAction
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+AUDIT_WRITER_MODE = os.getenv("AUDIT_WRITER_MODE", "sync").lower()
+AUDIT_WAL_PATH = os.getenv("AUDIT_WAL_PATH", "audit_wal.jsonl")
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_FLUSH_BATCH_SIZE = int(os.getenv("AUDIT_FLUSH_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+
+# Ключи session.info: записи, ожидающие commit запроса, и уже записанные
+# в журнал перед commit - [(запись, позиция начала записи в журнале)]
+_PENDING_KEY = "audit_writer_pending"
+_LOGGED_KEY = "audit_writer_logged"
+
+
+class AuditWriter:
+    """Запись истории тикетов: синхронно или через очередь с журналом на диске"""
+
+    def __init__(self, mode: str = AUDIT_WRITER_MODE, wal_path: str = AUDIT_WAL_PATH,
+                 queue_size: int = AUDIT_QUEUE_SIZE, batch_size: int = AUDIT_FLUSH_BATCH_SIZE,
+                 flush_interval: float = AUDIT_FLUSH_INTERVAL):
+        self.mode = mode
+        self.wal_path = wal_path
+        # Журнал этого процесса (задается при start)
+        self.process_wal_path: Optional[str] = None
+        self.checkpoint_path: Optional[str] = None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Элементы очереди: (запись, позиция начала записи в журнале)
+        self._queue: "queue.Queue[Tuple[dict, int]]" = queue.Queue(maxsize=queue_size)
+        self._wal_lock = threading.Lock()
+        self._wal_file = None
+        # Позиции записей журнала, которые еще не в БД и не отменены откатом
+        self._unflushed = set()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._running = False
+
+    @property
+    def buffered(self) -> bool:
+        return self.mode == "buffered" and self._running
+
+    # --- Запись ---
+
+    def write(self, db: Session, history: TicketHistory):
+        """Добавляет запись истории (в транзакцию db или в очередь после commit)"""
+        if not self.buffered:
+            db.add(history)
+            return
+        db.info.setdefault(_PENDING_KEY, []).append(self._to_record(history))
+
+    # События сессии обрабатываются только для внешней транзакции (не SAVEPOINT)
+
+    def _before_commit(self, session: Session):
+        if session.in_nested_transaction():
+            return
+        records = session.info.pop(_PENDING_KEY, None)
+        if records:
+            session.info.setdefault(_LOGGED_KEY, []).extend(self._append(records))
+
+    def _after_commit(self, session: Session):
+        if session.in_nested_transaction():
+            return
+        logged = session.info.pop(_LOGGED_KEY, None)
+        if logged:
+            self._enqueue(logged)
+
+    def _after_rollback(self, session: Session):
+        if session.in_nested_transaction():
+            return
+        session.info.pop(_PENDING_KEY, None)
+        logged = session.info.pop(_LOGGED_KEY, None)
+        if logged:
+            self._cancel(logged)
+
+    def _append(self, records: List[dict]) -> List[Tuple[dict, int]]:
+        """Дописывает записи в журнал и ждет fsync (до commit запроса в БД)"""
+        logged = []
+        with self._wal_lock:
+            for record in records:
+                logged.append((record, self._wal_file.tell()))
+                self._write_line(record)
+            self._sync()
+            self._unflushed.update(start for _, start in logged)
+        return logged
+
+    def _enqueue(self, logged: List[Tuple[dict, int]]):
+        overflow = []
+        with self._wal_lock:
+            for item in logged:
+                # Очередь пополняется только под блокировкой, поэтому put не заблокируется
+                if 0 < self._queue.maxsize <= self._queue.qsize():
+                    overflow.append(item)
+                else:
+                    self._queue.put_nowait(item)
+        if overflow:
+            print(f"Warning: Audit queue is full, writing {len(overflow)} history records synchronously")
+            self._insert_now([record for record, _ in overflow])
+            self._release([start for _, start in overflow])
+
+    def _cancel(self, logged: List[Tuple[dict, int]]):
+        """Отмечает в журнале записи откатившейся транзакции, чтобы их не вставил replay"""
+        with self._wal_lock:
+            self._write_line({"rollback": [record["id"] for record, _ in logged]})
+            self._sync()
+        self._release([start for _, start in logged])
+
+    # --- Запуск и остановка ---
+
+    def start(self):
+        """Вставляет записи журнала, не попавшие в БД, и запускает фоновый поток"""
+        if self.mode != "buffered" or self._running:
+            return
+        replayed = self._replay_orphans()
+        if replayed:
+            print(f"✅ Audit log: replayed {replayed} history records from {self.wal_path}.*")
+        self._wal_file = self._open_process_wal()
+        event.listen(Session, "before_commit", self._before_commit)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_rollback", self._after_rollback)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        self._running = True
+
+    def stop(self, timeout: float = 10.0):
+        """Записывает накопленные записи в БД и останавливает фоновый поток"""
+        if not self._running:
+            return
+        self._running = False
+        event.remove(Session, "before_commit", self._before_commit)
+        event.remove(Session, "after_commit", self._after_commit)
+        event.remove(Session, "after_rollback", self._after_rollback)
+        self._stopping.set()
+        self._thread.join(timeout)
+        with self._wal_lock:
+            # Все записи в БД - журнал не нужен; иначе его вставит следующий запуск
+            drained = not self._unflushed
+            self._wal_file.close()  # Снимает блокировку журнала
+            self._wal_file = None
+            if drained:
+                _remove_files(self.process_wal_path, self.checkpoint_path)
+
+    # --- Фоновый поток ---
+
+    def _run(self):
+        batch: List[Tuple[dict, int]] = []
+        while True:
+            if not batch:
+                try:
+                    batch.append(self._queue.get(timeout=self.flush_interval))
+                except queue.Empty:
+                    if self._stopping.is_set():
+                        return
+                    continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._flush([record for record, _ in batch])
+            except Exception as e:
+                # БД недоступна - повторяем ту же пачку позже (записи остаются в журнале)
+                print(f"Error writing audit log batch ({len(batch)} records): {e}")
+                if self._stopping.is_set():
+                    return
+                time.sleep(self.flush_interval)
+                continue
+
+            self._release([start for _, start in batch])
+            batch = []
+
+    def _flush(self, records: List[dict]):
+        """Вставляет записи одним запросом; строки, нарушающие ограничения, пропускаются"""
+        db = SessionLocal()
+        try:
+            try:
+                _insert_ignore_duplicates(db, records)
+                db.commit()
+            except IntegrityError:
+                # Например, тикет удален до записи истории - вставляем по одной
+                db.rollback()
+                for record in records:
+                    try:
+                        _insert_ignore_duplicates(db, [record])
+                        db.commit()
+                    except IntegrityError as e:
+                        db.rollback()
+                        print(f"❌ Skipping audit record {record['id']}: {e.orig}")
+        finally:
+            db.close()
+
+    def _insert_now(self, records: List[dict]):
+        try:
+            self._flush(records)
+        except Exception as e:
+            print(f"Error writing audit log records: {e}")
+
+    # --- Журнал ---
+
+    def _open_process_wal(self):
+        """Создает журнал процесса и блокирует его до остановки процесса"""
+        self.process_wal_path = f"{self.wal_path}.{os.getpid()}"
+        self.checkpoint_path = f"{self.process_wal_path}.offset"
+        # Журнал блокируется до появления под своим именем, чтобы другой процесс
+        # не принял его за журнал остановленного процесса (в Windows открытый
+        # файл нельзя переименовать - создается сразу под своим именем)
+        tmp_path = f"{self.process_wal_path}.new" if fcntl is not None else self.process_wal_path
+        wal_file = open(tmp_path, "wb")
+        if not _try_lock(wal_file):
+            wal_file.close()
+            raise RuntimeError(f"Audit log {tmp_path} is locked by another process")
+        if tmp_path != self.process_wal_path:
+            os.replace(tmp_path, self.process_wal_path)
+        self._save_checkpoint(0)
+        return wal_file
+
+    def _orphan_paths(self) -> List[str]:
+        """Журналы процессов (и общий журнал прежних версий) по AUDIT_WAL_PATH"""
+        paths = [
+            path for path in glob.glob(f"{glob.escape(self.wal_path)}.*")
+            if path[len(self.wal_path) + 1:].isdigit()
+        ]
+        if os.path.exists(self.wal_path):
+            paths.append(self.wal_path)
+        return paths
+
+    def _replay_orphans(self) -> int:
+        """Вставляет записи из журналов остановленных процессов и удаляет эти журналы"""
+        replayed = 0
+        for path in self._orphan_paths():
+            try:
+                wal = open(path, "rb")
+            except FileNotFoundError:
+                continue  # Уже обработан другим процессом
+            with wal:
+                # Журнал работающего процесса заблокирован
+                if not _try_lock(wal):
+                    continue
+                # Пока ждали блокировку, журнал мог быть обработан и удален
+                if not os.path.exists(path) or os.stat(path).st_ino != os.fstat(wal.fileno()).st_ino:
+                    continue
+                replayed += self._replay(wal, f"{path}.offset")
+                _remove_files(path, f"{path}.offset")
+        return replayed
+
+    def _replay(self, wal, checkpoint_path: str) -> int:
+        """Вставляет записи журнала после сохраненной позиции (кроме откатившихся)"""
+        records = []
+        rolled_back = set()
+        wal.seek(min(_read_offset(checkpoint_path), os.fstat(wal.fileno()).st_size))
+        for line in wal:
+            if not line.endswith(b"\n"):
+                break  # Запись оборвана при остановке процесса
+            entry = json.loads(line.decode("utf-8"))
+            if "rollback" in entry:
+                rolled_back.update(entry["rollback"])
+            else:
+                records.append(entry)
+        records = [record for record in records if record["id"] not in rolled_back]
+        for start in range(0, len(records), self.batch_size):
+            self._flush(records[start:start + self.batch_size])
+        return len(records)
+
+    def _write_line(self, entry: dict):
+        self._wal_file.write((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def _sync(self):
+        self._wal_file.flush()
+        os.fsync(self._wal_file.fileno())
+
+    def _release(self, starts: List[int]):
+        """
+        Снимает записи (вставлены в БД или отменены) и сдвигает позицию журнала
+        к самой ранней оставшейся записи; если не осталось ни одной - очищает журнал
+        """
+        with self._wal_lock:
+            self._unflushed.difference_update(starts)
+            if self._wal_file is None:
+                return
+            if self._unflushed:
+                self._save_checkpoint(min(self._unflushed))
+                return
+            self._wal_file.truncate(0)
+            self._wal_file.seek(0)
+            self._save_checkpoint(0)
+
+    def _save_checkpoint(self, offset: int):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(offset))
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # --- Сериализация ---
+
+    @staticmethod
+    def _to_record(history: TicketHistory) -> dict:
+        """Запись истории в виде JSON-совместимого словаря (id и дата задаются сразу)"""
+        return {
+            "id": str(history.id or uuid.uuid4()),
+            "ticket_id": str(history.ticket_id),
+            "user_id": str(history.user_id) if history.user_id else None,
+            "action": history.action.value,
+            "old_value": history.old_value,
+            "new_value": history.new_value,
+            "description": history.description,
+            "created_at": (history.created_at or datetime.utcnow()).isoformat(),
+        }
+
+    @staticmethod
+    def _from_record(record: dict) -> dict:
+        """Словарь журнала -> значения колонок TicketHistory"""
+        return {
+            "id": uuid.UUID(record["id"]),
+            "ticket_id": uuid.UUID(record["ticket_id"]),
+            "user_id": uuid.UUID(record["user_id"]) if record["user_id"] else None,
+            "action": HistoryAction(record["action"]),
+            "old_value": record["old_value"],
+            "new_value": record["new_value"],
+            "description": record["description"],
+            "created_at": datetime.fromisoformat(record["created_at"]),
+        }
+
+
+def _read_offset(checkpoint_path: str) -> int:
+    """Позиция журнала, до которой записи уже в БД"""
+    try:
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _try_lock(file) -> bool:
+    """Неблокирующая эксклюзивная блокировка файла (снимается при закрытии или смерти процесса)"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _remove_files(*paths: str):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Уже удален (или открыт в Windows) - повторная вставка пропустит дубликаты
+
+
+def _insert_ignore_duplicates(db: Session, records: List[dict]):
+    """INSERT ... ON CONFLICT (id) DO NOTHING для записей журнала"""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif db.bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    rows = [AuditWriter._from_record(record) for record in records]
+    if dialect_insert is None:
+        existing = {
+            row.id for row in
+            db.query(TicketHistory.id).filter(TicketHistory.id.in_([row["id"] for row in rows])).all()
+        }
+        rows = [row for row in rows if row["id"] not in existing]
+        if rows:
+            db.execute(insert(TicketHistory), rows)
+        return
+    db.execute(dialect_insert(TicketHistory).on_conflict_do_nothing(index_elements=["id"]), rows)
+
+
+# Общий писатель процесса
+audit_writer = AuditWriter()
@@ -0,0 +1,214 @@
+"""
+Bulk Import Service - массовый импорт тикетов (миграция из старых систем)
+"""
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from models.ticket import Ticket, TicketStatus
+from models.user import User
+from models.category import Category
+from models.ai_prediction import AIPrediction
+from models.ai_auto_response import AIAutoResponse
+from models.ticket_history import TicketHistory, HistoryAction
+from models.notification import NotificationType
+from schemas.ticket import TicketCreate
+from services.ai_router import AIRouter
+from services.notification_service import NotificationService
+from services.reference_cache import reference_cache
+from services.sla_service import SLAService
+from services.stats_service import StatsService
+
+
+class BulkImportService:
+    """
+    Сохраняет пачку уже классифицированных тикетов.
+
+    Пользователи читаются одним запросом на пачку, категории, ML модель и
+    департаменты берутся из кэша справочников, а тикеты, предсказания и история
+    вставляются пакетными INSERT вместо поштучных db.add + flush.
+    """
+
+    def __init__(self, router_service: Optional[AIRouter] = None,
+                 stats_service: Optional[StatsService] = None,
+                 notification_service: Optional[NotificationService] = None):
+        self.router_service = router_service or AIRouter()
+        self.stats_service = stats_service or StatsService()
+        self.notification_service = notification_service or NotificationService()
+
+    def import_batch(
+        self,
+        db: Session,
+        tickets_data: List[TicketCreate],
+        ml_results: List[Dict]
+    ) -> List[Dict]:
+        """
+        Импортирует пачку тикетов в одной транзакции
+
+        Args:
+            db: Сессия БД
+            tickets_data: Данные тикетов
+            ml_results: Результаты classify_with_reply для каждого тикета (в том же порядке)
+
+        Returns:
+            Список {"ticket_id", "status"} в том же порядке
+        """
+        now = datetime.utcnow()
+
+        self._ensure_users(db, {t.user_id for t in tickets_data})
+        category_ids = self._resolve_categories(db, {r["category"] for r in ml_results})
+        ml_model_id = reference_cache.get_or_create_model_id(db)
+
+        ticket_rows = []
+        history_rows = []
+        prediction_rows = []
+        auto_response_rows = []
+        department_by_category = {}
+        results = []
+
+        for ticket_data, ml_result in zip(tickets_data, ml_results):
+            ticket_id = uuid.uuid4()
+            category_id = category_ids[ml_result["category"]]
+            confidence = ml_result["confidence"].get("problem_type", 0.5)
+            auto_response_text = ml_result.get("auto_reply")
+            status = TicketStatus.AUTO_RESOLVED if auto_response_text else TicketStatus.NEW
+
+            # Маршрутизация зависит только от категории - считаем один раз на категорию
+            department_id = None
+            category_confidence = ml_result["confidence"].get("category", 0)
+            if category_confidence >= 0.7:
+                if ml_result["category"] not in department_by_category:
+                    department_by_category[ml_result["category"]] = self.router_service.route_ticket(
+                        db,
+                        ml_result["category"],
+                        ml_result["priority"].value,
+                        category_confidence
+                    )
+                department_id = department_by_category[ml_result["category"]]
+
+            ticket_rows.append({
+                "id": ticket_id,
+                "source": ticket_data.source,
+                "user_id": ticket_data.user_id,
+                "subject": ticket_data.subject,
+                "body": ticket_data.body,
+                "language": ticket_data.language,
+                "category_id": category_id,
+                "priority": ml_result["priority"],
+                "issue_type": ml_result["issue_type"],
+                "ai_confidence": confidence,
+                "assigned_department_id": department_id,
+                "assigned_operator_id": None,
+                "status": status,
+                "auto_resolved": bool(auto_response_text),
+                "created_at": now,
+                "updated_at": now,
+                "closed_at": now if auto_response_text else None,
+                "sla_deadline": SLAService.calculate_sla_deadline(ml_result["priority"], now),
+                "is_escalated": False,
+            })
+
+            history_rows.append({
+                "id": uuid.uuid4(),
+                "ticket_id": ticket_id,
+                "user_id": ticket_data.user_id,
+                "action": HistoryAction.CREATED,
+                "old_value": None,
+                "new_value": None,
+                "description": f"Тикет создан: {ticket_data.subject or ticket_data.body[:50]}",
+                "created_at": now,
+            })
+
+            prediction_rows.append({
+                "id": uuid.uuid4(),
+                "ticket_id": ticket_id,
+                "model_id": ml_model_id,
+                "predicted_category_id": category_id,
+                "predicted_priority": ml_result["priority"],
+                "predicted_issue_type": ml_result["issue_type"],
+                "confidence": confidence,
+                "created_at": now,
+            })
+
+            if auto_response_text:
+                auto_response_rows.append({
+                    "id": uuid.uuid4(),
+                    "ticket_id": ticket_id,
+                    "response_text": auto_response_text,
+                    "is_successful": True,
+                    "created_at": now,
+                })
+
+            results.append({"ticket_id": ticket_id, "status": status})
+
+        db.execute(insert(Ticket), ticket_rows)
+        db.execute(insert(TicketHistory), history_rows)
+        db.execute(insert(AIPrediction), prediction_rows)
+        if auto_response_rows:
+            db.execute(insert(AIAutoResponse), auto_response_rows)
+
+        # Одно сводное уведомление для всех админов на пачку вместо уведомления на каждый тикет
+        self.notification_service.notify_admins(
+            db,
+            NotificationType.TICKET_CREATED,
+            title=f"Импортировано тикетов: {len(ticket_rows)}",
+            message=f"Массовый импорт: создано {len(ticket_rows)} тикетов"
+        )
+
+        # Счетчики дневной статистики - одним upsert на пачку
+        self.stats_service.increment_daily_stats(
+            db,
+            now.date(),
+            total_tickets=len(ticket_rows),
+            auto_resolved=sum(1 for row in ticket_rows if row["auto_resolved"]),
+            misroutes=sum(1 for row in ticket_rows if row["ai_confidence"] < 0.7),
+            confidence_sum=sum(row["confidence"] for row in prediction_rows)
+        )
+        
+        db.commit()
+        return results
+
+    def _ensure_users(self, db: Session, user_ids: set):
+        """Создает отсутствующих пользователей одним INSERT"""
+        existing = {
+            row.id for row in db.query(User.id).filter(User.id.in_(user_ids)).all()
+        }
+        missing = [user_id for user_id in user_ids if user_id not in existing]
+        if missing:
+            db.execute(insert(User), [
+                {
+                    "id": user_id,
+                    "email": f"user_{user_id}@example.com",  # Временный email
+                    "name": "Auto-created User",
+                    "role": "client",
+                    "created_at": datetime.utcnow(),
+                }
+                for user_id in missing
+            ])
+
+    def _resolve_categories(self, db: Session, names: set) -> Dict[str, UUID]:
+        """Возвращает {название: id} для всех категорий пачки, создавая отсутствующие"""
+        category_ids = {}
+        missing = []
+        for name in names:
+            category_id = reference_cache.get_category_id(db, name)
+            if category_id:
+                category_ids[name] = category_id
+            else:
+                missing.append(name)
+        if missing:
+            new_rows = [
+                {
+                    "id": uuid.uuid4(),
+                    "name": name,
+                    "description": "Автоматически созданная категория",
+                }
+                for name in missing
+            ]
+            db.execute(insert(Category), new_rows)
+            category_ids.update({row["name"]: row["id"] for row in new_rows})
+            reference_cache.mark_created(db)
+        return category_ids
@@ -0,0 +1,67 @@
+"""
+Duplicate Detector - распознавание дубликатов при приеме тикетов
+
+Во время сбоя приходят сотни почти одинаковых тикетов. ML сервис при приеме
+сравнивает эмбеддинг нового тикета с индексом открытых тикетов
+(/predict_and_reply с detect_duplicates) и возвращает очень похожие вместе
+с классификацией. Backend выбирает среди кандидатов основной тикет:
+открытый, созданный недавно и сам не являющийся дубликатом; если такого нет,
+используется уже полученная классификация (без повторного запроса).
+Закрытые тикеты убираются из индекса открытых при закрытии.
+
+Дубликат привязывается к основному тикету и копирует его классификацию и
+маршрутизацию: без автоответа, уведомлений админов и индексации.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from models.ticket import Ticket, TicketStatus
+
+
+# Статусы, при которых новые тикеты о той же проблеме считаются дубликатами
+OPEN_STATUSES = (TicketStatus.NEW, TicketStatus.IN_WORK, TicketStatus.WAITING)
+
+
+class DuplicateDetector:
+    """Сервис поиска основного тикета для дубликатов"""
+
+    def __init__(self):
+        self.enabled = os.getenv("TICKET_DUPLICATE_DETECTION", "true").lower() == "true"
+        # Минимальное косинусное сходство с основным тикетом
+        self.threshold = float(os.getenv("TICKET_DUPLICATE_THRESHOLD", "0.92"))
+        # Основной тикет должен быть создан не раньше, чем столько часов назад
+        self.window_hours = float(os.getenv("TICKET_DUPLICATE_WINDOW_HOURS", "24"))
+        # Сколько ближайших тикетов проверять (часть может быть закрыта или устареть)
+        self.max_candidates = int(os.getenv("TICKET_DUPLICATE_CANDIDATES", "10"))
+
+    def find_master(self, db: Session, candidates: List[Tuple[UUID, float]]) -> Optional[Ticket]:
+        """
+        Выбирает основной тикет среди кандидатов от ML сервиса
+
+        Args:
+            db: Сессия БД
+            candidates: [(ticket_id, similarity)] по убыванию сходства
+
+        Returns:
+            Самый похожий открытый недавний тикет или None
+        """
+        if not candidates:
+            return None
+
+        since = datetime.utcnow() - timedelta(hours=self.window_hours)
+        tickets = db.query(Ticket).filter(
+            Ticket.id.in_([ticket_id for ticket_id, _ in candidates]),
+            Ticket.status.in_(OPEN_STATUSES),
+            Ticket.created_at >= since,
+            Ticket.master_ticket_id.is_(None)
+        ).all()
+        tickets_by_id = {ticket.id: ticket for ticket in tickets}
+
+        for ticket_id, _ in candidates:
+            if ticket_id in tickets_by_id:
+                return tickets_by_id[ticket_id]
+        return None
@@ -0,0 +1,156 @@
+"""
+Facet Service - счетчики тикетов для дашборда
+
+Количество тикетов по статусу, категории, приоритету, источнику и департаменту
+для тех же фильтров, что у списка тикетов, считается в БД одним запросом:
+в PostgreSQL - GROUP BY GROUPING SETS (один проход по таблице), в SQLite -
+UNION ALL группировок. Результат кэшируется на FACETS_CACHE_TTL секунд:
+дашборды опрашивают счетчики часто, а точность до секунд не нужна.
+"""
+import os
+import threading
+import time
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import cast, func, literal, null, tuple_
+from sqlalchemy.orm import Session
+
+from models.ticket import Ticket
+from services.reference_cache import reference_cache
+
+
+FACETS_CACHE_TTL = float(os.getenv("TICKET_FACETS_CACHE_TTL", "30"))
+# Максимум разных наборов фильтров в кэше
+FACETS_CACHE_MAX_ENTRIES = int(os.getenv("TICKET_FACETS_CACHE_MAX_ENTRIES", "256"))
+
+# Название фасета -> колонка тикета (порядок задает биты grouping())
+FACET_COLUMNS = (
+    ("status", Ticket.status),
+    ("category", Ticket.category_id),
+    ("priority", Ticket.priority),
+    ("source", Ticket.source),
+    ("department", Ticket.assigned_department_id),
+)
+
+
+class FacetService:
+    """Сервис подсчета тикетов по фасетам с коротким кэшем"""
+
+    def __init__(self, ttl_seconds: float = FACETS_CACHE_TTL):
+        self.ttl_seconds = ttl_seconds
+        self._cache: Dict[Hashable, Tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Сбрасывает кэш"""
+        with self._lock:
+            self._cache.clear()
+
+    def get_facets(self, db: Session, query, cache_key: Hashable) -> dict:
+        """
+        Считает тикеты по фасетам
+
+        Args:
+            db: Сессия БД
+            query: Запрос db.query(Ticket) с уже примененными фильтрами
+            cache_key: Ключ кэша (значения фильтров)
+
+        Returns:
+            {"total": int, "status": [{"value", "name", "count"}], "category": [...], ...}
+            (бакеты по убыванию count)
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(cache_key)
+        if cached and now - cached[0] <= self.ttl_seconds:
+            return cached[1]
+
+        facets = self._build_response(db, self._count(db, query))
+
+        with self._lock:
+            if len(self._cache) >= FACETS_CACHE_MAX_ENTRIES:
+                # Выбрасываем устаревшие записи, а если их нет - весь кэш
+                self._cache = {key: entry for key, entry in self._cache.items()
+                               if now - entry[0] <= self.ttl_seconds}
+                if len(self._cache) >= FACETS_CACHE_MAX_ENTRIES:
+                    self._cache.clear()
+            self._cache[cache_key] = (now, facets)
+        return facets
+
+    def _count(self, db: Session, query) -> List[Tuple[Optional[str], object, int]]:
+        """Возвращает [(фасет или None для итога, значение, количество)]"""
+        columns = [column for _, column in FACET_COLUMNS]
+
+        if db.bind.dialect.name == "postgresql":
+            # grouping(c1, ..., c5) - битовая маска: 1 у колонок, не входящих в группировку
+            rows = query.with_entities(
+                *columns,
+                func.grouping(*columns).label("grouping_mask"),
+                func.count(Ticket.id).label("count")
+            ).group_by(
+                func.grouping_sets(*[tuple_(column) for column in columns], tuple_())
+            ).all()
+            return [self._row_facet(row, len(columns)) for row in rows]
+
+        # SQLite: отдельная группировка на каждый фасет, один запрос UNION ALL.
+        # В "чужих" колонках NULL с типом колонки, чтобы значения разбирались одинаково
+        full_mask = (1 << len(columns)) - 1
+
+        def part(grouped_column, mask: int):
+            return query.with_entities(
+                *[
+                    (column if column is grouped_column else cast(null(), column.type)).label(name)
+                    for name, column in FACET_COLUMNS
+                ],
+                literal(mask).label("grouping_mask"),
+                func.count(Ticket.id).label("count")
+            )
+
+        parts = [part(None, full_mask)]
+        for i, column in enumerate(columns):
+            mask = full_mask & ~(1 << (len(columns) - 1 - i))
+            parts.append(part(column, mask).group_by(column))
+        rows = parts[0].union_all(*parts[1:]).all()
+        return [self._row_facet(row, len(columns)) for row in rows]
+
+    @staticmethod
+    def _row_facet(row, column_count: int) -> Tuple[Optional[str], object, int]:
+        mask = row[column_count]
+        count = row[column_count + 1]
+        for i, (name, _) in enumerate(FACET_COLUMNS):
+            if not mask & (1 << (column_count - 1 - i)):
+                return name, row[i], count
+        return None, None, count
+
+    def _build_response(self, db: Session, counts) -> dict:
+        facets = {name: [] for name, _ in FACET_COLUMNS}
+        total = 0
+        for facet, value, count in counts:
+            if facet is None:
+                total = count
+                continue
+            facets[facet].append({
+                "value": self._value_str(value),
+                "name": self._value_name(db, facet, value),
+                "count": count,
+            })
+        for buckets in facets.values():
+            buckets.sort(key=lambda bucket: bucket["count"], reverse=True)
+        return {"total": total, **facets}
+
+    @staticmethod
+    def _value_str(value) -> Optional[str]:
+        if value is None:
+            return None
+        return str(getattr(value, "value", value))
+
+    @staticmethod
+    def _value_name(db: Session, facet: str, value) -> Optional[str]:
+        """Название категории/департамента из кэша справочников"""
+        if value is None:
+            return None
+        if facet == "category":
+            return reference_cache.get_category_name(db, value)
+        if facet == "department":
+            return reference_cache.get_department_name(db, value)
+        return None
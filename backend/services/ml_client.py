@@ -0,0 +1,43 @@
+"""
+ML Client - общий асинхронный HTTP клиент для обращений к ML сервису
+"""
+import os
+from typing import Optional
+
+import httpx
+
+
+ML_SERVICE_URL = os.getenv("ML_SERVICE_URL", "http://localhost:8000")
+ML_SERVICE_TIMEOUT = float(os.getenv("ML_SERVICE_TIMEOUT", "10"))
+# Максимум одновременных соединений к ML сервису с одного воркера
+ML_SERVICE_MAX_CONNECTIONS = int(os.getenv("ML_SERVICE_MAX_CONNECTIONS", "200"))
+
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Возвращает общий httpx.AsyncClient (создается лениво)
+
+    Один клиент на процесс переиспользует соединения (keep-alive),
+    поэтому тысячи ожидающих запросов не открывают тысячи сокетов.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            base_url=ML_SERVICE_URL,
+            timeout=ML_SERVICE_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=ML_SERVICE_MAX_CONNECTIONS,
+                max_keepalive_connections=ML_SERVICE_MAX_CONNECTIONS
+            )
+        )
+    return _async_client
+
+
+async def close_async_client():
+    """Закрывает общий клиент (вызывается при остановке приложения)"""
+    global _async_client
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()
+    _async_client = None
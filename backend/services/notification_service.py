@@ -0,0 +1,175 @@
+"""
+Notification Service - создание и чтение уведомлений
+
+Уведомления для всех администраторов хранятся одной широковещательной строкой
+(audience_role = "admin") вместо строки на каждого админа, а прочтение
+отмечается отдельной записью NotificationRead для конкретного пользователя.
+Поэтому число записей при создании тикета или комментария не зависит
+от размера команды администраторов.
+"""
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, insert, literal, or_, select
+from sqlalchemy.orm import Session
+
+from models.notification import Notification, NotificationRead, NotificationType
+from models.user import User, UserRole
+
+
+class NotificationService:
+    """Сервис для работы с уведомлениями"""
+
+    def notify_user(
+        self,
+        db: Session,
+        user_id: UUID,
+        notification_type: NotificationType,
+        title: str,
+        message: str,
+        ticket_id: Optional[UUID] = None
+    ) -> Notification:
+        """Создает персональное уведомление (без commit)"""
+        notification = Notification(
+            user_id=user_id,
+            ticket_id=ticket_id,
+            notification_type=notification_type,
+            title=title,
+            message=message
+        )
+        db.add(notification)
+        return notification
+
+    def notify_role(
+        self,
+        db: Session,
+        role: str,
+        notification_type: NotificationType,
+        title: str,
+        message: str,
+        ticket_id: Optional[UUID] = None
+    ) -> Notification:
+        """Создает одно уведомление для всех пользователей роли (без commit)"""
+        notification = Notification(
+            audience_role=role,
+            ticket_id=ticket_id,
+            notification_type=notification_type,
+            title=title,
+            message=message
+        )
+        db.add(notification)
+        return notification
+
+    def notify_admins(
+        self,
+        db: Session,
+        notification_type: NotificationType,
+        title: str,
+        message: str,
+        ticket_id: Optional[UUID] = None
+    ) -> Notification:
+        """Создает одно уведомление для всех администраторов (без commit)"""
+        return self.notify_role(
+            db, UserRole.ADMIN.value, notification_type, title, message, ticket_id
+        )
+
+    def _broadcast_filter(self, user: User):
+        """
+        Широковещательные уведомления роли пользователя, созданные после его
+        регистрации (новый пользователь не видит старые рассылки непрочитанными)
+        """
+        conditions = [Notification.user_id.is_(None), Notification.audience_role == user.role]
+        if user.created_at is not None:
+            conditions.append(Notification.created_at >= user.created_at)
+        return and_(*conditions)
+
+    def _visible_filter(self, user: User):
+        """Уведомления, адресованные пользователю лично или его роли"""
+        return or_(Notification.user_id == user.id, self._broadcast_filter(user))
+
+    def _is_read_column(self):
+        """
+        Признак прочтения: для персональных уведомлений - флаг is_read,
+        для широковещательных - наличие отметки NotificationRead
+        """
+        return or_(
+            and_(Notification.user_id.isnot(None), Notification.is_read == True),
+            NotificationRead.user_id.isnot(None)
+        )
+
+    def _query_for_user(self, db: Session, user: User):
+        return db.query(Notification, self._is_read_column().label("read")).outerjoin(
+            NotificationRead,
+            and_(
+                NotificationRead.notification_id == Notification.id,
+                NotificationRead.user_id == user.id
+            )
+        ).filter(self._visible_filter(user))
+
+    def list_for_user(
+        self,
+        db: Session,
+        user: User,
+        unread_only: bool = False,
+        limit: int = 50
+    ) -> List[Tuple[Notification, bool]]:
+        """Возвращает [(уведомление, прочитано)] для пользователя, новые первыми"""
+        query = self._query_for_user(db, user)
+        if unread_only:
+            query = query.filter(~self._is_read_column())
+        rows = query.order_by(Notification.created_at.desc()).limit(limit).all()
+        return [(notification, bool(read)) for notification, read in rows]
+
+    def unread_count(self, db: Session, user: User) -> int:
+        """Количество непрочитанных уведомлений пользователя"""
+        return self._query_for_user(db, user).filter(~self._is_read_column()).count()
+
+    def mark_as_read(
+        self,
+        db: Session,
+        notification_id: UUID,
+        user: User
+    ) -> Optional[Notification]:
+        """Помечает уведомление прочитанным для пользователя (с commit)"""
+        notification = db.query(Notification).filter(
+            Notification.id == notification_id,
+            self._visible_filter(user)
+        ).first()
+        if not notification:
+            return None
+
+        if notification.user_id is not None:
+            notification.is_read = True
+        else:
+            exists = db.query(NotificationRead).filter(
+                NotificationRead.notification_id == notification.id,
+                NotificationRead.user_id == user.id
+            ).first()
+            if not exists:
+                db.add(NotificationRead(notification_id=notification.id, user_id=user.id))
+        db.commit()
+        db.refresh(notification)
+        return notification
+
+    def mark_all_as_read(self, db: Session, user: User) -> int:
+        """Помечает все уведомления пользователя прочитанными (с commit)"""
+        updated = db.query(Notification).filter(
+            Notification.user_id == user.id,
+            Notification.is_read == False
+        ).update({"is_read": True}, synchronize_session=False)
+
+        # Для широковещательных - одна INSERT ... SELECT по непрочитанным
+        already_read = select(NotificationRead.notification_id).where(
+            NotificationRead.user_id == user.id
+        )
+        unread_broadcasts = select(Notification.id, literal(user.id, NotificationRead.user_id.type)).where(
+            self._broadcast_filter(user),
+            Notification.id.not_in(already_read)
+        )
+        result = db.execute(
+            insert(NotificationRead).from_select(
+                ["notification_id", "user_id"], unread_broadcasts
+            )
+        )
+        db.commit()
+        return updated + (result.rowcount or 0)
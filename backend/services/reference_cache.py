@@ -0,0 +1,201 @@
+"""
+Reference Cache - кэш справочников в памяти процесса
+
+Категории, департаменты и текущая ML модель почти не меняются, но раньше
+читались из БД при создании каждого тикета (поиск категории, последняя модель,
+до пяти запросов ilike по департаментам в AIRouter). Кэш загружает справочники
+целиком тремя запросами и хранит их REFERENCE_CACHE_TTL секунд. Изменения
+из этого процесса сбрасывают кэш после commit сессии, изменения из других
+процессов становятся видны по истечении TTL.
+
+Строки, созданные в еще не закоммиченной транзакции, в общий кэш не попадают:
+пока в сессии есть такие строки, справочники читаются в снимок этой сессии
+(session.info), который отбрасывается при commit или rollback.
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models.category import Category
+from models.department import Department
+from models.ml_model import MLModel
+
+
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "300"))
+
+# Ключи session.info: сессия создала справочные строки / снимок этой сессии
+_PENDING_KEY = "reference_cache_pending"
+_SNAPSHOT_KEY = "reference_cache_snapshot"
+
+
+class _Snapshot:
+    """Загруженные справочники"""
+
+    def __init__(self, categories: List[Tuple[UUID, str]],
+                 departments: List[Tuple[UUID, str]],
+                 latest_model_id: Optional[UUID]):
+        self.categories = categories
+        self.category_by_name: Dict[str, UUID] = {name: id for id, name in categories}
+        self.category_by_id: Dict[UUID, str] = {id: name for id, name in categories}
+        self.departments = departments
+        self.department_by_id: Dict[UUID, str] = {id: name for id, name in departments}
+        self.latest_model_id = latest_model_id
+        self.loaded_at = time.monotonic()
+
+
+class ReferenceCache:
+    """Кэш категорий, департаментов и последней ML модели с TTL"""
+
+    def __init__(self, ttl_seconds: float = REFERENCE_CACHE_TTL):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[_Snapshot] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Сбрасывает кэш (после commit изменений справочников)"""
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
+
+    def mark_created(self, db: Session):
+        """
+        Отмечает, что сессия создала справочные строки (без commit).
+        До конца транзакции сессия читает справочники в свой снимок,
+        после commit общий кэш сбрасывается.
+        """
+        db.info[_PENDING_KEY] = True
+        db.info.pop(_SNAPSHOT_KEY, None)
+
+    def _load(self, db: Session) -> _Snapshot:
+        categories = [
+            (row.id, row.name)
+            for row in db.query(Category.id, Category.name).order_by(Category.name).all()
+        ]
+        departments = [
+            (row.id, row.name)
+            for row in db.query(Department.id, Department.name).order_by(Department.name).all()
+        ]
+        latest_model = db.query(MLModel.id).order_by(MLModel.created_at.desc()).first()
+        return _Snapshot(categories, departments, latest_model.id if latest_model else None)
+
+    def _get(self, db: Session, refresh: bool = False) -> _Snapshot:
+        if db.info.get(_PENDING_KEY):
+            # Транзакция видит свои незакоммиченные строки - общий кэш не трогаем
+            snapshot = db.info.get(_SNAPSHOT_KEY)
+            if refresh or snapshot is None:
+                snapshot = db.info[_SNAPSHOT_KEY] = self._load(db)
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            generation = self._generation
+        if (
+            refresh
+            or snapshot is None
+            or time.monotonic() - snapshot.loaded_at > self.ttl_seconds
+        ):
+            snapshot = self._load(db)
+            with self._lock:
+                # invalidate() во время загрузки - снимок мог устареть, не сохраняем
+                if self._generation == generation:
+                    self._snapshot = snapshot
+        return snapshot
+
+    # --- Категории ---
+
+    def get_category_id(self, db: Session, name: str) -> Optional[UUID]:
+        """id категории по точному названию (при промахе кэш перечитывается)"""
+        category_id = self._get(db).category_by_name.get(name)
+        if category_id is None:
+            category_id = self._get(db, refresh=True).category_by_name.get(name)
+        return category_id
+
+    def get_category_name(self, db: Session, category_id: UUID) -> Optional[str]:
+        """Название категории по id (при промахе кэш перечитывается)"""
+        name = self._get(db).category_by_id.get(category_id)
+        if name is None:
+            name = self._get(db, refresh=True).category_by_id.get(category_id)
+        return name
+
+    def find_category_id(self, db: Session, name_part: str) -> Optional[UUID]:
+        """id первой категории, название которой содержит name_part (аналог ilike '%...%')"""
+        return self._find(self._get(db).categories, name_part)
+
+    def get_or_create_category_id(self, db: Session, name: str) -> UUID:
+        """id категории по названию, создает категорию если ее нет (без commit)"""
+        category_id = self.get_category_id(db, name)
+        if category_id is None:
+            category = Category(
+                name=name,
+                description=f"Автоматически созданная категория"
+            )
+            db.add(category)
+            db.flush()
+            category_id = category.id
+            self.mark_created(db)
+        return category_id
+
+    # --- Департаменты ---
+
+    def find_department_id(self, db: Session, name_part: str) -> Optional[UUID]:
+        """id первого департамента, название которого содержит name_part"""
+        return self._find(self._get(db).departments, name_part)
+
+    def get_department_name(self, db: Session, department_id: UUID) -> Optional[str]:
+        """Название департамента по id (при промахе кэш перечитывается)"""
+        name = self._get(db).department_by_id.get(department_id)
+        if name is None:
+            name = self._get(db, refresh=True).department_by_id.get(department_id)
+        return name
+
+    # --- ML модель ---
+
+    def get_or_create_model_id(self, db: Session) -> UUID:
+        """id последней ML модели, создает дефолтную если моделей нет (без commit)"""
+        model_id = self._get(db).latest_model_id
+        if model_id is None:
+            model_id = self._get(db, refresh=True).latest_model_id
+        if model_id is None:
+            ml_model = MLModel(
+                name="default_classifier",
+                version="1.0",
+                description="Default ML model"
+            )
+            db.add(ml_model)
+            db.flush()
+            model_id = ml_model.id
+            self.mark_created(db)
+        return model_id
+
+    @staticmethod
+    def _find(items: List[Tuple[UUID, str]], name_part: str) -> Optional[UUID]:
+        name_part = name_part.lower()
+        for item_id, name in items:
+            if name_part in name.lower():
+                return item_id
+        return None
+
+
+# Общий кэш процесса
+reference_cache = ReferenceCache()
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session):
+    if session.info.pop(_PENDING_KEY, None):
+        session.info.pop(_SNAPSHOT_KEY, None)
+        reference_cache.invalidate()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_soft_rollback(session: Session, previous_transaction):
+    # Откат savepoint мог удалить строки из снимка сессии - перечитаем при следующем обращении
+    session.info.pop(_SNAPSHOT_KEY, None)
+    if not session.in_transaction():
+        session.info.pop(_PENDING_KEY, None)
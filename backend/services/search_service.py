@@ -0,0 +1,179 @@
+"""
+Search Service - полнотекстовый поиск тикетов
+
+PostgreSQL: генерируемая колонка tickets.search_vector (tsvector по subject и body)
+с GIN индексом. Вектор строится в двух конфигурациях: 'russian' (стемминг русских
+слов) и 'simple' (слова без изменений - для казахского, английского, кодов ошибок),
+subject имеет больший вес (A), чем body (B). Результаты сортируются по ts_rank_cd.
+
+SQLite (USE_SQLITE=true): виртуальная таблица FTS5 tickets_fts, синхронизируемая
+триггерами, с сортировкой по bm25.
+
+Нечеткий поиск (mode=fuzzy, только PostgreSQL): триграммы pg_trgm с GIN индексами
+по subject и body, оператор word_similarity (<%) с порогом TICKET_FUZZY_THRESHOLD.
+Находит слова с опечатками и вариантами написания. В SQLite используется fts.
+
+Индексы создаются миграциями migrations/add_ticket_search.py и
+migrations/add_ticket_trigram_index.py. Пока миграция не применена, поиск
+работает в старом режиме ilike.
+"""
+import os
+import re
+from typing import Optional
+
+from sqlalchemy import func, literal, literal_column, or_, table, column, text
+from sqlalchemy.orm import Session
+
+from models.ticket import Ticket
+
+
+# Режим поиска по умолчанию: fts - полнотекстовый, fuzzy - триграммы, ilike - подстрока
+TICKET_SEARCH_MODE = os.getenv("TICKET_SEARCH_MODE", "fts")
+# Порог word_similarity для нечеткого поиска (0..1, больше - строже)
+TICKET_FUZZY_THRESHOLD = float(os.getenv("TICKET_FUZZY_THRESHOLD", "0.4"))
+
+# Виртуальная таблица FTS5 (SQLite)
+tickets_fts = table("tickets_fts", column("rowid"), column("rank"))
+
+
+class SearchService:
+    """Сервис поиска тикетов по тексту"""
+
+    def __init__(self):
+        # Проверка наличия индексов выполняется один раз на процесс
+        self._available = {}
+
+    def _check_available(self, db: Session, feature: str, sql: str, migration: str) -> bool:
+        if feature not in self._available:
+            try:
+                # SAVEPOINT: ошибка проверки не прерывает транзакцию запроса (PostgreSQL)
+                with db.begin_nested():
+                    self._available[feature] = db.execute(text(sql)).first() is not None
+            except Exception as e:
+                print(f"Warning: Could not check {feature} search index: {e}")
+                self._available[feature] = False
+            if not self._available[feature]:
+                print(f"Warning: {feature} search index not found, falling back "
+                      f"(run migrations/{migration})")
+        return self._available[feature]
+
+    def is_fts_available(self, db: Session) -> bool:
+        """Проверяет, применена ли миграция полнотекстового поиска"""
+        if db.bind.dialect.name == "postgresql":
+            sql = """
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'tickets' AND column_name = 'search_vector'
+            """
+        else:
+            sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tickets_fts'"
+        return self._check_available(db, "Full-text", sql, "add_ticket_search.py")
+
+    def is_fuzzy_available(self, db: Session) -> bool:
+        """
+        Проверяет, установлено ли расширение pg_trgm и созданы ли триграммные
+        индексы (только PostgreSQL). Без индексов нечеткий поиск читает всю
+        таблицу, поэтому используется fts.
+        """
+        if db.bind.dialect.name != "postgresql":
+            return False
+        return self._check_available(
+            db, "Trigram",
+            """
+                SELECT 1 FROM pg_extension
+                WHERE extname = 'pg_trgm'
+                  AND (SELECT count(*) FROM pg_indexes
+                       WHERE tablename = 'tickets'
+                         AND indexname IN ('ix_tickets_subject_trgm', 'ix_tickets_body_trgm')) = 2
+            """,
+            "add_ticket_trigram_index.py"
+        )
+
+    def apply_search(self, db: Session, query, q: str, mode: Optional[str] = None,
+                     ranked: bool = True):
+        """
+        Добавляет к запросу тикетов условие поиска и сортировку по релевантности
+
+        Args:
+            db: Сессия БД
+            query: Запрос db.query(Ticket)
+            q: Поисковая строка
+            mode: fts | fuzzy | ilike (по умолчанию TICKET_SEARCH_MODE)
+            ranked: сортировать по релевантности (False - только фильтр,
+                    например для постраничного вывода по дате)
+        """
+        query, rank = self._apply_mode(db, query, q, mode or TICKET_SEARCH_MODE)
+        if ranked and rank is not None:
+            query = query.order_by(rank)
+        return query
+
+    def _apply_mode(self, db: Session, query, q: str, mode: str):
+        """Возвращает (запрос с условием поиска, выражение сортировки по релевантности)"""
+        if mode == "fuzzy":
+            if self.is_fuzzy_available(db):
+                return self._apply_postgres_fuzzy(db, query, q)
+            mode = "fts"
+        if mode == "fts" and self.is_fts_available(db):
+            if db.bind.dialect.name == "postgresql":
+                return self._apply_postgres_fts(query, q)
+            match = self._fts5_match_expression(q)
+            if match:
+                return self._apply_sqlite_fts(query, match)
+        return self._apply_ilike(query, q), None
+
+    def _apply_ilike(self, query, q: str):
+        """Поиск подстроки в subject и body (case-insensitive), без индекса"""
+        search_term = f"%{q}%"
+        return query.filter(
+            or_(Ticket.subject.ilike(search_term), Ticket.body.ilike(search_term))
+        )
+
+    def _apply_postgres_fts(self, query, q: str):
+        # websearch_to_tsquery понимает "фразы", OR и -исключения и не падает на спецсимволах
+        ts_query = func.websearch_to_tsquery("russian", q).op("||")(
+            func.websearch_to_tsquery("simple", q)
+        )
+        search_vector = literal_column("tickets.search_vector")
+        return (
+            query.filter(search_vector.op("@@")(ts_query)),
+            func.ts_rank_cd(search_vector, ts_query).desc()
+        )
+
+    def _apply_postgres_fuzzy(self, db: Session, query, q: str):
+        # Порог задается для текущей транзакции: оператор <% использует его
+        # и может выполняться по GIN индексу gin_trgm_ops
+        db.execute(
+            text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+            {"threshold": str(TICKET_FUZZY_THRESHOLD)}
+        )
+        # Триграммы pg_trgm не зависят от регистра; колонки используются как есть,
+        # чтобы условие совпадало с выражением индекса
+        return (
+            query.filter(
+                or_(
+                    literal(q).op("<%")(Ticket.subject),
+                    literal(q).op("<%")(Ticket.body)
+                )
+            ),
+            # greatest игнорирует NULL (тикеты без темы)
+            func.greatest(
+                func.word_similarity(q, Ticket.subject),
+                func.word_similarity(q, Ticket.body)
+            ).desc()
+        )
+
+    def _apply_sqlite_fts(self, query, match: str):
+        # rank в FTS5 - это bm25 (меньше - релевантнее)
+        return (
+            query.join(
+                tickets_fts, tickets_fts.c.rowid == literal_column("tickets.rowid")
+            ).filter(
+                literal_column("tickets_fts").op("MATCH")(match)
+            ),
+            tickets_fts.c.rank
+        )
+
+    @staticmethod
+    def _fts5_match_expression(q: str) -> str:
+        """Строит безопасное выражение FTS5: каждое слово в кавычках, с поиском по префиксу"""
+        tokens = re.findall(r"\w+", q)
+        return " ".join(f'"{token}"*' for token in tokens)
@@ -0,0 +1,112 @@
+"""
+Semantic Search Service - поиск похожих по смыслу тикетов
+
+Эмбеддинги тикетов хранятся в векторном индексе ML сервиса (/ticket_index/*).
+Backend добавляет в индекс новые тикеты (в фоне, после ответа клиенту)
+и по результатам поиска загружает тикеты из БД. Открытые тикеты также
+попадают в индекс поиска дубликатов ML сервиса; при закрытии тикет
+убирается из него (remove_from_open_index_async).
+"""
+import os
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+import httpx
+import requests
+
+from models.ticket import Ticket
+from services.duplicate_detector import OPEN_STATUSES
+from services.ml_client import get_async_client
+
+
+class SemanticSearchService:
+    """Сервис семантического поиска тикетов"""
+
+    def __init__(self):
+        self.ml_service_url = os.getenv("ML_SERVICE_URL", "http://localhost:8000")
+        # Размер пачки для /ticket_index/add
+        self.index_batch_size = int(os.getenv("ML_INDEX_BATCH_SIZE", "500"))
+
+    @staticmethod
+    def is_open(ticket: Ticket) -> bool:
+        """Может ли тикет быть основным для дубликатов (открыт и сам не дубликат)"""
+        return ticket.status in OPEN_STATUSES and ticket.master_ticket_id is None
+
+    @classmethod
+    def ticket_payload(cls, ticket: Ticket) -> Dict:
+        """Данные тикета для индексации (не зависят от сессии БД)"""
+        return {
+            "ticket_id": str(ticket.id),
+            "subject": ticket.subject or "",
+            "text": ticket.body,
+            "open": cls.is_open(ticket),
+        }
+
+    async def index_tickets_async(self, tickets: List[Dict]):
+        """
+        Добавляет тикеты в векторный индекс. Ошибки только логируются:
+        тикет уже сохранен, а индекс можно досинхронизировать скриптом
+        reindex_semantic_search.py
+        """
+        client = get_async_client()
+        for start in range(0, len(tickets), self.index_batch_size):
+            chunk = tickets[start:start + self.index_batch_size]
+            try:
+                response = await client.post("/ticket_index/add", json={"tickets": chunk})
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                print(f"Warning: Could not index {len(chunk)} tickets for semantic search: {e}")
+
+    async def remove_from_open_index_async(self, ticket_ids: List[UUID]):
+        """
+        Убирает закрытые тикеты из индекса поиска дубликатов (в семантическом
+        поиске они остаются). Ошибки только логируются
+        """
+        try:
+            client = get_async_client()
+            response = await client.post("/ticket_index/remove", json={
+                "ticket_ids": [str(ticket_id) for ticket_id in ticket_ids],
+                "open_only": True,
+            })
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            print(f"Warning: Could not remove {len(ticket_ids)} closed tickets from duplicate index: {e}")
+
+    def index_tickets(self, tickets: List[Dict]):
+        """Синхронная версия index_tickets_async (для скриптов)"""
+        for start in range(0, len(tickets), self.index_batch_size):
+            chunk = tickets[start:start + self.index_batch_size]
+            response = requests.post(
+                f"{self.ml_service_url}/ticket_index/add",
+                json={"tickets": chunk},
+                timeout=300
+            )
+            response.raise_for_status()
+
+    async def search_async(
+        self,
+        text: str,
+        top_k: int = 10,
+        exclude_ticket_ids: Optional[List[UUID]] = None
+    ) -> Optional[List[Tuple[UUID, float]]]:
+        """
+        Ищет тикеты, похожие на текст
+
+        Returns:
+            [(ticket_id, similarity)] по убыванию сходства или None, если ML сервис недоступен
+        """
+        try:
+            client = get_async_client()
+            response = await client.post("/ticket_index/search", json={
+                "text": text,
+                "top_k": top_k,
+                "exclude_ticket_ids": [str(ticket_id) for ticket_id in exclude_ticket_ids or []],
+            })
+            response.raise_for_status()
+            return [
+                (UUID(item["ticket_id"]), item["similarity"])
+                for item in response.json()["results"]
+            ]
+        except httpx.HTTPError as e:
+            print(f"Error calling ML service: {e}")
+            return None
@@ -4,6 +4,7 @@ SLA Service - расчет SLA и автоматическая эскалаци
 from datetime import datetime, timedelta
 from models.ticket import Ticket, TicketPriority
 from models.ticket_history import TicketHistory, HistoryAction
+from services.audit_writer import audit_writer
 from sqlalchemy.orm import Session
 
 
@@ -99,7 +100,7 @@ class SLAService:
             old_value=ticket.priority.value if ticket.priority else None,
             new_value=ticket.priority.value
         )
-        db.add(history)
+        audit_writer.write(db, history)
         
         db.commit()
         db.refresh(ticket)
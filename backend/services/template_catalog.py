@@ -0,0 +1,145 @@
+"""
+Template Catalog - каталог шаблонов ответов в памяти процесса
+
+Операторы загружают список шаблонов постоянно, а меняются шаблоны редко.
+Каталог читает все шаблоны одним запросом, заранее разбирает плейсхолдеры
+{{имя}} в тексте и хранит результат до изменения шаблонов (invalidate после
+commit создания, изменения и удаления) или до истечения TEMPLATE_CATALOG_TTL
+секунд (изменения из других процессов). Названия категорий берутся из reference_cache.
+
+Плейсхолдеры (заполняются из тикета при рендеринге):
+    {{ticket_id}}     - номер тикета (первые 8 символов id, как в уведомлениях)
+    {{user_name}}     - имя автора тикета (или email)
+    {{category}}      - название категории тикета
+    {{sla_deadline}}  - дедлайн по SLA (ДД.ММ.ГГГГ ЧЧ:ММ, UTC)
+Неизвестные плейсхолдеры остаются в тексте без изменений.
+"""
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from models.template import Template
+from schemas.template import TemplateResponse
+from services.reference_cache import reference_cache
+
+
+TEMPLATE_CATALOG_TTL = float(os.getenv("TEMPLATE_CATALOG_TTL", "300"))
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+PLACEHOLDERS = ("ticket_id", "user_name", "category", "sla_deadline")
+
+
+class CompiledTemplate:
+    """Текст шаблона, разобранный на литералы и плейсхолдеры"""
+
+    def __init__(self, content: str):
+        # Чередование: литерал, плейсхолдер, литерал, ... (литералов на один больше)
+        self.literals: List[str] = []
+        self.placeholders: List[Tuple[str, str]] = []  # (имя, исходный текст)
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(content):
+            self.literals.append(content[position:match.start()])
+            self.placeholders.append((match.group(1), match.group(0)))
+            position = match.end()
+        self.literals.append(content[position:])
+
+    def render(self, values: Dict[str, str]) -> str:
+        parts = [self.literals[0]]
+        for (name, raw), literal in zip(self.placeholders, self.literals[1:]):
+            parts.append(values.get(name, raw) if name in PLACEHOLDERS else raw)
+            parts.append(literal)
+        return "".join(parts)
+
+
+class _Entry:
+    """Шаблон каталога: ответ API (без названия категории) и разобранный текст"""
+
+    def __init__(self, template: Template):
+        self.id = template.id
+        self.category_id = template.category_id
+        self.is_active = template.is_active
+        self.response = TemplateResponse(
+            id=str(template.id),
+            name=template.name,
+            category_id=str(template.category_id) if template.category_id else None,
+            content=template.content,
+            is_active=template.is_active,
+            created_by=str(template.created_by) if template.created_by else None,
+            created_at=template.created_at.isoformat(),
+            updated_at=template.updated_at.isoformat()
+        )
+        self.compiled = CompiledTemplate(template.content)
+
+
+class _Snapshot:
+    """Загруженные шаблоны (упорядочены по названию)"""
+
+    def __init__(self, entries: List[_Entry]):
+        self.entries = entries
+        self.by_id: Dict[UUID, _Entry] = {entry.id: entry for entry in entries}
+        self.loaded_at = time.monotonic()
+
+
+class TemplateCatalog:
+    """Кэш шаблонов ответов с разобранными плейсхолдерами"""
+
+    def __init__(self, ttl_seconds: float = TEMPLATE_CATALOG_TTL):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[_Snapshot] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Сбрасывает каталог (после commit изменения шаблонов)"""
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
+
+    def _get(self, db: Session) -> _Snapshot:
+        with self._lock:
+            snapshot = self._snapshot
+            generation = self._generation
+        if snapshot is None or time.monotonic() - snapshot.loaded_at > self.ttl_seconds:
+            templates = db.query(Template).order_by(Template.name.asc()).all()
+            snapshot = _Snapshot([_Entry(template) for template in templates])
+            with self._lock:
+                # invalidate() во время загрузки - снимок мог устареть, не сохраняем
+                if self._generation == generation:
+                    self._snapshot = snapshot
+        return snapshot
+
+    def list(self, db: Session, category_id: Optional[UUID] = None,
+             is_active: Optional[bool] = None) -> List[TemplateResponse]:
+        """Шаблоны с фильтрацией по категории и активности"""
+        return [
+            self._response(db, entry)
+            for entry in self._get(db).entries
+            if (category_id is None or entry.category_id == category_id)
+            and (is_active is None or entry.is_active == is_active)
+        ]
+
+    def get(self, db: Session, template_id: UUID) -> Optional[TemplateResponse]:
+        """Шаблон по id (None, если не найден)"""
+        entry = self._get(db).by_id.get(template_id)
+        return self._response(db, entry) if entry else None
+
+    def render(self, db: Session, template_id: UUID, values: Dict[str, str]) -> Optional[str]:
+        """Текст шаблона с подставленными значениями (None, если шаблон не найден)"""
+        entry = self._get(db).by_id.get(template_id)
+        return entry.compiled.render(values) if entry else None
+
+    @staticmethod
+    def _response(db: Session, entry: _Entry) -> TemplateResponse:
+        category_name = None
+        if entry.category_id:
+            category_name = reference_cache.get_category_name(db, entry.category_id)
+        return entry.response.model_copy(update={"category_name": category_name})
+
+
+# Общий каталог процесса
+template_catalog = TemplateCatalog()
@@ -0,0 +1,175 @@
+"""
+Тест буферизованного audit writer: запись в журнал до commit запроса,
+вставка из очереди в ticket_history и replay журналов остановленных процессов
+
+Журналы создаются во временной папке. Тикет и история коммитятся (их вставляет
+фоновый поток через отдельное соединение) и удаляются в конце, поэтому тест
+можно запускать на локальной БД (PostgreSQL или SQLite с созданными таблицами).
+Запуск: python test_audit_writer.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import event
+
+from database import SessionLocal, engine
+from models.ticket import Ticket, TicketSource, TicketStatus
+from models.ticket_history import TicketHistory, HistoryAction
+from models.user import User
+from services.audit_writer import AuditWriter
+
+
+def history_ids(ids) -> set:
+    db = SessionLocal()
+    try:
+        rows = db.query(TicketHistory.id).filter(TicketHistory.id.in_(list(ids))).all()
+        return {row.id for row in rows}
+    finally:
+        db.close()
+
+
+def wait_for_history(ids, timeout: float = 5.0) -> set:
+    """Ждет, пока фоновый поток вставит записи истории"""
+    deadline = time.monotonic() + timeout
+    while True:
+        found = history_ids(ids)
+        if found == set(ids) or time.monotonic() > deadline:
+            return found
+        time.sleep(0.05)
+
+
+def make_history(ticket_id, description: str) -> TicketHistory:
+    return TicketHistory(
+        id=uuid.uuid4(), ticket_id=ticket_id, action=HistoryAction.COMMENT_ADDED, description=description
+    )
+
+
+def test_wal_before_commit_and_drain(wal_path: str, ticket_id) -> bool:
+    """Запись в журнале с fsync до commit в БД, затем вставлена в ticket_history"""
+    writer = AuditWriter(mode="buffered", wal_path=wal_path, flush_interval=0.1)
+    writer.start()
+    seen_at_commit = []
+
+    def on_commit(conn):
+        if not seen_at_commit:
+            with open(writer.process_wal_path, "rb") as f:
+                seen_at_commit.append(f.read().decode("utf-8"))
+
+    history = make_history(ticket_id, "WAL до commit")
+    db = SessionLocal()
+    event.listen(engine, "commit", on_commit)
+    try:
+        # Изменение тикета и запись истории о нем в одной транзакции
+        db.get(Ticket, ticket_id).status = TicketStatus.IN_WORK
+        writer.write(db, history)
+        db.commit()
+    finally:
+        event.remove(engine, "commit", on_commit)
+        db.close()
+
+    try:
+        assert seen_at_commit and str(history.id) in seen_at_commit[0], \
+            "Запись истории не в журнале на момент commit в БД"
+        assert wait_for_history([history.id]) == {history.id}, \
+            "Запись истории не вставлена в ticket_history"
+    finally:
+        writer.stop()
+    assert not os.path.exists(writer.process_wal_path), "Журнал не удален после вставки всех записей"
+    print("  Журнал: запись на диске до commit, затем вставлена в ticket_history")
+    return True
+
+
+def test_rollback_not_inserted(wal_path: str, ticket_id) -> bool:
+    """Записи транзакции, откатившейся после записи в журнал, не вставляются"""
+    writer = AuditWriter(mode="buffered", wal_path=wal_path, flush_interval=0.1)
+    writer.start()
+    history = make_history(ticket_id, "Откат после журнала")
+    db = SessionLocal()
+    try:
+        writer.write(db, history)
+        # email обязателен - flush внутри commit падает уже после записи в журнал
+        db.add(User(email=None, name="Audit rollback", role="client"))
+        try:
+            db.commit()
+        except Exception:
+            db.rollback()
+        else:
+            raise AssertionError("commit с нарушением NOT NULL не упал")
+        time.sleep(0.3)
+        assert not history_ids([history.id]), "Запись откатившейся транзакции вставлена"
+        assert not writer._unflushed, "Запись откатившейся транзакции ожидает вставки"
+    finally:
+        db.close()
+        writer.stop()
+    print("  Откат: запись из журнала отменена и не вставлена")
+    return True
+
+
+def test_replay_orphan(wal_path: str, ticket_id) -> bool:
+    """Журнал остановленного процесса вставляется при старте и удаляется"""
+    kept = AuditWriter._to_record(make_history(ticket_id, "Replay"))
+    rolled_back = AuditWriter._to_record(make_history(ticket_id, "Replay отката"))
+    orphan_path = f"{wal_path}.{2 ** 22 + 1}"
+    with open(orphan_path, "wb") as f:
+        for entry in (kept, rolled_back, {"rollback": [rolled_back["id"]]}):
+            f.write((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+        f.write(b'{"id": "')  # Запись оборвана при остановке процесса
+    with open(f"{orphan_path}.offset", "w", encoding="utf-8") as f:
+        f.write("0")
+
+    writer = AuditWriter(mode="buffered", wal_path=wal_path)
+    try:
+        writer.start()
+    finally:
+        writer.stop()
+
+    ids = [uuid.UUID(kept["id"]), uuid.UUID(rolled_back["id"])]
+    assert history_ids(ids) == {ids[0]}, "Replay вставил не те записи журнала"
+    assert not os.path.exists(orphan_path) and not os.path.exists(f"{orphan_path}.offset"), \
+        "Журнал остановленного процесса не удален после replay"
+    print("  Replay: записи журнала остановленного процесса вставлены, откат пропущен")
+    return True
+
+
+def main():
+    print("Checking audit writer...")
+    try:
+        db = SessionLocal()
+        user = User(email=f"audit_{uuid.uuid4().hex}@example.com", name="Audit", role="client")
+        db.add(user)
+        db.flush()
+        ticket = Ticket(source=TicketSource.EMAIL, user_id=user.id, body="Тест audit", status=TicketStatus.NEW)
+        db.add(ticket)
+        db.commit()
+    except Exception as e:
+        print(f"ℹ️ БД недоступна, тест пропущен: {e}")
+        return
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        wal_path = os.path.join(tmp, "audit_wal.jsonl")
+        for test in (test_wal_before_commit_and_drain, test_rollback_not_inserted, test_replay_orphan):
+            try:
+                test(wal_path, ticket.id)
+            except AssertionError as e:
+                print(f"  ❌ {e}")
+                failed = True
+
+    db.query(TicketHistory).filter(TicketHistory.ticket_id == ticket.id).delete()
+    db.query(Ticket).filter(Ticket.id == ticket.id).delete()
+    db.query(User).filter(User.id == user.id).delete()
+    db.commit()
+    db.close()
+
+    if failed:
+        print("\n[FAIL] Audit writer loses or invents history records")
+        sys.exit(1)
+    print("\n[OK] Audit writer keeps committed history records")
+
+
+if __name__ == "__main__":
+    main()
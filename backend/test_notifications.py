@@ -6,6 +6,7 @@ from database import engine
 from models.user import User, UserRole
 from models.notification import Notification, NotificationType
 from models.ticket import Ticket
+from services.notification_service import NotificationService
 from uuid import uuid4
 
 SessionLocal = sessionmaker(bind=engine)
@@ -39,14 +40,12 @@ try:
     else:
         print("No tickets found")
     
-    # Проверяем все уведомления админа
-    admin_notifications = db.query(Notification).filter(
-        Notification.user_id == admin.id
-    ).all()
+    # Проверяем все уведомления админа (личные и для роли admin)
+    admin_notifications = NotificationService().list_for_user(db, admin, limit=1000)
     
     print(f"\nTotal notifications for admin: {len(admin_notifications)}")
-    for notif in admin_notifications[:5]:  # Показываем первые 5
-        print(f"  - [{notif.notification_type.value}] {notif.title} (read: {notif.is_read})")
+    for notif, is_read in admin_notifications[:5]:  # Показываем первые 5
+        print(f"  - [{notif.notification_type.value}] {notif.title} (read: {is_read})")
     
     print("\n[OK] Test completed!")
     
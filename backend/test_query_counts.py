@@ -0,0 +1,186 @@
+"""
+Тест количества запросов: списки комментариев, истории и шаблонов и страница
+тикета (/tickets/{id}/full) не должны делать запрос на каждую строку (N+1)
+
+Для каждого эндпоинта создаются данные двух размеров (короткая и длинная
+ветка с разными пользователями) и считается число SQL запросов при вызове
+обработчика. Число запросов должно быть одинаковым для обоих размеров.
+
+Данные создаются в транзакции, которая откатывается в конце, поэтому тест
+можно запускать на локальной БД (PostgreSQL или SQLite с созданными таблицами).
+Запуск: python test_query_counts.py
+"""
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import engine
+from models.category import Category
+from models.template import Template
+from models.ticket import Ticket, TicketSource, TicketStatus
+from models.ticket_history import TicketHistory, HistoryAction
+from models.ticket_message import TicketMessage
+from models.user import User
+from routers.comments import get_comments
+from routers.templates import list_templates
+from routers.ticket_history import get_ticket_history
+from routers.tickets import get_ticket_full
+from services.template_catalog import template_catalog
+
+SHORT_THREAD = 2
+LONG_THREAD = 50
+
+
+def count_queries(connection, fn) -> int:
+    """Выполняет fn и возвращает количество SQL запросов"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+    return len(statements)
+
+
+def create_users(db, count: int):
+    users = [
+        User(email=f"query_count_{uuid.uuid4().hex}@example.com", name=f"User {i}", role="client")
+        for i in range(count)
+    ]
+    db.add_all(users)
+    db.flush()
+    return users
+
+
+def create_ticket_with_thread(db, length: int) -> Ticket:
+    """Тикет с length комментариями и записями истории от разных пользователей"""
+    users = create_users(db, length)
+    ticket = Ticket(source=TicketSource.EMAIL, user_id=users[0].id, body="Тест N+1", status=TicketStatus.NEW)
+    db.add(ticket)
+    db.flush()
+
+    started_at = datetime.utcnow()
+    for i, user in enumerate(users):
+        created_at = started_at + timedelta(seconds=i)
+        db.add(TicketMessage(ticket_id=ticket.id, sender_id=user.id, text=f"Комментарий {i}", created_at=created_at))
+        db.add(TicketHistory(
+            ticket_id=ticket.id, user_id=user.id, action=HistoryAction.COMMENT_ADDED,
+            description=f"Комментарий {i}", created_at=created_at
+        ))
+    db.flush()
+    return ticket
+
+
+def create_templates(db, count: int):
+    """count шаблонов, каждый в своей категории"""
+    for i in range(count):
+        category = Category(name=f"query_count_{uuid.uuid4().hex}")
+        db.add(category)
+        db.flush()
+        db.add(Template(name=f"Шаблон {i}", category_id=category.id, content="Текст"))
+    db.flush()
+
+
+def test_comments(connection, db) -> bool:
+    """Комментарии: число запросов не зависит от количества сообщений"""
+    short = create_ticket_with_thread(db, SHORT_THREAD)
+    long = create_ticket_with_thread(db, LONG_THREAD)
+
+    short_count = count_queries(connection, lambda: get_comments(short.id, Response(), None, db, after=None, limit=None))
+    long_count = count_queries(connection, lambda: get_comments(long.id, Response(), None, db, after=None, limit=None))
+    print(f"  Комментарии: {SHORT_THREAD} -> {short_count} запросов, {LONG_THREAD} -> {long_count} запросов")
+
+    assert short_count == long_count, "Количество запросов зависит от количества комментариев"
+    return True
+
+
+def test_history(connection, db) -> bool:
+    """История: число запросов не зависит от количества записей"""
+    short = create_ticket_with_thread(db, SHORT_THREAD)
+    long = create_ticket_with_thread(db, LONG_THREAD)
+
+    short_count = count_queries(connection, lambda: get_ticket_history(short.id, Response(), None, db))
+    long_count = count_queries(connection, lambda: get_ticket_history(long.id, Response(), None, db))
+    print(f"  История: {SHORT_THREAD} -> {short_count} запросов, {LONG_THREAD} -> {long_count} запросов")
+
+    assert short_count == long_count, "Количество запросов зависит от количества записей истории"
+    return True
+
+
+def test_ticket_full(connection, db) -> bool:
+    """Страница тикета (/full): число запросов не зависит от длины переписки"""
+    short = create_ticket_with_thread(db, SHORT_THREAD)
+    long = create_ticket_with_thread(db, LONG_THREAD)
+
+    short_count = count_queries(connection, lambda: get_ticket_full(short.id, db))
+    long_count = count_queries(connection, lambda: get_ticket_full(long.id, db))
+    print(f"  Страница тикета: {SHORT_THREAD} -> {short_count} запросов, {LONG_THREAD} -> {long_count} запросов")
+
+    assert short_count == long_count, "Количество запросов зависит от длины переписки"
+    return True
+
+
+def test_templates(connection, db) -> bool:
+    """Шаблоны: число запросов не зависит от количества шаблонов и категорий"""
+    def list_all():
+        return list_templates(category_id=None, category_name=None, is_active=None, db=db)
+
+    def load_catalog():
+        # Загрузка каталога шаблонов заново (как после изменения шаблона)
+        template_catalog.invalidate()
+        return list_all()
+
+    create_templates(db, SHORT_THREAD)
+    load_catalog()  # Прогрев кэша справочников
+    short_count = count_queries(connection, load_catalog)
+
+    create_templates(db, LONG_THREAD)
+    load_catalog()
+    long_count = count_queries(connection, load_catalog)
+    print(f"  Шаблоны: +{SHORT_THREAD} -> {short_count} запросов, +{LONG_THREAD} -> {long_count} запросов")
+
+    assert short_count == long_count, "Количество запросов зависит от количества шаблонов"
+    return True
+
+
+def main():
+    try:
+        connection = engine.connect()
+    except Exception as e:
+        print(f"ℹ️ БД недоступна, тест пропущен: {e}")
+        return
+
+    transaction = connection.begin()
+    db = Session(bind=connection, join_transaction_mode="create_savepoint")
+
+    print("Checking query counts...")
+    failed = False
+    try:
+        for test in (test_comments, test_history, test_ticket_full, test_templates):
+            try:
+                test(connection, db)
+            except AssertionError as e:
+                print(f"  ❌ {e}")
+                failed = True
+    finally:
+        template_catalog.invalidate()  # Каталог видел данные откатываемой транзакции
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+    if failed:
+        print("\n[FAIL] N+1 queries detected")
+        sys.exit(1)
+    print("\n[OK] Query counts do not depend on thread length")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Тест планов запросов: частые запросы по тикетам не должны делать Seq Scan
+
+Запросы повторяют фильтры и сортировки из routers/tickets.py, routers/comments.py,
+routers/ticket_history.py и services/stats_service.py. Для каждого выполняется
+EXPLAIN (FORMAT JSON) с enable_seqscan = off: в этом режиме PostgreSQL выбирает
+Seq Scan, только если подходящего индекса нет, поэтому тест не зависит от объема
+данных в локальной БД.
+
+Требуется локальный PostgreSQL с примененной миграцией migrations/add_ticket_indexes.py.
+Запуск: python test_query_plans.py
+"""
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, tuple_, text
+from sqlalchemy.orm import sessionmaker
+
+from database import engine
+from models.ticket import Ticket, TicketStatus
+from models.ticket_message import TicketMessage
+from models.ticket_history import TicketHistory
+from models.ai_prediction import AIPrediction
+
+SessionLocal = sessionmaker(bind=engine)
+
+# Таблицы, по которым Seq Scan недопустим
+WATCHED_TABLES = {"tickets", "ticket_messages", "ticket_history", "ai_predictions"}
+
+
+def hot_queries(db):
+    """Частые запросы приложения: (название, запрос)"""
+    some_id = uuid.uuid4()
+    now = datetime.utcnow()
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    return [
+        ("Список тикетов (первая страница)",
+         db.query(Ticket).order_by(Ticket.created_at.desc(), Ticket.id.desc()).limit(50)),
+        ("Список тикетов (страница по курсору)",
+         db.query(Ticket).filter(tuple_(Ticket.created_at, Ticket.id) < (now, some_id))
+         .order_by(Ticket.created_at.desc(), Ticket.id.desc()).limit(50)),
+        ("Фильтр по статусу",
+         db.query(Ticket).filter(Ticket.status == TicketStatus.NEW)
+         .order_by(Ticket.created_at.desc()).limit(50)),
+        ("Фильтр по категории",
+         db.query(Ticket).filter(Ticket.category_id == some_id)
+         .order_by(Ticket.created_at.desc()).limit(50)),
+        ("Фильтр по периоду",
+         db.query(Ticket).filter(Ticket.created_at >= now - timedelta(days=7), Ticket.created_at < now)
+         .order_by(Ticket.created_at.desc()).limit(50)),
+        ("Тикеты пользователя",
+         db.query(Ticket).filter(Ticket.user_id == some_id)),
+        ("Тикеты оператора",
+         db.query(Ticket).filter(Ticket.assigned_operator_id == some_id)),
+        ("Комментарии тикета",
+         db.query(TicketMessage).filter(TicketMessage.ticket_id == some_id)
+         .order_by(TicketMessage.created_at.asc())),
+        ("История тикета",
+         db.query(TicketHistory).filter(TicketHistory.ticket_id == some_id)
+         .order_by(TicketHistory.created_at.asc())),
+        ("Предсказания тикета",
+         db.query(AIPrediction).filter(AIPrediction.ticket_id == some_id)),
+        ("Статистика: тикеты за день",
+         db.query(func.count(Ticket.id)).filter(Ticket.created_at >= day_start, Ticket.created_at <= now)),
+        ("Статистика: уверенность ИИ за день",
+         db.query(func.avg(AIPrediction.confidence))
+         .filter(AIPrediction.created_at >= day_start, AIPrediction.created_at <= now)),
+    ]
+
+
+def find_seq_scans(plan_node, found=None):
+    """Рекурсивно собирает таблицы, которые читаются через Seq Scan"""
+    if found is None:
+        found = []
+    if plan_node.get("Node Type") == "Seq Scan" and plan_node.get("Relation Name") in WATCHED_TABLES:
+        found.append(plan_node["Relation Name"])
+    for child in plan_node.get("Plans", []):
+        find_seq_scans(child, found)
+    return found
+
+
+def explain(db, query) -> dict:
+    """Возвращает корневой узел плана запроса"""
+    sql = str(query.statement.compile(
+        dialect=db.bind.dialect,
+        compile_kwargs={"literal_binds": True}
+    ))
+    result = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    return result[0]["Plan"]
+
+
+def test_no_seq_scans(db) -> bool:
+    """Ни один частый запрос не должен читать большие таблицы последовательно"""
+    failures = []
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    for name, query in hot_queries(db):
+        seq_scans = find_seq_scans(explain(db, query))
+        status = "❌ Seq Scan: " + ", ".join(seq_scans) if seq_scans else "✅ index"
+        print(f"  {name}: {status}")
+        if seq_scans:
+            failures.append(name)
+    db.rollback()
+
+    assert not failures, f"Seq Scan в запросах: {', '.join(failures)}"
+    return True
+
+
+def main():
+    if engine.dialect.name != "postgresql":
+        print("ℹ️ Тест планов запросов требует PostgreSQL, пропущен")
+        return
+
+    try:
+        db = SessionLocal()
+        db.execute(text("SELECT 1"))
+    except Exception as e:
+        print(f"ℹ️ PostgreSQL недоступен, тест пропущен: {e}")
+        return
+
+    print("Checking query plans...")
+    try:
+        test_no_seq_scans(db)
+        print("\n[OK] All hot queries use indexes")
+    except AssertionError as e:
+        print(f"\n[FAIL] {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Тест кэша справочников: откат транзакции и invalidate() во время загрузки
+не должны оставлять в общем кэше строки, которых нет в БД
+
+Данные создаются в транзакции, которая откатывается в конце, поэтому тест
+можно запускать на локальной БД (PostgreSQL или SQLite с созданными таблицами).
+Запуск: python test_reference_cache.py
+"""
+import sys
+import uuid
+from types import SimpleNamespace
+
+from sqlalchemy.orm import Session
+
+from database import engine
+from services.reference_cache import ReferenceCache, _Snapshot, reference_cache
+
+
+def test_rollback(db) -> bool:
+    """Категория, созданная в откатанной транзакции, не остается в кэше"""
+    name = f"poison_cat_{uuid.uuid4().hex}"
+    category_id = reference_cache.get_or_create_category_id(db, name)
+    # Перечитывает справочники в той же транзакции
+    reference_cache.get_or_create_model_id(db)
+    assert reference_cache.get_category_id(db, name) == category_id, \
+        "Транзакция не видит созданную категорию"
+
+    db.rollback()
+    assert reference_cache.get_category_id(db, name) is None, \
+        "Кэш вернул категорию из откатанной транзакции"
+    print("  Откат: категория из откатанной транзакции не закэширована")
+    return True
+
+
+def test_invalidate_during_load() -> bool:
+    """Снимок, загрузка которого началась до invalidate(), не сохраняется"""
+    class RacingCache(ReferenceCache):
+        def _load(self, db):
+            # Справочник изменился и закоммичен, пока шла загрузка
+            self.invalidate()
+            return _Snapshot([], [], None)
+
+    cache = RacingCache()
+    cache._get(SimpleNamespace(info={}))  # Сессия без незакоммиченных справочников
+    assert cache._snapshot is None, "Устаревший снимок сохранен после invalidate()"
+    print("  invalidate() во время загрузки: устаревший снимок отброшен")
+    return True
+
+
+def main():
+    print("Checking reference cache...")
+    failed = False
+    try:
+        test_invalidate_during_load()
+    except AssertionError as e:
+        print(f"  ❌ {e}")
+        failed = True
+
+    try:
+        connection = engine.connect()
+    except Exception as e:
+        print(f"ℹ️ БД недоступна, тест отката пропущен: {e}")
+        connection = None
+
+    if connection is not None:
+        transaction = connection.begin()
+        db = Session(bind=connection, join_transaction_mode="create_savepoint")
+        try:
+            test_rollback(db)
+        except AssertionError as e:
+            print(f"  ❌ {e}")
+            failed = True
+        finally:
+            db.close()
+            transaction.rollback()
+            connection.close()
+            reference_cache.invalidate()
+
+    if failed:
+        print("\n[FAIL] Reference cache keeps stale rows")
+        sys.exit(1)
+    print("\n[OK] Reference cache drops uncommitted rows")
+
+
+if __name__ == "__main__":
+    main()
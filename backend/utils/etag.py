@@ -0,0 +1,45 @@
+"""
+Utility functions for conditional GET (ETag / If-None-Match)
+
+ETag строится из признаков версии данных: updated_at тикета для карточки,
+(id, updated_at) строк уже загруженной страницы и параметры запроса для списка.
+Если клиент прислал тот же ETag в If-None-Match, отвечаем 304 без сериализации
+и передачи ответа.
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Response
+
+
+def make_etag(*parts) -> str:
+    """Слабый ETag из значений, определяющих версию ответа"""
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    return f'W/"{hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверяет If-None-Match (список ETag через запятую или *), сравнение слабое"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def set_etag(response: Response, etag: str):
+    """Добавляет ETag к ответу; no-cache - браузер перепроверяет данные при каждом запросе"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+
+
+def not_modified(etag: str) -> Response:
+    """Ответ 304 Not Modified"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
@@ -1,9 +1,13 @@
 """
 Utility functions for ticket history tracking
+
+Записи передаются audit_writer: в транзакцию запроса или, в режиме
+AUDIT_WRITER_MODE=buffered, в фоновую запись пачками после commit.
 """
 from sqlalchemy.orm import Session
 from models.ticket_history import TicketHistory, HistoryAction
 from models.ticket import Ticket, TicketStatus, TicketPriority
+from services.audit_writer import audit_writer
 from uuid import UUID
 from typing import Optional
 
@@ -16,7 +20,7 @@ def log_ticket_creation(ticket: Ticket, db: Session, user_id: Optional[UUID] = N
         action=HistoryAction.CREATED,
         description=f"Тикет создан: {ticket.subject or ticket.body[:50]}"
     )
-    db.add(history)
+    audit_writer.write(db, history)
 
 
 def log_status_change(
@@ -35,7 +39,7 @@ def log_status_change(
         new_value=new_status.value,
         description=f"Статус изменен: {old_status.value} → {new_status.value}"
     )
-    db.add(history)
+    audit_writer.write(db, history)
 
 
 def log_priority_change(
@@ -54,7 +58,7 @@ def log_priority_change(
         new_value=new_priority.value,
         description=f"Приоритет изменен: {old_priority.value if old_priority else 'не установлен'} → {new_priority.value}"
     )
-    db.add(history)
+    audit_writer.write(db, history)
 
 
 def log_assignment(
@@ -71,7 +75,7 @@ def log_assignment(
         new_value=str(operator_id) if operator_id else None,
         description=f"Тикет назначен оператору: {operator_id}" if operator_id else "Назначение оператора снято"
     )
-    db.add(history)
+    audit_writer.write(db, history)
 
 
 def log_comment_added(
@@ -86,5 +90,5 @@ def log_comment_added(
         action=HistoryAction.COMMENT_ADDED,
         description="Добавлен комментарий"
     )
-    db.add(history)
+    audit_writer.write(db, history)
 
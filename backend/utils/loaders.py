@@ -0,0 +1,46 @@
+"""
+Utility functions for batch loading related objects
+
+Вместо запроса на каждую строку (N+1) связанные объекты всех строк
+загружаются одним запросом WHERE id IN (...), а затем берутся из словаря.
+"""
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from models.user import User
+
+
+def load_by_ids(db: Session, model, ids: Iterable, *columns) -> Dict:
+    """
+    Загружает объекты модели по id одним запросом
+
+    Args:
+        db: Сессия БД
+        model: Модель с колонкой id
+        ids: id (повторы и None пропускаются)
+        columns: если заданы, загружаются только эти колонки (строки вместо ORM объектов)
+
+    Returns:
+        {id: объект или строка}; отсутствующих в БД id в словаре нет
+    """
+    unique_ids = {item_id for item_id in ids if item_id is not None}
+    if not unique_ids:
+        return {}
+    if columns:
+        rows = db.query(model.id, *columns).filter(model.id.in_(unique_ids)).all()
+    else:
+        rows = db.query(model).filter(model.id.in_(unique_ids)).all()
+    return {row.id: row for row in rows}
+
+
+def load_users(db: Session, user_ids: Iterable) -> Dict:
+    """Пользователи по id (только имя, email и роль - для подписи сообщений и записей истории)"""
+    return load_by_ids(db, User, user_ids, User.name, User.email, User.role)
+
+
+def user_display_name(user) -> Optional[str]:
+    """Имя пользователя для отображения (или email, если имени нет)"""
+    if user is None:
+        return None
+    return user.name or user.email
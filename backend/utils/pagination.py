@@ -0,0 +1,60 @@
+"""
+Utility functions for keyset (cursor) pagination
+
+Курсор - непрозрачная строка с (created_at, id) последней строки страницы.
+Следующая страница выбирается условием (created_at, id) < курсор, поэтому
+стоимость запроса не зависит от номера страницы (в отличие от OFFSET).
+"""
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    """Кодирует позицию строки в курсор"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    Декодирует курсор в (created_at, id)
+
+    Raises:
+        ValueError: если курсор поврежден
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def apply_keyset(query, created_at_column, id_column, cursor: Optional[str] = None, descending: bool = True):
+    """
+    Сортирует запрос по (created_at, id) и, если передан курсор,
+    оставляет только строки после него
+
+    Raises:
+        ValueError: если курсор поврежден
+    """
+    if cursor:
+        position = decode_cursor(cursor)
+        key = tuple_(created_at_column, id_column)
+        query = query.filter(key < position if descending else key > position)
+    if descending:
+        return query.order_by(created_at_column.desc(), id_column.desc())
+    return query.order_by(created_at_column.asc(), id_column.asc())
+
+
+def next_cursor(rows: List, limit: int) -> Optional[str]:
+    """Курсор следующей страницы (None, если страница неполная - дальше строк нет)"""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(last.created_at, last.id)
@@ -3,7 +3,7 @@ import { useNavigate, Link } from 'react-router-dom';
 import { LineChart, Line, BarChart, Bar, PieChart, Pie, Cell, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
 import { Metrics, Ticket } from '../types';
 import { fetchMetrics } from '../utils/metrics';
-import { api } from '../utils/apiGenerated';
+import { api, type TicketFacets } from '../utils/apiGenerated';
 import { exportMetricsToPDF, exportTicketsToCSV } from '../utils/export';
 import { storage } from '../utils/storage';
 import { showToast } from '../utils/toast';
@@ -17,6 +17,7 @@ export const Analytics: React.FC = () => {
   const { t } = useLanguage();
   const [metrics, setMetrics] = useState<Metrics | null>(null);
   const [tickets, setTickets] = useState<Ticket[]>([]);
+  const [facets, setFacets] = useState<TicketFacets | null>(null);
   const [loading, setLoading] = useState(true);
   const [dateRange, setDateRange] = useState(7);
   const navigate = useNavigate();
@@ -33,11 +34,13 @@ export const Analytics: React.FC = () => {
     setLoading(true);
     try {
       // Используем новый сгенерированный API
-      const [metricsData, ticketsData] = await Promise.all([
+      const [metricsData, ticketsData, facetsData] = await Promise.all([
         fetchMetrics(),
-        api.tickets.list()
+        api.tickets.list(),
+        api.tickets.facets()
       ]);
       setMetrics(metricsData);
+      setFacets(facetsData);
       // Преобразуем новые типы в старые для обратной совместимости
       const oldTickets: Ticket[] = ticketsData.map(t => ({
         id: parseInt(t.id) || 0,
@@ -74,25 +77,24 @@ export const Analytics: React.FC = () => {
     showToast(t('analytics.csv_success'), 'success');
   };
 
-  // Подготовка данных для графиков
-  const categoryData = tickets.reduce((acc, ticket) => {
-    acc[ticket.category] = (acc[ticket.category] || 0) + 1;
-    return acc;
-  }, {} as Record<string, number>);
-
-  const categoryChartData = Object.entries(categoryData).map(([name, value]) => ({
-    name,
-    value
+  // Подготовка данных для графиков: распределения по категориям и статусам
+  // считаются на сервере по всем тикетам (/tickets/facets), а не по загруженной странице
+  const categoryChartData = (facets?.category || []).map(bucket => ({
+    name: bucket.name || bucket.value || 'Без категории',
+    value: bucket.count
   }));
 
-  const statusData = tickets.reduce((acc, ticket) => {
-    acc[ticket.status] = (acc[ticket.status] || 0) + 1;
-    return acc;
-  }, {} as Record<string, number>);
+  const statusLabels: Record<string, string> = {
+    new: 'Открыта',
+    in_work: 'В работе',
+    waiting: 'Ожидание',
+    auto_resolved: 'Решена автоматически',
+    closed: 'Закрыта'
+  };
 
-  const statusChartData = Object.entries(statusData).map(([name, value]) => ({
-    name: name === 'Open' ? 'Открыта' : name === 'In Progress' ? 'В работе' : name === 'Closed' ? 'Закрыта' : 'Ожидание',
-    value
+  const statusChartData = (facets?.status || []).map(bucket => ({
+    name: statusLabels[bucket.value || ''] || bucket.value || '',
+    value: bucket.count
   }));
 
   // Тренды по дням
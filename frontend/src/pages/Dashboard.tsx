@@ -39,11 +39,11 @@ export const Dashboard: React.FC = () => {
 
   const loadNewTicketsCount = async () => {
     try {
-      // Используем новый сгенерированный API
-      const tickets = await api.tickets.list({ 
+      // Счетчик считается на сервере (без загрузки списка тикетов)
+      const facets = await api.tickets.facets({ 
         status: 'in_work' // Статусы: 'new' | 'auto_resolved' | 'in_work' | 'waiting' | 'closed'
       });
-      setNewTicketsCount(tickets.length);
+      setNewTicketsCount(facets.total);
     } catch (error) {
       // Игнорируем ошибки
     }
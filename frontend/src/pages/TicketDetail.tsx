@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate, Link } from 'react-router-dom';
 import { Ticket, Comment, TicketHistory } from '../types';
-import { getTicket, getComments, addComment, submitFeedback, getTemplates, closeTicket } from '../utils/ticket';
+import { getTicketFull, getComments, addComment, submitFeedback, getTemplates, renderTemplate, closeTicket } from '../utils/ticket';
 import { getTicketHistory } from '../utils/api';
 import { storage } from '../utils/storage';
 import { showToast } from '../utils/toast';
@@ -10,6 +10,35 @@ import { ru } from 'date-fns/locale';
 import { Template } from '../types';
 import { useLanguage } from '../contexts/LanguageContext';
 
+// Преобразует комментарий API для отображения
+const toDisplayComment = (c: Comment): Comment => {
+  // Определяем тип автора на основе роли
+  let authorType: 'user' | 'operator' | 'system' | 'admin' = 'user';
+  if (c.is_auto_reply) {
+    authorType = 'system';
+  } else if (c.user_role === 'admin') {
+    authorType = 'admin';
+  } else if (c.user_role === 'employee') {
+    authorType = 'operator';
+  }
+
+  // Формируем имя автора с учетом роли
+  let authorName = c.user_name || c.user_email || c.user_id || 'Неизвестный пользователь';
+  if (c.user_role === 'admin') {
+    // Для админа показываем имя "Админ" или email, если имени нет
+    authorName = c.user_name || c.user_email || 'Админ';
+  } else if (c.user_role === 'employee') {
+    authorName = `👨‍💼 Оператор${c.user_name ? ` (${c.user_name})` : ''}`;
+  }
+
+  return {
+    ...c,
+    author: authorName,
+    text: c.comment_text || c.text || '',
+    author_type: authorType
+  };
+};
+
 export const TicketDetail: React.FC = () => {
   const { t } = useLanguage();
   const { id } = useParams<{ id: string }>();
@@ -41,42 +70,16 @@ export const TicketDetail: React.FC = () => {
     if (!id) return;
     setLoading(true);
     try {
-      // id может быть UUID (строка) или число, передаем как есть
-      const [ticketData, commentsData, historyData] = await Promise.all([
-        getTicket(id),
-        getComments(id),
-        getTicketHistory(id).catch(() => []) // История может быть не реализована
-      ]);
+      // Тикет, комментарии, история и оценка - одним запросом
+      const {
+        ticket: ticketData,
+        comments: commentsData,
+        history: historyData,
+        feedback: existingFeedback
+      } = await getTicketFull(id);
       setTicket(ticketData);
       // Преобразуем комментарии для отображения
-      const displayComments = commentsData.map(c => {
-        // Определяем тип автора на основе роли
-        let authorType: 'user' | 'operator' | 'system' | 'admin' = 'user';
-        if (c.is_auto_reply) {
-          authorType = 'system';
-        } else if (c.user_role === 'admin') {
-          authorType = 'admin';
-        } else if (c.user_role === 'employee') {
-          authorType = 'operator';
-        }
-        
-        // Формируем имя автора с учетом роли
-        let authorName = c.user_name || c.user_email || c.user_id || 'Неизвестный пользователь';
-        if (c.user_role === 'admin') {
-          // Для админа показываем имя "Админ" или email, если имени нет
-          authorName = c.user_name || c.user_email || 'Админ';
-        } else if (c.user_role === 'employee') {
-          authorName = `👨‍💼 Оператор${c.user_name ? ` (${c.user_name})` : ''}`;
-        }
-        
-        return {
-          ...c,
-          author: authorName,
-          text: c.comment_text || c.text || '',
-          author_type: authorType
-        };
-      });
-      setComments(displayComments);
+      setComments(commentsData.map(toDisplayComment));
       setHistory(historyData);
       
       // Загружаем шаблоны после получения тикета
@@ -87,14 +90,7 @@ export const TicketDetail: React.FC = () => {
       
       // Показываем CSAT модалку если тикет закрыт и нет существующей оценки
       if (ticketData && (ticketData.status === 'Closed' || ticketData.status === 'closed' || ticketData.status === 'auto_resolved')) {
-        try {
-          const { apiRequest } = await import('../utils/apiConfig');
-          const existingFeedback = await apiRequest(`/tickets/${id}/feedback`).catch(() => null);
-          if (!existingFeedback) {
-            setShowCSAT(true);
-          }
-        } catch (error) {
-          // Если ошибка, все равно показываем модалку
+        if (!existingFeedback) {
           setShowCSAT(true);
         }
       }
@@ -110,39 +106,21 @@ export const TicketDetail: React.FC = () => {
     setSubmittingComment(true);
     try {
       // id может быть UUID (строка) или число, передаем как есть
+      const lastCommentId = comments.length ? comments[comments.length - 1].id : undefined;
       const comment = await addComment(id, newComment, false);
-      // Определяем тип автора на основе роли
-      let authorType: 'user' | 'operator' | 'system' | 'admin' = 'user';
-      if (comment.is_auto_reply) {
-        authorType = 'system';
-      } else if (comment.user_role === 'admin') {
-        authorType = 'admin';
-      } else if (comment.user_role === 'employee') {
-        authorType = 'operator';
-      }
-      
-      // Формируем имя автора с учетом роли
-      let authorName = comment.user_name || comment.user_email || comment.user_id || 'Неизвестный пользователь';
-      if (comment.user_role === 'admin') {
-        // Для админа показываем имя "Админ" или email, если имени нет
-        authorName = comment.user_name || comment.user_email || 'Админ';
-      } else if (comment.user_role === 'employee') {
-        authorName = `👨‍💼 Оператор${comment.user_name ? ` (${comment.user_name})` : ''}`;
-      }
-      
-      // Преобразуем для отображения
-      const displayComment: Comment = {
-        ...comment,
-        author: authorName,
-        text: comment.comment_text,
-        author_type: authorType
-      };
-      setComments([...comments, displayComment]);
+      setComments([...comments, toDisplayComment(comment)]);
       setNewComment('');
       showToast(t('error.comment_added'), 'success');
       
-      // Перезагружаем комментарии для получения актуальных данных
-      await loadTicketData();
+      // Догружаем только новые комментарии (свой и появившиеся с момента загрузки) и историю
+      const [newComments, historyData] = await Promise.all([
+        getComments(id, lastCommentId ? String(lastCommentId) : undefined),
+        getTicketHistory(id).catch(() => history)
+      ]);
+      if (newComments.length) {
+        setComments([...comments, ...newComments.map(toDisplayComment)]);
+      }
+      setHistory(historyData);
     } catch (error) {
       console.error('Error adding comment:', error);
       showToast(t('error.add_comment'), 'error');
@@ -468,9 +446,14 @@ export const TicketDetail: React.FC = () => {
                     key={template.id}
                     className="ghost"
                     style={{ textAlign: 'left', padding: '8px', fontSize: '0.85em' }}
-                    onClick={() => {
-                      setNewComment(template.content || template.text || '');
+                    onClick={async () => {
                       setShowTemplates(false);
+                      const content = template.content || template.text || '';
+                      setNewComment(content);
+                      if (id && content.includes('{{')) {
+                        // Подставляем данные тикета в плейсхолдеры
+                        setNewComment(await renderTemplate(String(template.id), id).catch(() => content));
+                      }
                     }}
                   >
                     <strong>{template.name}</strong> - {(template.content || template.text || '').substring(0, 50)}...
@@ -8,6 +8,24 @@ import { apiClient, type TicketResponse, type TicketCreate, type TicketUpdate, t
 // Реэкспортируем типы для удобства использования
 export type { TicketResponse, TicketCreate, TicketUpdate, UserRegister, UserLogin, TokenResponse, UserResponse };
 
+/**
+ * Количество тикетов по фасетам (GET /tickets/facets)
+ */
+export interface TicketFacetBucket {
+  value: string | null;
+  name?: string | null;
+  count: number;
+}
+
+export interface TicketFacets {
+  total: number;
+  status: TicketFacetBucket[];
+  category: TicketFacetBucket[];
+  priority: TicketFacetBucket[];
+  source: TicketFacetBucket[];
+  department: TicketFacetBucket[];
+}
+
 /**
  * API для аутентификации
  */
@@ -71,6 +89,20 @@ export const ticketsApi = {
     });
   },
 
+  /**
+   * Получить количество тикетов по статусу, категории, приоритету, источнику и департаменту
+   */
+  async facets(params?: {
+    status?: 'new' | 'auto_resolved' | 'in_work' | 'waiting' | 'closed';
+    category_id?: string;
+    date_from?: string;
+    date_to?: string;
+  }): Promise<TicketFacets> {
+    return apiClient.get('/tickets/facets', {
+      query: params,
+    });
+  },
+
   /**
    * Получить тикет по ID
    */
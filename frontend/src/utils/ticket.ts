@@ -1,4 +1,4 @@
-import { TicketResult, Ticket, TicketListResponse, Comment, Feedback, Template } from '../types';
+import { TicketResult, Ticket, TicketListResponse, Comment, Feedback, Template, TicketHistory } from '../types';
 import { storage } from './storage';
 import { apiRequest } from './apiConfig';
 import { api } from './apiGenerated';
@@ -68,7 +68,34 @@ export async function getTicket(ticket_id: number | string): Promise<Ticket> {
   // ticket_id может быть UUID (строка) или число
   const ticketIdStr = typeof ticket_id === 'string' ? ticket_id : ticket_id.toString();
   const ticket: TicketResponse = await api.tickets.getById(ticketIdStr);
-  
+  return toTicket(ticket);
+}
+
+// Все данные страницы тикета одним запросом (/tickets/{id}/full)
+export interface TicketFullData {
+  ticket: Ticket;
+  comments: Comment[];
+  history: TicketHistory[];
+  feedback: Feedback | null;
+}
+
+export async function getTicketFull(ticket_id: number | string): Promise<TicketFullData> {
+  const ticketIdStr = typeof ticket_id === 'string' ? ticket_id : ticket_id.toString();
+  const data = await apiRequest<{
+    ticket: TicketResponse;
+    comments: Comment[];
+    history: TicketHistory[];
+    feedback: Feedback | null;
+  }>(`/tickets/${ticketIdStr}/full`);
+  return {
+    ticket: toTicket(data.ticket),
+    comments: data.comments,
+    history: data.history,
+    feedback: data.feedback
+  };
+}
+
+function toTicket(ticket: TicketResponse): Ticket {
   // Преобразуем новый тип в старый для обратной совместимости
   // Сохраняем UUID как строку, если это UUID
   const ticketId = ticket.id.match(/^[0-9]+$/) ? parseInt(ticket.id) : ticket.id;
@@ -131,10 +158,12 @@ export async function closeTicket(ticket_id: number | string): Promise<Ticket> {
   return updateTicket(ticket_id, 'closed');
 }
 
-export async function getComments(ticket_id: number | string): Promise<Comment[]> {
+// after - id последнего известного комментария: вернутся только более новые
+export async function getComments(ticket_id: number | string, after?: string): Promise<Comment[]> {
   const ticketIdStr = typeof ticket_id === 'string' ? ticket_id : ticket_id.toString();
+  const query = after ? `?after=${encodeURIComponent(after)}` : '';
   try {
-    return await apiRequest<Comment[]>(`/tickets/${ticketIdStr}/comments`);
+    return await apiRequest<Comment[]>(`/tickets/${ticketIdStr}/comments${query}`);
   } catch (error) {
     // Если эндпоинт не существует (404), возвращаем пустой массив
     if (error instanceof Error && error.message.includes('404')) {
@@ -198,6 +227,16 @@ export async function getTemplates(category?: string): Promise<Template[]> {
   }));
 }
 
+// Текст шаблона с плейсхолдерами ({{user_name}}, {{ticket_id}}, ...), заполненными из тикета
+export async function renderTemplate(template_id: string, ticket_id: number | string): Promise<string> {
+  const ticketIdStr = typeof ticket_id === 'string' ? ticket_id : ticket_id.toString();
+  const result = await apiRequest<{ content: string }>(
+    `/templates/${template_id}/render?ticket_id=${encodeURIComponent(ticketIdStr)}`,
+    { method: 'POST' }
+  );
+  return result.content;
+}
+
 export const ticketExamples = [
   'Не могу войти в корпоративную почту, пишет неверный пароль.',
   'Нужно перенести отпуск в системе HR.',
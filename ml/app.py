@@ -3,6 +3,7 @@ FastAPI сервис для ML классификации и автоответ
 """
 
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, Dict, List
 import os
@@ -13,8 +14,13 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from sentence_transformers import SentenceTransformer
 import joblib
+import numpy as np
 from auto_reply import AutoReplyService
 from improved_auto_reply import ImprovedAutoReplyService
+from batching import EmbeddingBatcher
+from inference_executor import InferenceExecutor
+from embedding_cache import EmbeddingCache
+from ticket_index import TicketIndex
 
 app = FastAPI(
     title="Help Desk ML Service",
@@ -30,6 +36,40 @@ embedding_model = None
 auto_reply_service = None
 improved_auto_reply_service = None  # Улучшенный сервис с LLM
 
+# Пакетная обработка
+MAX_PREDICT_BATCH_SIZE = int(os.getenv("ML_MAX_PREDICT_BATCH_SIZE", "256"))  # Максимум тикетов в /predict_batch
+ENCODE_BATCH_SIZE = int(os.getenv("ML_ENCODE_BATCH_SIZE", "32"))  # Размер мини-батча SentenceTransformer
+
+# Микро-батчинг конкурентных запросов (/predict, /auto_reply, /predict_and_reply)
+MICROBATCH_MAX_SIZE = int(os.getenv("ML_MICROBATCH_MAX_SIZE", "32"))
+MICROBATCH_WAIT_MS = float(os.getenv("ML_MICROBATCH_WAIT_MS", "5"))
+embedding_batcher = None
+
+# Пул для CPU-bound инференса: event loop остается свободным для /health и новых запросов
+INFERENCE_WORKERS = int(os.getenv("ML_INFERENCE_WORKERS", "0")) or None  # 0 - по числу ядер
+INFERENCE_EXECUTOR_KIND = os.getenv("ML_INFERENCE_EXECUTOR", "thread")  # thread или process
+# Способ запуска процессов пула: spawn (по умолчанию, есть на всех ОС) или fork
+INFERENCE_START_METHOD = os.getenv("ML_INFERENCE_START_METHOD", "spawn")
+inference_executor = None
+
+# Кэш эмбеддингов (общий для всех эндпоинтов и сервисов автоответа).
+# Хранится в основном процессе: при ML_INFERENCE_EXECUTOR=process в пул
+# передаются только тексты, которых нет в кэше
+EMBEDDING_CACHE_MB = float(os.getenv("ML_EMBEDDING_CACHE_MB", "64"))
+embedding_cache = None
+
+# Векторный индекс тикетов для семантического поиска
+TICKET_INDEX_PATH = os.getenv("ML_TICKET_INDEX_PATH", os.path.join("models", "ticket_index.faiss"))
+TICKET_INDEX_SAVE_EVERY = int(os.getenv("ML_TICKET_INDEX_SAVE_EVERY", "100"))  # Сохранять после N изменений
+MAX_INDEX_BATCH_SIZE = int(os.getenv("ML_MAX_INDEX_BATCH_SIZE", "1000"))  # Максимум тикетов в /ticket_index/add
+ticket_index = None
+
+# Индекс только открытых тикетов для поиска дубликатов при приеме: закрытые
+# тикеты убираются из него (/ticket_index/remove с open_only), поэтому старые
+# похожие обращения не вытесняют открытый основной тикет из кандидатов
+OPEN_TICKET_INDEX_PATH = os.getenv("ML_OPEN_TICKET_INDEX_PATH", os.path.join("models", "open_ticket_index.faiss"))
+open_ticket_index = None
+
 
 class TicketRequest(BaseModel):
     """Модель запроса для классификации тикета"""
@@ -38,6 +78,14 @@ class TicketRequest(BaseModel):
     language: Optional[str] = None  # 'ru', 'kz', или None для автоопределения
 
 
+class PredictAndReplyRequest(TicketRequest):
+    """Модель запроса классификации с автоответом"""
+    # Поиск дубликатов: тикеты из индекса со сходством >= duplicate_threshold
+    detect_duplicates: bool = False
+    duplicate_threshold: float = 0.92
+    max_duplicate_candidates: int = 10
+
+
 class AutoReplyRequest(BaseModel):
     """Модель запроса для автоответа"""
     text: str
@@ -47,6 +95,39 @@ class AutoReplyRequest(BaseModel):
     conversation_history: Optional[List[Dict]] = None  # История диалога для контекста
 
 
+class BatchTicketRequest(BaseModel):
+    """Модель запроса пакетной классификации"""
+    tickets: List[TicketRequest]
+    include_auto_reply: bool = False
+
+
+class IndexedTicket(BaseModel):
+    """Тикет для добавления в векторный индекс"""
+    ticket_id: str
+    subject: Optional[str] = ""
+    text: str
+    open: bool = False  # Открытый тикет - также в индекс поиска дубликатов
+
+
+class IndexTicketsRequest(BaseModel):
+    """Модель запроса на индексацию тикетов"""
+    tickets: List[IndexedTicket]
+
+
+class RemoveTicketsRequest(BaseModel):
+    """Модель запроса на удаление тикетов из индекса"""
+    ticket_ids: List[str]
+    open_only: bool = False  # Только из индекса открытых тикетов (тикет закрыт)
+
+
+class SearchTicketsRequest(BaseModel):
+    """Модель запроса семантического поиска тикетов"""
+    text: str
+    top_k: int = 10
+    exclude_ticket_ids: List[str] = []
+    min_score: float = 0.0
+
+
 class PredictionResponse(BaseModel):
     """Модель ответа классификации"""
     category: str
@@ -66,9 +147,14 @@ class AutoReplyResponse(BaseModel):
     language: Optional[str] = None
 
 
-def load_models():
-    """Загружает все обученные модели"""
-    global classifier_category, classifier_priority, classifier_problem_type, embedding_model, auto_reply_service, improved_auto_reply_service
+def load_models(with_ticket_index: bool = True):
+    """
+    Загружает все обученные модели
+    
+    Args:
+        with_ticket_index: загрузить индексы тикетов (не нужны процессам пула инференса)
+    """
+    global classifier_category, classifier_priority, classifier_problem_type, embedding_model, auto_reply_service, improved_auto_reply_service, embedding_cache, ticket_index, open_ticket_index
     
     models_dir = "models"
     
@@ -84,13 +170,21 @@ def load_models():
     embedding_model_path = os.path.join(models_dir, "sentence_transformer_model")
     if os.path.exists(embedding_model_path):
         embedding_model = SentenceTransformer(embedding_model_path)
+        # Дата изменения входит в версию: после переобучения кэш не отдает старые эмбеддинги
+        model_version = f"{embedding_model_path}@{int(os.path.getmtime(embedding_model_path))}"
         print(f"   ✅ Модель загружена из {embedding_model_path}")
     else:
         # Используем предобученную модель
         print("   ⚠️  Локальная модель не найдена, используем предобученную...")
         embedding_model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
+        model_version = "paraphrase-multilingual-MiniLM-L12-v2"
         print("   ✅ Предобученная модель загружена")
     
+    embedding_cache = EmbeddingCache(
+        model_version=os.getenv("ML_EMBEDDING_MODEL_VERSION", model_version),
+        max_bytes=int(EMBEDDING_CACHE_MB * 1024 * 1024)
+    )
+    
     # Загрузка классификаторов
     print("\n2. Загрузка классификаторов...")
     
@@ -121,7 +215,9 @@ def load_models():
         try:
             auto_reply_service = AutoReplyService(
                 responses_path=responses_path,
-                model_path=embedding_model_path if os.path.exists(embedding_model_path) else None
+                model_path=embedding_model_path if os.path.exists(embedding_model_path) else None,
+                embedding_model=embedding_model,
+                embedding_cache=embedding_cache
             )
             print("   ✅ Сервис автоответа инициализирован")
         except Exception as e:
@@ -138,13 +234,30 @@ def load_models():
             improved_auto_reply_service = ImprovedAutoReplyService(
                 responses_path=responses_path,
                 model_path=embedding_model_path if os.path.exists(embedding_model_path) else None,
-                similarity_threshold=0.50  # Понижен для лучшей работы с казахским языком
+                similarity_threshold=0.50,  # Понижен для лучшей работы с казахским языком
+                embedding_model=embedding_model,
+                embedding_cache=embedding_cache
             )
             print("   ✅ Улучшенный сервис автоответа инициализирован")
         except Exception as e:
             print(f"   ⚠️  Ошибка инициализации улучшенного автоответа: {e}")
             improved_auto_reply_service = None
     
+    # Векторный индекс тикетов (загружается с диска, если сохранен)
+    if with_ticket_index:
+        print("\n5. Загрузка индекса тикетов...")
+        ticket_index = TicketIndex(
+            TICKET_INDEX_PATH,
+            dimension=embedding_model.get_sentence_embedding_dimension(),
+            save_every=TICKET_INDEX_SAVE_EVERY
+        )
+        open_ticket_index = TicketIndex(
+            OPEN_TICKET_INDEX_PATH,
+            dimension=embedding_model.get_sentence_embedding_dimension(),
+            save_every=TICKET_INDEX_SAVE_EVERY
+        )
+        print(f"   ✅ Тикетов в индексе: {len(ticket_index)} (открытых: {len(open_ticket_index)})")
+    
     print("\n" + "=" * 60)
     print("ВСЕ МОДЕЛИ ЗАГРУЖЕНЫ!")
     print("=" * 60)
@@ -153,7 +266,53 @@ def load_models():
 @app.on_event("startup")
 async def startup_event():
     """Загружает модели при запуске приложения"""
+    global embedding_batcher, inference_executor
     load_models()
+    # Процессы пула загружают модели в инициализаторе (при fork - наследуют)
+    inference_executor = InferenceExecutor(
+        max_workers=INFERENCE_WORKERS,
+        kind=INFERENCE_EXECUTOR_KIND,
+        start_method=INFERENCE_START_METHOD,
+        initializer=_init_inference_worker
+    )
+    embedding_batcher = EmbeddingBatcher(
+        _encode_uncached,
+        max_batch_size=MICROBATCH_MAX_SIZE,
+        max_wait_ms=MICROBATCH_WAIT_MS,
+        executor=inference_executor,
+        cache=embedding_cache
+    )
+    await embedding_batcher.start()
+
+
+def _init_inference_worker():
+    """Инициализатор процесса пула: загружает модели, если они не унаследованы через fork"""
+    if classifier_category is None:
+        load_models(with_ticket_index=False)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Останавливает фоновые задачи"""
+    if embedding_batcher is not None:
+        await embedding_batcher.stop()
+    if inference_executor is not None:
+        inference_executor.shutdown()
+    if ticket_index is not None:
+        ticket_index.save()
+    if open_ticket_index is not None:
+        open_ticket_index.save()
+
+
+async def _encode_one(text: str) -> np.ndarray:
+    """
+    Кодирует один текст через микро-батчер (вместе с конкурентными запросами)
+    
+    Returns:
+        матрица эмбеддингов формы (1, dim)
+    """
+    embedding = await embedding_batcher.encode(text)
+    return embedding.reshape(1, -1)
 
 
 @app.get("/")
@@ -166,6 +325,9 @@ async def root():
             "/predict": "Классификация тикета (POST)",
             "/auto_reply": "Автоматический ответ (POST)",
             "/predict_and_reply": "Классификация + автоответ (POST)",
+            "/predict_batch": "Пакетная классификация (POST)",
+            "/ticket_index/add": "Индексация тикетов для семантического поиска (POST)",
+            "/ticket_index/search": "Семантический поиск тикетов (POST)",
             "/summarize_conversation": "Резюмирование диалога (POST)",
             "/health": "Проверка работоспособности (GET)",
             "/docs": "Документация API (Swagger UI)"
@@ -188,10 +350,158 @@ async def health_check():
         "models_loaded": models_loaded,
         "auto_reply_available": auto_reply_service is not None,
         "improved_auto_reply_available": improved_auto_reply_service is not None,
-        "using_improved_service": improved_auto_reply_service is not None
+        "using_improved_service": improved_auto_reply_service is not None,
+        "batching": embedding_batcher.stats() if embedding_batcher is not None else None,
+        "inference": inference_executor.stats() if inference_executor is not None else None,
+        "embedding_cache": embedding_cache.stats() if embedding_cache is not None else None,
+        "ticket_index": ticket_index.stats() if ticket_index is not None else None,
+        "open_ticket_index": open_ticket_index.stats() if open_ticket_index is not None else None
     }
 
 
+def _classify_embedding(embedding: np.ndarray) -> PredictionResponse:
+    """
+    Классифицирует готовый эмбеддинг всеми тремя классификаторами
+    
+    Args:
+        embedding: матрица эмбеддингов формы (1, dim)
+    
+    Returns:
+        Результат классификации
+    """
+    return _classify_embeddings(embedding)[0]
+
+
+def _predict_problem_type(embedding: np.ndarray) -> str:
+    """
+    Тип проблемы для эмбеддинга (1, dim). Функция уровня модуля: в пул процессов
+    передается только эмбеддинг, классификатор берется из памяти процесса пула
+    """
+    return classifier_problem_type.predict(embedding)[0]
+
+
+def _predict_with_confidence(classifier, embeddings: np.ndarray):
+    """
+    Один вызов predict_proba на всю матрицу: метка = класс с максимальной
+    вероятностью, уверенность = эта вероятность
+    """
+    try:
+        proba = classifier.predict_proba(embeddings)
+        labels = classifier.classes_[proba.argmax(axis=1)]
+        confidences = proba.max(axis=1)
+    except:
+        # Если predict_proba недоступен, используем дефолтные значения
+        labels = classifier.predict(embeddings)
+        confidences = np.full(len(labels), 0.8)
+    return labels, confidences
+
+
+def _classify_embeddings(embeddings: np.ndarray) -> List[PredictionResponse]:
+    """
+    Классифицирует матрицу эмбеддингов (N, dim): каждый классификатор
+    вызывается один раз на всю матрицу
+    """
+    categories, category_conf = _predict_with_confidence(classifier_category, embeddings)
+    priorities, priority_conf = _predict_with_confidence(classifier_priority, embeddings)
+    problem_types, problem_type_conf = _predict_with_confidence(classifier_problem_type, embeddings)
+    
+    return [
+        PredictionResponse(
+            category=categories[i],
+            priority=priorities[i],
+            problem_type=problem_types[i],
+            confidence={
+                "category": float(category_conf[i]),
+                "priority": float(priority_conf[i]),
+                "problem_type": float(problem_type_conf[i])
+            }
+        )
+        for i in range(len(embeddings))
+    ]
+
+
+async def _encode_batch(texts: List[str]) -> np.ndarray:
+    """
+    Кодирует список текстов: поиск в кэше - в основном процессе,
+    ненайденные тексты кодируются одним вызовом encode в пуле инференса
+    """
+    return await embedding_cache.encode_async(
+        texts, lambda missing: inference_executor.run(_encode_uncached, missing)
+    )
+
+
+def _encode_uncached(texts: List[str]) -> np.ndarray:
+    """
+    Кодирует список текстов одним вызовом encode.
+    Тексты сортируются по длине, чтобы в мини-батчах модели было меньше паддинга;
+    результат возвращается в исходном порядке.
+    """
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    sorted_embeddings = embedding_model.encode(
+        [texts[i] for i in order],
+        batch_size=ENCODE_BATCH_SIZE
+    )
+    embeddings = np.empty_like(sorted_embeddings)
+    embeddings[order] = sorted_embeddings
+    return embeddings
+
+
+def _build_auto_reply(
+    request: AutoReplyRequest,
+    problem_type: str,
+    query_embedding: Optional[np.ndarray] = None
+) -> AutoReplyResponse:
+    """
+    Получает автоответ (используем улучшенный метод, если доступен)
+    
+    query_embedding - уже посчитанный эмбеддинг текста; если передан,
+    сервис автоответа не кодирует текст повторно
+    """
+    if improved_auto_reply_service is not None:
+        result = improved_auto_reply_service.generate_draft_reply(
+            query=request.text,
+            category=request.category,
+            problem_type=problem_type,
+            language=request.language,
+            conversation_history=request.conversation_history,
+            query_embedding=query_embedding
+        )
+    else:
+        result = auto_reply_service.get_auto_reply(
+            query=request.text,
+            problem_type=problem_type,
+            category=request.category,
+            language=request.language,
+            query_embedding=query_embedding
+        )
+    
+    return AutoReplyResponse(**result)
+
+
+def _build_auto_replies_batch(
+    tickets: List[TicketRequest],
+    predictions: List[PredictionResponse],
+    embeddings: np.ndarray
+) -> List[Optional[AutoReplyResponse]]:
+    """Подбирает автоответы для пакета по готовым эмбеддингам (ошибка - None для тикета)"""
+    results = []
+    for i, (ticket, prediction) in enumerate(zip(tickets, predictions)):
+        try:
+            results.append(_build_auto_reply(
+                AutoReplyRequest(
+                    text=ticket.text,
+                    category=prediction.category,
+                    problem_type=prediction.problem_type,
+                    language=ticket.language
+                ),
+                prediction.problem_type,
+                embeddings[i]
+            ))
+        except:
+            results.append(None)
+    return results
+
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict_ticket(request: TicketRequest):
     """
@@ -214,39 +524,10 @@ async def predict_ticket(request: TicketRequest):
             raise HTTPException(status_code=400, detail="Текст тикета не может быть пустым!")
         
         # Генерация эмбеддинга
-        embedding = embedding_model.encode([full_text])
+        embedding = await _encode_one(full_text)
         
-        # Классификация
-        category = classifier_category.predict(embedding)[0]
-        priority = classifier_priority.predict(embedding)[0]
-        problem_type = classifier_problem_type.predict(embedding)[0]
-        
-        # Получение вероятностей (confidence)
-        try:
-            category_proba = classifier_category.predict_proba(embedding)[0]
-            priority_proba = classifier_priority.predict_proba(embedding)[0]
-            problem_type_proba = classifier_problem_type.predict_proba(embedding)[0]
-            
-            # Находим максимальные вероятности
-            category_conf = float(max(category_proba))
-            priority_conf = float(max(priority_proba))
-            problem_type_conf = float(max(problem_type_proba))
-        except:
-            # Если predict_proba недоступен, используем дефолтные значения
-            category_conf = 0.8
-            priority_conf = 0.8
-            problem_type_conf = 0.8
-        
-        return PredictionResponse(
-            category=category,
-            priority=priority,
-            problem_type=problem_type,
-            confidence={
-                "category": category_conf,
-                "priority": priority_conf,
-                "problem_type": problem_type_conf
-            }
-        )
+        # Классификация (в пуле инференса)
+        return await inference_executor.run(_classify_embedding, embedding)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка классификации: {str(e)}")
@@ -265,83 +546,254 @@ async def get_auto_reply(request: AutoReplyRequest):
         Автоматический ответ или причина отказа
     """
     # Всегда используем улучшенный сервис, если доступен
-    if improved_auto_reply_service is None:
-        if auto_reply_service is None:
-            raise HTTPException(status_code=503, detail="Сервис автоответа недоступен!")
-        # Fallback на старый сервис
-        service = auto_reply_service
-    else:
-        service = improved_auto_reply_service
+    if improved_auto_reply_service is None and auto_reply_service is None:
+        raise HTTPException(status_code=503, detail="Сервис автоответа недоступен!")
     
     try:
         if not request.text:
             raise HTTPException(status_code=400, detail="Текст тикета не может быть пустым!")
         
+        # Эмбеддинг считается один раз и используется и для классификации, и для FAISS
+        embedding = None
+        if embedding_model is not None:
+            embedding = await _encode_one(request.text)
+        
         # Если problem_type не указан, пытаемся определить через классификацию
         if request.problem_type is None:
-            if embedding_model is None or classifier_problem_type is None:
+            if embedding is None or classifier_problem_type is None:
                 # Не можем определить, считаем сложным для безопасности
                 problem_type = "Сложный"
             else:
-                embedding = embedding_model.encode([request.text])
-                problem_type = classifier_problem_type.predict(embedding)[0]
+                problem_type = await inference_executor.run(_predict_problem_type, embedding)
         else:
             problem_type = request.problem_type
         
-        # Получение автоответа (используем улучшенный метод, если доступен)
-        if improved_auto_reply_service is not None:
-            result = improved_auto_reply_service.generate_draft_reply(
-                query=request.text,
-                category=request.category,
-                problem_type=problem_type,
-                language=request.language,
-                conversation_history=request.conversation_history
-            )
-        else:
-            result = auto_reply_service.get_auto_reply(
-                query=request.text,
-                problem_type=problem_type,
-                category=request.category,
-                language=request.language
-            )
-        
-        return AutoReplyResponse(**result)
+        return await inference_executor.run(
+            _build_auto_reply,
+            request,
+            problem_type,
+            embedding[0] if embedding is not None else None
+        )
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка получения автоответа: {str(e)}")
 
 
 @app.post("/predict_and_reply")
-async def predict_and_reply(request: TicketRequest):
+async def predict_and_reply(request: PredictAndReplyRequest):
     """
     Комбинированный эндпоинт: классификация + автоответ
     
+    Текст кодируется SentenceTransformer один раз: этот же эмбеддинг
+    используется тремя классификаторами и поиском по FAISS индексу.
+    
+    С detect_duplicates эмбеддинг также ищется в индексе открытых тикетов:
+    тикеты со сходством не ниже duplicate_threshold возвращаются в "duplicates"
+    вместе с классификацией и автоответом, поэтому backend не обращается
+    к сервису повторно, если основной тикет среди них не найден.
+    
     Args:
         request: Запрос с текстом тикета
     
     Returns:
-        Результат классификации и автоответ (если возможен)
+        Результат классификации и автоответ (если возможен), похожие тикеты
     """
-    # Классификация
-    prediction = await predict_ticket(request)
+    if embedding_model is None or classifier_category is None:
+        raise HTTPException(status_code=503, detail="Модели не загружены!")
+    
+    full_text = f"{request.subject} {request.text}".strip()
+    if not full_text:
+        raise HTTPException(status_code=400, detail="Текст тикета не может быть пустым!")
+    
+    try:
+        embedding = await _encode_one(full_text)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка классификации: {str(e)}")
+    
+    # Поиск дубликатов (ошибка индекса не мешает классификации)
+    duplicates = []
+    if request.detect_duplicates and open_ticket_index is not None:
+        try:
+            duplicates = await run_in_threadpool(
+                open_ticket_index.search,
+                embedding[0],
+                max(1, min(request.max_duplicate_candidates, 100)),
+                None,
+                request.duplicate_threshold
+            )
+        except Exception as e:
+            print(f"⚠️  Ошибка поиска дубликатов: {e}")
+            duplicates = []
+    
+    try:
+        prediction = await inference_executor.run(_classify_embedding, embedding)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка классификации: {str(e)}")
     
     # Попытка автоответа
     auto_reply_result = None
-    service = improved_auto_reply_service if improved_auto_reply_service is not None else auto_reply_service
-    if service is not None:
+    if improved_auto_reply_service is not None or auto_reply_service is not None:
         try:
-            auto_reply_result = await get_auto_reply(AutoReplyRequest(
-                text=request.text,
-                category=prediction.category,
-                problem_type=prediction.problem_type,
-                language=request.language
-            ))
+            auto_reply_result = await inference_executor.run(
+                _build_auto_reply,
+                AutoReplyRequest(
+                    text=request.text,
+                    category=prediction.category,
+                    problem_type=prediction.problem_type,
+                    language=request.language
+                ),
+                prediction.problem_type,
+                embedding[0]
+            )
         except:
             pass
     
     return {
         "prediction": prediction.dict(),
-        "auto_reply": auto_reply_result.dict() if auto_reply_result else None
+        "auto_reply": auto_reply_result.dict() if auto_reply_result else None,
+        "duplicates": [
+            {"ticket_id": ticket_id, "similarity": similarity}
+            for ticket_id, similarity in duplicates
+        ]
+    }
+
+
+@app.post("/predict_batch")
+async def predict_batch(request: BatchTicketRequest):
+    """
+    Пакетная классификация: N тикетов кодируются одним вызовом encode,
+    каждый классификатор вызывается один раз на всю матрицу эмбеддингов.
+    
+    Args:
+        request: Список тикетов; include_auto_reply - подобрать автоответ
+            для каждого тикета (по тем же эмбеддингам)
+    
+    Returns:
+        {"results": [{"prediction": ..., "auto_reply": ...}, ...]} в порядке запроса
+    """
+    if embedding_model is None or classifier_category is None:
+        raise HTTPException(status_code=503, detail="Модели не загружены!")
+    
+    if not request.tickets:
+        raise HTTPException(status_code=400, detail="Список тикетов не может быть пустым!")
+    if len(request.tickets) > MAX_PREDICT_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Слишком большой пакет: {len(request.tickets)} > {MAX_PREDICT_BATCH_SIZE}"
+        )
+    
+    try:
+        full_texts = [f"{ticket.subject} {ticket.text}".strip() for ticket in request.tickets]
+        embeddings = await _encode_batch(full_texts)
+        predictions = await inference_executor.run(_classify_embeddings, embeddings)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка классификации: {str(e)}")
+    
+    auto_replies = [None] * len(predictions)
+    if request.include_auto_reply and (improved_auto_reply_service is not None or auto_reply_service is not None):
+        auto_replies = await inference_executor.run(
+            _build_auto_replies_batch, request.tickets, predictions, embeddings
+        )
+    
+    results = [
+        {
+            "prediction": prediction.dict(),
+            "auto_reply": auto_reply.dict() if auto_reply else None
+        }
+        for prediction, auto_reply in zip(predictions, auto_replies)
+    ]
+    
+    return {"results": results}
+
+
+@app.post("/ticket_index/add")
+async def add_to_ticket_index(request: IndexTicketsRequest):
+    """
+    Добавляет (или переиндексирует) тикеты в векторный индекс
+    
+    Returns:
+        {"indexed": количество добавленных, "total": тикетов в индексе}
+    """
+    if ticket_index is None:
+        raise HTTPException(status_code=503, detail="Индекс тикетов не загружен!")
+    if len(request.tickets) > MAX_INDEX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Слишком большой пакет: {len(request.tickets)} > {MAX_INDEX_BATCH_SIZE}"
+        )
+    
+    # Тот же текст, что и при классификации - эмбеддинг обычно уже в кэше.
+    # Кодирование - в пуле инференса, а изменение индекса - в потоке основного
+    # процесса (индекс хранится здесь, а не в копиях процессов пула)
+    texts = [f"{ticket.subject or ''} {ticket.text}".strip() for ticket in request.tickets]
+    try:
+        embeddings = await _encode_batch(texts)
+        indexed = await run_in_threadpool(
+            ticket_index.add, [ticket.ticket_id for ticket in request.tickets], embeddings
+        )
+        # Открытые тикеты - кандидаты в основные для дубликатов, остальные убираются
+        # из индекса открытых (переиндексация закрытого тикета)
+        open_positions = [i for i, ticket in enumerate(request.tickets) if ticket.open]
+        await run_in_threadpool(
+            open_ticket_index.add,
+            [request.tickets[i].ticket_id for i in open_positions],
+            embeddings[open_positions]
+        )
+        closed_ids = [ticket.ticket_id for ticket in request.tickets if not ticket.open]
+        if closed_ids:
+            await run_in_threadpool(open_ticket_index.remove, closed_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка индексации: {str(e)}")
+    
+    return {"indexed": indexed, "total": len(ticket_index)}
+
+
+@app.post("/ticket_index/remove")
+async def remove_from_ticket_index(request: RemoveTicketsRequest):
+    """
+    Удаляет тикеты из результатов семантического поиска и поиска дубликатов.
+    С open_only - только из индекса открытых тикетов (тикет закрыт, но остается
+    в семантическом поиске).
+    """
+    if ticket_index is None:
+        raise HTTPException(status_code=503, detail="Индекс тикетов не загружен!")
+    
+    removed = await run_in_threadpool(open_ticket_index.remove, request.ticket_ids)
+    if not request.open_only:
+        removed = await run_in_threadpool(ticket_index.remove, request.ticket_ids)
+    return {"removed": removed, "total": len(ticket_index)}
+
+
+@app.post("/ticket_index/search")
+async def search_ticket_index(request: SearchTicketsRequest):
+    """
+    Семантический поиск: тикеты, близкие по смыслу к тексту запроса
+    
+    Returns:
+        {"results": [{"ticket_id": ..., "similarity": ...}]} по убыванию сходства
+    """
+    if ticket_index is None:
+        raise HTTPException(status_code=503, detail="Индекс тикетов не загружен!")
+    if not request.text.strip():
+        raise HTTPException(status_code=400, detail="Текст запроса не может быть пустым!")
+    
+    try:
+        embedding = await _encode_one(request.text.strip())
+        matches = await run_in_threadpool(
+            ticket_index.search,
+            embedding[0],
+            max(1, min(request.top_k, 100)),
+            request.exclude_ticket_ids,
+            request.min_score
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка поиска: {str(e)}")
+    
+    return {
+        "results": [
+            {"ticket_id": ticket_id, "similarity": similarity}
+            for ticket_id, similarity in matches
+        ]
     }
 
 
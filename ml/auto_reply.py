@@ -10,6 +10,7 @@ from sentence_transformers import SentenceTransformer
 import faiss
 from typing import Optional, Dict, Tuple
 import joblib
+from embedding_cache import EmbeddingCache
 
 
 class AutoReplyService:
@@ -17,7 +18,9 @@ class AutoReplyService:
     
     def __init__(self, responses_path: str = "responses.json", 
                  model_path: str = None,
-                 similarity_threshold: float = 0.65):
+                 similarity_threshold: float = 0.65,
+                 embedding_model: SentenceTransformer = None,
+                 embedding_cache: EmbeddingCache = None):
         """
         Инициализация сервиса автоответа
         
@@ -25,21 +28,27 @@ class AutoReplyService:
             responses_path: путь к файлу с шаблонами ответов
             model_path: путь к модели sentence-transformers (если None, загружается из models/)
             similarity_threshold: порог схожести для автоответа (0-1)
+            embedding_model: уже загруженная модель (если None, загружается по model_path)
+            embedding_cache: общий кэш эмбеддингов запросов (если None - без кэша)
         """
         self.similarity_threshold = similarity_threshold
         self.responses_path = responses_path
+        self.embedding_cache = embedding_cache
         
         # Загрузка модели эмбеддингов
-        print("Загрузка модели для эмбеддингов...")
-        if model_path is None:
-            model_path = "models/sentence_transformer_model"
-        
-        if os.path.exists(model_path):
-            self.model = SentenceTransformer(model_path)
+        if embedding_model is not None:
+            self.model = embedding_model
         else:
-            # Используем предобученную модель
-            print(f"Модель не найдена в {model_path}, используем предобученную...")
-            self.model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
+            print("Загрузка модели для эмбеддингов...")
+            if model_path is None:
+                model_path = "models/sentence_transformer_model"
+            
+            if os.path.exists(model_path):
+                self.model = SentenceTransformer(model_path)
+            else:
+                # Используем предобученную модель
+                print(f"Модель не найдена в {model_path}, используем предобученную...")
+                self.model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
         
         # Загрузка шаблонов ответов
         self.responses = self._load_responses()
@@ -128,7 +137,8 @@ class AutoReplyService:
         return 'ru'
     
     def find_best_response(self, query: str, category: str = None, 
-                          language: str = None, top_k: int = 3) -> Optional[Dict]:
+                          language: str = None, top_k: int = 3,
+                          query_embedding: np.ndarray = None) -> Optional[Dict]:
         """
         Находит наиболее подходящий ответ для запроса
         
@@ -137,6 +147,7 @@ class AutoReplyService:
             category: категория тикета (для фильтрации)
             language: язык ответа ('ru' или 'kz'), если None - определяется автоматически
             top_k: количество кандидатов для возврата
+            query_embedding: готовый эмбеддинг запроса (если None - вычисляется)
         
         Returns:
             Словарь с ответом или None, если не найден подходящий
@@ -148,9 +159,13 @@ class AutoReplyService:
         if language is None:
             language = self._detect_language(query)
         
-        # Генерация эмбеддинга для запроса
-        query_embedding = self.model.encode([query])[0]
-        query_embedding = query_embedding.reshape(1, -1).astype('float32')
+        # Генерация эмбеддинга для запроса (если не передан готовый)
+        if query_embedding is None:
+            if self.embedding_cache is not None:
+                query_embedding = self.embedding_cache.encode([query], self.model.encode)[0]
+            else:
+                query_embedding = self.model.encode([query])[0]
+        query_embedding = np.array(query_embedding, dtype='float32').reshape(1, -1)
         faiss.normalize_L2(query_embedding)
         
         # Поиск в FAISS индексе
@@ -187,7 +202,8 @@ class AutoReplyService:
         return best_match
     
     def can_auto_reply(self, query: str, problem_type: str, 
-                      category: str = None) -> Tuple[bool, Optional[Dict]]:
+                      category: str = None,
+                      query_embedding: np.ndarray = None) -> Tuple[bool, Optional[Dict]]:
         """
         Определяет, можно ли дать автоматический ответ
         
@@ -195,6 +211,7 @@ class AutoReplyService:
             query: текст запроса
             problem_type: тип проблемы ('Типовой' или 'Сложный')
             category: категория тикета
+            query_embedding: готовый эмбеддинг запроса
         
         Returns:
             Кортеж (можно_ли_ответить, ответ_или_None)
@@ -204,7 +221,8 @@ class AutoReplyService:
             return False, None
         
         # Ищем подходящий ответ
-        best_response = self.find_best_response(query, category=category)
+        best_response = self.find_best_response(query, category=category,
+                                                query_embedding=query_embedding)
         
         if best_response and best_response['similarity'] >= self.similarity_threshold:
             return True, best_response
@@ -212,7 +230,8 @@ class AutoReplyService:
         return False, None
     
     def get_auto_reply(self, query: str, problem_type: str, 
-                      category: str = None, language: str = None) -> Dict:
+                      category: str = None, language: str = None,
+                      query_embedding: np.ndarray = None) -> Dict:
         """
         Получает автоматический ответ для запроса
         
@@ -221,11 +240,13 @@ class AutoReplyService:
             problem_type: тип проблемы
             category: категория тикета
             language: язык ответа
+            query_embedding: готовый эмбеддинг запроса
         
         Returns:
             Словарь с результатом автоответа
         """
-        can_reply, response = self.can_auto_reply(query, problem_type, category)
+        can_reply, response = self.can_auto_reply(query, problem_type, category,
+                                                  query_embedding=query_embedding)
         
         if can_reply and response:
             return {
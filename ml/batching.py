@@ -0,0 +1,136 @@
+"""
+Динамический микро-батчинг запросов к модели эмбеддингов
+
+Конкурентные запросы (/predict, /auto_reply, /predict_and_reply) не кодируются
+по одному: батчер собирает их в течение короткого окна (или до максимального
+размера батча), выполняет один вызов encode в рабочем потоке и возвращает
+каждому вызывающему его строку матрицы эмбеддингов.
+"""
+
+import asyncio
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+
+class EmbeddingBatcher:
+    """Объединяет конкурентные запросы на кодирование текста в батчи"""
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray],
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0,
+                 executor=None,
+                 cache=None):
+        """
+        Args:
+            encode_fn: синхронная функция кодирования списка текстов -> матрица (N, dim)
+            max_batch_size: максимальное количество текстов в одном вызове encode_fn
+            max_wait_ms: сколько ждать дополнительных запросов после первого (мс)
+            executor: InferenceExecutor для выполнения encode_fn
+                      (если None - стандартный пул потоков event loop)
+            cache: EmbeddingCache; поиск в кэше выполняется в этом процессе,
+                   в encode_fn передаются только промахи (кэш общий и при пуле процессов)
+        """
+        self.encode_fn = encode_fn
+        self.executor = executor
+        self.cache = cache
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # Статистика
+        self.batches_processed = 0
+        self.items_processed = 0
+
+    async def start(self):
+        """Запускает фоновую задачу сборки батчей"""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливает фоновую задачу"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Кодирует один текст в составе ближайшего батча, возвращает вектор (dim,)"""
+        if self._worker is None:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    def stats(self) -> dict:
+        """Статистика батчинга"""
+        return {
+            "batches_processed": self.batches_processed,
+            "items_processed": self.items_processed,
+            "avg_batch_size": (
+                self.items_processed / self.batches_processed if self.batches_processed else 0.0
+            ),
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        """Ждет первый запрос, затем добирает батч до max_batch_size или до конца окна"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Все, что уже в очереди, забираем без ожидания
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _encode(self, texts: List[str]) -> np.ndarray:
+        """Вызов encode_fn в пуле инференса"""
+        if self.executor is not None:
+            return await self.executor.run(self.encode_fn, texts)
+        return await asyncio.get_running_loop().run_in_executor(None, self.encode_fn, texts)
+
+    async def _run(self):
+        """Цикл: собрать батч -> закодировать в потоке -> раздать результаты"""
+        while True:
+            batch = await self._collect_batch()
+            # Запросы, которые вызывающая сторона уже отменила, не кодируем
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            texts = [text for text, _ in batch]
+            try:
+                if self.cache is not None:
+                    embeddings = await self.cache.encode_async(texts, self._encode)
+                else:
+                    embeddings = await self._encode(texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches_processed += 1
+            self.items_processed += len(batch)
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
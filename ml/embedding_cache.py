@@ -0,0 +1,143 @@
+"""
+LRU кэш эмбеддингов с ограничением по памяти
+
+Обращения в поддержку сильно повторяются (сброс пароля, вопросы по оплате,
+дубликаты писем), поэтому одинаковый текст не нужно кодировать повторно.
+Ключ - хэш нормализованного текста вместе с версией модели, так что после
+смены модели старые эмбеддинги не используются.
+"""
+
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, List
+
+import numpy as np
+
+
+# Примерные накладные расходы на одну запись (ключ, узел OrderedDict, объект массива)
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class EmbeddingCache:
+    """Потокобезопасный LRU кэш: хэш(версия модели + текст) -> эмбеддинг"""
+
+    def __init__(self, model_version: str, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            model_version: версия/путь модели эмбеддингов (входит в ключ)
+            max_bytes: ограничение памяти под эмбеддинги
+        """
+        self.model_version = model_version
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Нормализация текста: Unicode NFC и схлопывание пробелов"""
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def _key(self, normalized_text: str) -> str:
+        return hashlib.sha256(
+            f"{self.model_version}\x00{normalized_text}".encode("utf-8")
+        ).hexdigest()
+
+    def encode(self, texts: List[str],
+               encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Возвращает эмбеддинги для texts: найденные берутся из кэша,
+        остальные кодируются одним вызовом encode_fn и кладутся в кэш
+
+        Args:
+            texts: тексты
+            encode_fn: функция кодирования списка (нормализованных) текстов -> матрица (N, dim)
+
+        Returns:
+            матрица (len(texts), dim) в исходном порядке
+        """
+        result, missing, missing_texts = self._lookup(texts)
+        if missing:
+            self._fill(result, missing, encode_fn(missing_texts))
+        return np.vstack(result)
+
+    async def encode_async(self, texts: List[str],
+                           encode_fn: Callable[[List[str]], Awaitable[np.ndarray]]) -> np.ndarray:
+        """
+        То же, что encode, но encode_fn - корутина (например, кодирование
+        в пуле процессов). Поиск и запись в кэш выполняются в вызывающем
+        процессе, в encode_fn передаются только промахи.
+        """
+        result, missing, missing_texts = self._lookup(texts)
+        if missing:
+            self._fill(result, missing, await encode_fn(missing_texts))
+        return np.vstack(result)
+
+    def _lookup(self, texts: List[str]):
+        """Результат с найденными эмбеддингами, {ключ: позиции} промахов и их тексты"""
+        normalized = [self.normalize(text) for text in texts]
+        keys = [self._key(text) for text in normalized]
+        result: List[np.ndarray] = [None] * len(texts)
+
+        # Повторы внутри одного запроса кодируем один раз
+        missing = OrderedDict()
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._entries.get(key)
+                if cached is not None:
+                    self._entries.move_to_end(key)
+                    result[i] = cached
+                    self.hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+                    self.misses += 1
+
+        missing_texts = [normalized[positions[0]] for positions in missing.values()]
+        return result, missing, missing_texts
+
+    def _fill(self, result: List[np.ndarray], missing: "OrderedDict[str, List[int]]", embeddings):
+        """Кладет закодированные промахи в кэш и в результат"""
+        for (key, positions), embedding in zip(missing.items(), np.asarray(embeddings)):
+            embedding = np.array(embedding)
+            embedding.flags.writeable = False
+            self._put(key, embedding)
+            for i in positions:
+                result[i] = embedding
+
+    def _put(self, key: str, embedding: np.ndarray):
+        size = embedding.nbytes + ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = embedding
+            self._bytes += size
+            # Вытесняем самые старые записи, пока не уложимся в лимит
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes + ENTRY_OVERHEAD_BYTES
+
+    def clear(self):
+        """Очищает кэш (например, после замены модели)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Счетчики попаданий/промахов и заполненность"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "model_version": self.model_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -10,6 +10,7 @@ from typing import Optional, Dict, List
 from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
+from embedding_cache import EmbeddingCache
 
 
 class ImprovedAutoReplyService:
@@ -17,7 +18,9 @@ class ImprovedAutoReplyService:
     
     def __init__(self, responses_path: str = "responses.json",
                  model_path: str = None,
-                 similarity_threshold: float = 0.50):
+                 similarity_threshold: float = 0.50,
+                 embedding_model: SentenceTransformer = None,
+                 embedding_cache: EmbeddingCache = None):
         """
         Инициализация улучшенного сервиса автоответа
         
@@ -25,19 +28,25 @@ class ImprovedAutoReplyService:
             responses_path: путь к файлу с шаблонами ответов
             model_path: путь к модели sentence-transformers
             similarity_threshold: порог схожести для автоответа
+            embedding_model: уже загруженная модель (чтобы не держать в памяти вторую копию)
+            embedding_cache: общий кэш эмбеддингов запросов
         """
         self.similarity_threshold = similarity_threshold
         self.responses_path = responses_path
+        self.embedding_cache = embedding_cache
         
         # Загрузка модели эмбеддингов
-        print("Загрузка модели для эмбеддингов...")
-        if model_path is None:
-            model_path = "models/sentence_transformer_model"
-        
-        if os.path.exists(model_path):
-            self.embedding_model = SentenceTransformer(model_path)
+        if embedding_model is not None:
+            self.embedding_model = embedding_model
         else:
-            self.embedding_model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
+            print("Загрузка модели для эмбеддингов...")
+            if model_path is None:
+                model_path = "models/sentence_transformer_model"
+            
+            if os.path.exists(model_path):
+                self.embedding_model = SentenceTransformer(model_path)
+            else:
+                self.embedding_model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
         
         # Загрузка шаблонов ответов
         self.responses = self._load_responses()
@@ -102,6 +111,12 @@ class ImprovedAutoReplyService:
         
         print(f"✅ FAISS индекс создан: {self.index.ntotal} векторов")
     
+    def _encode_query(self, query: str) -> np.ndarray:
+        """Кодирует запрос (через общий кэш, если он передан)"""
+        if self.embedding_cache is not None:
+            return self.embedding_cache.encode([query], self.embedding_model.encode)[0]
+        return self.embedding_model.encode([query])[0]
+    
     def _detect_language(self, text: str) -> str:
         """Определение языка текста"""
         kz_chars = ['ә', 'ғ', 'қ', 'ң', 'ө', 'ұ', 'ү', 'һ', 'і']
@@ -109,16 +124,24 @@ class ImprovedAutoReplyService:
         return 'kz' if has_kz_chars else 'ru'
     
     def _find_similar_responses(self, query: str, category: str = None,
-                               language: str = None, top_k: int = 3) -> List[Dict]:
-        """Находит похожие ответы через FAISS"""
+                               language: str = None, top_k: int = 3,
+                               query_embedding: np.ndarray = None) -> List[Dict]:
+        """
+        Находит похожие ответы через FAISS
+        
+        Если query_embedding передан (уже посчитан при классификации),
+        повторное кодирование текста не выполняется.
+        """
         if self.index is None or len(self.response_texts) == 0:
             return []
         
         if language is None:
             language = self._detect_language(query)
         
-        query_embedding = self.embedding_model.encode([query])[0]
-        query_embedding = query_embedding.reshape(1, -1).astype('float32')
+        if query_embedding is None:
+            query_embedding = self._encode_query(query)
+        # Копия: normalize_L2 работает in-place, а эмбеддинг может переиспользоваться
+        query_embedding = np.array(query_embedding, dtype='float32').reshape(1, -1)
         faiss.normalize_L2(query_embedding)
         
         # Увеличиваем количество кандидатов для лучшего поиска
@@ -259,14 +282,16 @@ class ImprovedAutoReplyService:
     
     def generate_draft_reply(self, query: str, conversation_history: List[Dict] = None,
                            category: str = None, problem_type: str = None,
-                           language: str = None) -> Dict:
+                           language: str = None,
+                           query_embedding: np.ndarray = None) -> Dict:
         """Генерирует draft reply (черновик ответа)"""
         if language is None:
             language = self._detect_language(query)
         
         # Находим похожие ответы
         similar_responses = self._find_similar_responses(
-            query, category=category, language=language, top_k=3
+            query, category=category, language=language, top_k=3,
+            query_embedding=query_embedding
         )
         
         # Определяем confidence с учетом языка (для казахского понижаем порог)
@@ -307,11 +332,13 @@ class ImprovedAutoReplyService:
         }
     
     def get_auto_reply(self, query: str, problem_type: str,
-                      category: str = None, language: str = None) -> Dict:
+                      category: str = None, language: str = None,
+                      query_embedding: np.ndarray = None) -> Dict:
         """Получает автоматический ответ для запроса (совместимость со старым API)"""
         return self.generate_draft_reply(
             query=query,
             category=category,
             problem_type=problem_type,
-            language=language
+            language=language,
+            query_embedding=query_embedding
         )
@@ -0,0 +1,103 @@
+"""
+Выделенный пул для CPU-bound инференса (encode, predict_proba, поиск FAISS)
+
+Эндпоинты ML сервиса - async def, поэтому тяжелые вычисления нельзя выполнять
+прямо на event loop: один медленный encode блокирует /health и все остальные
+запросы. InferenceExecutor выполняет такие функции в отдельном пуле потоков
+(или процессов) заданного размера и считает глубину очереди.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+class InferenceExecutor:
+    """Пул для инференса с учетом количества ожидающих и выполняющихся задач"""
+
+    def __init__(self, max_workers: Optional[int] = None, kind: str = "thread",
+                 start_method: str = "spawn", initializer: Optional[Callable] = None):
+        """
+        Args:
+            max_workers: размер пула (по умолчанию - количество ядер)
+            kind: "thread" - пул потоков (torch, numpy и faiss отпускают GIL);
+                  "process" - пул процессов. В пул можно передавать только
+                  функции уровня модуля; модели процесс пула загружает
+                  в initializer и не получает с каждой задачей.
+            start_method: способ запуска процессов пула. "spawn" (по умолчанию)
+                  есть на всех ОС и безопасен при запущенных потоках torch/BLAS;
+                  "fork" быстрее стартует, но только на Linux/macOS
+            initializer: функция, выполняемая в каждом процессе пула при запуске
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Неизвестный тип пула: {kind}")
+        if kind == "process" and start_method not in multiprocessing.get_all_start_methods():
+            raise ValueError(f"Способ запуска процессов недоступен на этой ОС: {start_method}")
+
+        self.kind = kind
+        self.start_method = start_method
+        self.initializer = initializer
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[Executor] = None
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=self.initializer
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="inference"
+                )
+        return self._executor
+
+    async def run(self, fn: Callable, *args):
+        """Выполняет fn(*args) в пуле и ожидает результат, не блокируя event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            result = await loop.run_in_executor(self._get_executor(), fn, *args)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        else:
+            with self._lock:
+                self._completed += 1
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        return result
+
+    def stats(self) -> dict:
+        """Глубина очереди и счетчики задач (completed - успешные, failed - с ошибкой)"""
+        with self._lock:
+            in_flight = self._in_flight
+            return {
+                "kind": self.kind,
+                "start_method": self.start_method if self.kind == "process" else None,
+                "workers": self.max_workers,
+                "in_flight": in_flight,
+                "queued": max(0, in_flight - self.max_workers),
+                "completed": self._completed,
+                "failed": self._failed,
+            }
+
+    def shutdown(self):
+        """Останавливает пул"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
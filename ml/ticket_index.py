@@ -0,0 +1,197 @@
+"""
+Векторный индекс тикетов для семантического поиска ("найти похожие тикеты")
+
+Эмбеддинги тикетов хранятся в FAISS HNSW индексе (приближенный поиск за
+миллисекунды и на миллионах векторов), обернутом в IndexIDMap2. FAISS работает
+с int64 идентификаторами, поэтому рядом хранится соответствие UUID тикета ->
+внутренний id. HNSW не поддерживает удаление: удаленные и переиндексированные
+тикеты убираются из соответствия и отфильтровываются из результатов.
+
+Индекс пополняется инкрементально и периодически сохраняется на диск
+(атомарно, через временный файл), поэтому после перезапуска не нужно заново
+кодировать все тикеты.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+
+class TicketIndex:
+    """Потокобезопасный персистентный индекс эмбеддингов тикетов"""
+
+    def __init__(self, index_path: str, dimension: int,
+                 hnsw_m: int = 32, ef_search: int = 64, save_every: int = 100):
+        """
+        Args:
+            index_path: путь к файлу FAISS индекса (рядом - <path>.ids.json)
+            dimension: размерность эмбеддингов
+            hnsw_m: число связей на узел HNSW
+            ef_search: ширина поиска HNSW (больше - точнее и медленнее)
+            save_every: сохранять на диск после стольких изменений
+        """
+        self.index_path = index_path
+        self.ids_path = f"{index_path}.ids.json"
+        self.dimension = dimension
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.save_every = save_every
+
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # одна запись на диск за раз
+        self._index = None
+        self._internal_by_ticket: Dict[str, int] = {}
+        self._ticket_by_internal: Dict[int, str] = {}
+        self._next_id = 0
+        self._tombstones = 0
+        self._unsaved_changes = 0
+
+        self._load_or_create()
+
+    def _create_index(self):
+        hnsw = faiss.IndexHNSWFlat(self.dimension, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efSearch = self.ef_search
+        return faiss.IndexIDMap2(hnsw)
+
+    def _load_or_create(self):
+        if os.path.exists(self.index_path) and os.path.exists(self.ids_path):
+            try:
+                index = faiss.read_index(self.index_path)
+                with open(self.ids_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                if index.d != self.dimension:
+                    raise ValueError(f"размерность {index.d} != {self.dimension}")
+                faiss.downcast_index(index.index).hnsw.efSearch = self.ef_search
+                self._index = index
+                self._internal_by_ticket = {k: int(v) for k, v in meta["ids"].items()}
+                self._ticket_by_internal = {v: k for k, v in self._internal_by_ticket.items()}
+                # Если процесс упал между записью индекса и соответствия,
+                # в индексе могут быть id больше сохраненного next_id
+                stored_ids = faiss.vector_to_array(index.id_map)
+                self._next_id = max(int(meta["next_id"]), int(stored_ids.max()) + 1 if len(stored_ids) else 0)
+                self._tombstones = index.ntotal - len(self._internal_by_ticket)
+                print(f"   ✅ Индекс тикетов загружен: {len(self._internal_by_ticket)} тикетов")
+                return
+            except Exception as e:
+                print(f"   ⚠️  Не удалось загрузить индекс тикетов ({e}), создаем новый")
+        self._index = self._create_index()
+
+    def __len__(self) -> int:
+        return len(self._internal_by_ticket)
+
+    def add(self, ticket_ids: List[str], embeddings: np.ndarray) -> int:
+        """
+        Добавляет (или переиндексирует) тикеты
+
+        Args:
+            ticket_ids: UUID тикетов (строки)
+            embeddings: матрица (N, dim)
+
+        Returns:
+            количество добавленных векторов
+        """
+        if not ticket_ids:
+            return 0
+        vectors = np.array(embeddings, dtype=np.float32)  # копия: normalize_L2 меняет массив
+        faiss.normalize_L2(vectors)
+
+        with self._lock:
+            internal_ids = np.empty(len(ticket_ids), dtype=np.int64)
+            for i, ticket_id in enumerate(ticket_ids):
+                self._forget(ticket_id)
+                internal_ids[i] = self._next_id
+                self._internal_by_ticket[ticket_id] = self._next_id
+                self._ticket_by_internal[self._next_id] = ticket_id
+                self._next_id += 1
+            self._index.add_with_ids(vectors, internal_ids)
+            self._unsaved_changes += len(ticket_ids)
+            should_save = self._unsaved_changes >= self.save_every
+
+        if should_save:
+            self.save()
+        return len(ticket_ids)
+
+    def remove(self, ticket_ids: List[str]) -> int:
+        """Убирает тикеты из результатов поиска"""
+        with self._lock:
+            removed = sum(1 for ticket_id in ticket_ids if self._forget(ticket_id))
+            self._unsaved_changes += removed
+        return removed
+
+    def _forget(self, ticket_id: str) -> bool:
+        internal_id = self._internal_by_ticket.pop(ticket_id, None)
+        if internal_id is None:
+            return False
+        self._ticket_by_internal.pop(internal_id, None)
+        self._tombstones += 1
+        return True
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 10,
+               exclude: Optional[List[str]] = None,
+               min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """
+        Ищет ближайшие тикеты
+
+        Args:
+            query_embedding: вектор запроса (dim,) или (1, dim)
+            top_k: количество результатов
+            exclude: UUID тикетов, которые не нужно возвращать (например, сам тикет)
+            min_score: минимальное косинусное сходство
+
+        Returns:
+            [(ticket_id, similarity)] по убыванию сходства
+        """
+        query = np.array(query_embedding, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(query)
+        exclude = set(exclude or [])
+
+        with self._lock:
+            if self._index.ntotal == 0:
+                return []
+            # Запрашиваем с запасом: часть кандидатов может быть удалена или исключена
+            fetch = min(self._index.ntotal, top_k + len(exclude) + min(self._tombstones, top_k * 4))
+            scores, internal_ids = self._index.search(query, fetch)
+            results = []
+            for score, internal_id in zip(scores[0], internal_ids[0]):
+                ticket_id = self._ticket_by_internal.get(int(internal_id))
+                if ticket_id is None or ticket_id in exclude or score < min_score:
+                    continue
+                results.append((ticket_id, float(score)))
+                if len(results) >= top_k:
+                    break
+        return results
+
+    def save(self):
+        """Сохраняет индекс и соответствие id на диск (атомарно)"""
+        with self._save_lock:
+            # Под блокировкой индекса только сериализация в память, запись на диск - без нее
+            with self._lock:
+                if self._unsaved_changes == 0 and os.path.exists(self.index_path):
+                    return
+                data = faiss.serialize_index(self._index)
+                meta = {"next_id": self._next_id, "ids": dict(self._internal_by_ticket)}
+                self._unsaved_changes = 0
+
+            directory = os.path.dirname(self.index_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(f"{self.index_path}.tmp", "wb") as f:
+                f.write(data.tobytes())
+            with open(f"{self.ids_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(f"{self.index_path}.tmp", self.index_path)
+            os.replace(f"{self.ids_path}.tmp", self.ids_path)
+
+    def stats(self) -> dict:
+        """Размер индекса"""
+        with self._lock:
+            return {
+                "tickets": len(self._internal_by_ticket),
+                "vectors": self._index.ntotal,
+                "tombstones": self._tombstones,
+                "unsaved_changes": self._unsaved_changes,
+            }